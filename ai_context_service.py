@@ -0,0 +1,156 @@
+# ai_context_service.py
+"""
+Ringkasan numerik riwayat keuangan user untuk prompt konsultasi AI.
+
+Alih-alih mengirim baris transaksi mentah, riwayat diringkas menjadi blok teks
+pendek: laba bersih mingguan, volatilitas, kemiringan tren, pengeluaran
+terbesar, dan breakdown P&L DNA health score. Semua agregasi dihitung dengan
+NumPy dari 'daily_totals' (plus satu query GROUP BY untuk pengeluaran terbesar),
+lalu di-cache per user sampai data transaksinya berubah.
+
+Ukuran blok dijaga di bawah AI_CONTEXT_TOKEN_BUDGET (estimasi ~4 karakter per
+token); jika terlalu panjang, deret mingguan dan daftar pengeluaran dipangkas.
+"""
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from app.models import db, Transaction
+from batch_scoring import least_squares_slope
+from cache_service import VersionedCache
+from rollup_service import get_data_version
+from scoring_api import extract_pnl_features, get_cached_dna_scores
+
+AI_CONTEXT_DAYS = int(os.getenv("AI_CONTEXT_DAYS", 90))
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", 300))
+TOP_EXPENSE_COUNT = 5
+
+DNA_LABELS = {
+    "profitability": "profitabilitas",
+    "stability": "stabilitas",
+    "trend": "tren",
+    "income_quality": "kualitas_pemasukan",
+    "load_management": "manajemen_beban",
+}
+
+context_cache = VersionedCache("ai_context", maxsize=int(os.getenv("AI_CONTEXT_CACHE_SIZE", 10000)))
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+def _short_rupiah(value):
+    """12300000 -> '12,3jt', 450000 -> '450rb' (lebih hemat token daripada angka penuh)."""
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    if value >= 1_000_000_000:
+        return f"{sign}{value / 1_000_000_000:.1f}M".replace(".", ",")
+    if value >= 1_000_000:
+        return f"{sign}{value / 1_000_000:.1f}jt".replace(".", ",")
+    if value >= 1_000:
+        return f"{sign}{value / 1_000:.0f}rb"
+    return f"{sign}{value:.0f}"
+
+
+def _weekly_net_income(features, days):
+    """Laba bersih per minggu (minggu terakhir berakhir hari ini), dihitung dengan bincount."""
+    end_date = np.datetime64(datetime.utcnow().date(), "D")
+    start_date = end_date - (days - 1)
+    offsets = (features["dates"] - start_date).astype(int)
+    in_window = (offsets >= 0) & (offsets < days)
+    weeks = -(-days // 7)
+    # Minggu dihitung mundur dari hari ini agar minggu terakhir selalu penuh 7 hari
+    week_index = weeks - 1 - (days - 1 - offsets[in_window]) // 7
+    net = features["income"][in_window] - features["expense"][in_window]
+    return (
+        np.bincount(week_index, weights=net, minlength=weeks),
+        features["income"][in_window].sum(),
+        features["expense"][in_window].sum(),
+        int(in_window.sum()),
+    )
+
+
+def _top_expenses(user_id, days, limit=TOP_EXPENSE_COUNT):
+    cutoff = datetime.utcnow().date() - timedelta(days=days - 1)
+    total = func.sum(Transaction.amount)
+    return db.session.query(
+        Transaction.description, total.label("total"), func.count().label("count")
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.type == 'pengeluaran',
+        Transaction.date >= cutoff
+    ).group_by(Transaction.description).order_by(total.desc()).limit(limit).all()
+
+
+def _summary_facts(user_id, days):
+    features = extract_pnl_features(user_id)
+    weekly, income, expense, active_days = _weekly_net_income(features, days)
+    if active_days == 0:
+        return None
+
+    mean_week = weekly.mean()
+    return {
+        "days": days,
+        "active_days": active_days,
+        "income": income,
+        "expense": expense,
+        "weekly": weekly,
+        "weekly_cv": float(weekly.std() / abs(mean_week)) if mean_week else None,
+        "slope": float(least_squares_slope(weekly)),
+        "top_expenses": [(row.description or "-", float(row.total), row.count) for row in _top_expenses(user_id, days)],
+        "dna": get_cached_dna_scores(user_id),
+    }
+
+
+def _render(facts, weeks, expenses):
+    margin = (facts["income"] - facts["expense"]) / facts["income"] * 100 if facts["income"] else 0
+    weekly = facts["weekly"][-weeks:]
+    lines = [
+        f"periode: {facts['days']} hari terakhir, {facts['active_days']} hari ada transaksi",
+        f"pemasukan: {_short_rupiah(facts['income'])}; pengeluaran: {_short_rupiah(facts['expense'])}; margin: {margin:.0f}%",
+        f"laba_bersih_mingguan ({len(weekly)} minggu, lama->baru): " + ", ".join(_short_rupiah(v) for v in weekly),
+        "volatilitas_mingguan (CV): " + (f"{facts['weekly_cv']:.2f}" if facts["weekly_cv"] is not None else "-"),
+        f"tren_laba: {'+' if facts['slope'] >= 0 else ''}{_short_rupiah(facts['slope'])}/minggu",
+    ]
+    if expenses:
+        lines.append("pengeluaran_terbesar: " + "; ".join(
+            f"{description[:40]} {_short_rupiah(total)} ({count}x)"
+            for description, total, count in facts["top_expenses"][:expenses]
+        ))
+    lines.append("skor_pnl_dna: " + ", ".join(
+        f"{DNA_LABELS.get(name, name)} {score:.0f}" for name, score in facts["dna"].items()
+    ))
+    return "\n".join(lines)
+
+
+def _fit_to_budget(facts, budget):
+    """Pangkas deret mingguan lalu daftar pengeluaran sampai blok muat di anggaran token."""
+    weeks = len(facts["weekly"])
+    expenses = len(facts["top_expenses"])
+    text = _render(facts, weeks, expenses)
+    while estimate_tokens(text) > budget and (weeks > 4 or expenses > 0):
+        if weeks > 4:
+            weeks -= 1
+        else:
+            expenses -= 1
+        text = _render(facts, weeks, expenses)
+    return text
+
+
+def get_financial_context(user_id, days=AI_CONTEXT_DAYS, budget=AI_CONTEXT_TOKEN_BUDGET):
+    """
+    Blok ringkasan keuangan user (string, kosong jika belum ada transaksi di periode ini).
+    Valid selama versi data user dan tanggal hari ini tidak berubah.
+    """
+    user_id = int(user_id)
+    version = (get_data_version(user_id), datetime.utcnow().date(), days, budget)
+    text = context_cache.get(user_id, version)
+    if text is None:
+        facts = _summary_facts(user_id, days)
+        text = _fit_to_budget(facts, budget) if facts else ""
+        context_cache.set(user_id, version, text)
+    return text
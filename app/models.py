@@ -18,6 +18,71 @@ class Transaction(db.Model):
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.Date, nullable=False)
 
+    # Semua query per user memfilter rentang tanggal dan/atau jenis; amount ikut agar index-nya covering
+    # (buat di database lama dengan: flask --app main ensure-indexes)
+    __table_args__ = (
+        db.Index('ix_transactions_user_date_type_amount', 'user_id', 'date', 'type', 'amount'),
+    )
+
+
+class DailyTotal(db.Model):
+    __tablename__ = 'daily_totals'  # rollup harian dari 'transactions', dijaga oleh rollup_service.py
+
+    user_id = db.Column(db.Integer, db.ForeignKey('akun.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    income = db.Column(db.Float, nullable=False, default=0)
+    expense = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    non_sales_income = db.Column(db.Float, nullable=False, default=0)  # suntikan, pinjaman, modal, ...
+    expense_count = db.Column(db.Integer, nullable=False, default=0)  # jumlah baris pengeluaran (termasuk amount 0)
+
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'  # naik setiap kali transaksi user berubah, dipakai sebagai kunci cache
+
+    user_id = db.Column(db.Integer, db.ForeignKey('akun.id'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class OcrJob(db.Model):
+    __tablename__ = 'ocr_jobs'  # job OCR asinkron (lihat ocr_jobs.py)
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('akun.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # queued, running, done, failed
+    result = db.Column(db.Text)  # JSON hasil pemrosesan
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+
+
+class OcrResult(db.Model):
+    __tablename__ = 'ocr_results'  # cache hasil OCR berdasarkan hash isi gambar (lihat ocr_cache.py)
+
+    image_hash = db.Column(db.String(64), primary_key=True)  # sha256 hex
+    result = db.Column(db.Text, nullable=False)  # JSON {"transactions": [...]}
+    size = db.Column(db.Integer, nullable=False, default=0)  # byte UTF-8 dari result, untuk batas ukuran cache
+    created_at = db.Column(db.DateTime, nullable=False)
+    last_used_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class OcrUpload(db.Model):
+    __tablename__ = 'ocr_uploads'  # nota yang transaksinya sudah disimpan oleh user
+
+    user_id = db.Column(db.Integer, db.ForeignKey('akun.id'), primary_key=True)
+    image_hash = db.Column(db.String(64), primary_key=True)
+    saved_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+class TransactionCategory(db.Model):
+    __tablename__ = 'transaction_categories'  # cache kategori hasil AI per deskripsi (lihat classification_service.py)
+
+    description_hash = db.Column(db.String(64), primary_key=True)  # sha256 hex dari deskripsi ternormalisasi
+    description = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
 
 class Application(db.Model):
     __tablename__ = 'applications'
@@ -29,6 +94,11 @@ class Application(db.Model):
     date = db.Column(db.Date)
     is_fraud = db.Column(db.Boolean)
 
+    # Chart bulanan + jumlah fraud dashboard dibaca dari index saja; juga untuk "5 aplikasi terbaru"
+    __table_args__ = (
+        db.Index('ix_applications_user_date_fraud', 'user_id', 'date', 'is_fraud'),
+    )
+
 class Activity(db.Model):
     __tablename__ = 'activities'
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +107,10 @@ class Activity(db.Model):
     description = db.Column(db.Text)
     timestamp = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_activities_user_timestamp', 'user_id', 'timestamp'),
+    )
+
 class Customer(db.Model):
     __tablename__ = 'customers'
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,304 @@
+# batch_scoring.py
+"""
+Health score untuk banyak user sekaligus.
+
+Riwayat harian semua user dimuat dengan query berkelompok (user_id IN ...),
+lalu setiap komponen DNA dan ICS dihitung sebagai operasi NumPy atas array
+berukuran (jumlah user,). Ambang batas skor di sini harus selalu sama dengan
+fungsi calculate_... di scoring_api.py (versi per user).
+
+CLI:
+    flask --app main score-batch users.json [--output hasil.json] [--workers 4]
+
+Format input: list JSON berisi {"user_id": 1, ...field ICS seperti di /scoring/health-score}.
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from app.models import db, DailyTotal
+
+# Jumlah user_id per query IN (...)
+QUERY_CHUNK_SIZE = 1000
+# Jumlah user per tugas saat memakai process pool
+WORKER_CHUNK_SIZE = 5000
+
+DNA_WEIGHT = 0.14
+ICS_WEIGHT = 0.075
+
+# Nilai default ICS, sama dengan default di endpoint /scoring/health-score
+ICS_DEFAULTS = {
+    "bill_late_in_3m": False,
+    "bill_total_late": 0,
+    "bill_cv": 0.3,
+    "bill_ratio": 0.2,
+    "mobile_avg_topup": 120000,
+    "mobile_topup_cv": 0.25,
+    "mobile_number_age": 3,
+    "mobile_has_banking": True,
+    "mobile_has_gambling": False,
+    "tax_has_npwp": True,
+    "tax_provides_npwp": True,
+    "credit_has_failed": False,
+    "credit_active_loans": 0,
+}
+
+
+def least_squares_slope(series):
+    """
+    Kemiringan regresi linier y = a + b*x dengan x = 0, 1, ..., n-1 (closed form).
+    `series` boleh 1-D (satu user) atau 2-D (satu baris per user); hasilnya
+    berupa skalar atau array kemiringan per baris.
+    """
+    series = np.asarray(series, dtype=float)
+    if series.shape[-1] < 2:
+        # Satu titik: kemiringan 0, sama seperti LinearRegression
+        return np.zeros(series.shape[:-1]) if series.ndim > 1 else 0.0
+    x = np.arange(series.shape[-1], dtype=float)
+    x_centered = x - x.mean()
+    y_centered = series - series.mean(axis=-1, keepdims=True)
+    return (y_centered @ x_centered) / (x_centered @ x_centered)
+
+
+def _safe_divide(numerator, denominator):
+    """Pembagian elemen per elemen; hasil 0 jika penyebutnya 0."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+# --- Muat fitur P&L untuk banyak user ---
+
+def load_pnl_features_batch(user_ids, days=60):
+    """
+    Memuat 'daily_totals' untuk semua user dan meringkasnya per user.
+    Mengembalikan dict berisi array dengan panjang len(user_ids) (series: 2-D).
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    n_users = len(user_ids)
+    position = {int(uid): i for i, uid in enumerate(user_ids)}
+
+    rows = []
+    for start in range(0, n_users, QUERY_CHUNK_SIZE):
+        chunk = [int(uid) for uid in user_ids[start:start + QUERY_CHUNK_SIZE]]
+        rows.extend(db.session.query(
+            DailyTotal.user_id,
+            DailyTotal.date,
+            DailyTotal.income,
+            DailyTotal.expense,
+            DailyTotal.non_sales_income,
+            DailyTotal.expense_count
+        ).filter(DailyTotal.user_id.in_(chunk)).all())
+
+    user_idx = np.array([position[row.user_id] for row in rows], dtype=np.int64)
+    dates = np.array([row.date for row in rows], dtype="datetime64[D]")
+    income = np.array([row.income for row in rows], dtype=float)
+    expense = np.array([row.expense for row in rows], dtype=float)
+    non_sales_income = np.array([row.non_sales_income for row in rows], dtype=float)
+
+    # Deret laba harian 'days' hari terakhir, satu baris per user
+    end_date = np.datetime64(datetime.utcnow().date(), "D")
+    offsets = (dates - (end_date - (days - 1))).astype(np.int64)
+    in_window = (offsets >= 0) & (offsets < days)
+    series = np.zeros((n_users, days))
+    series[user_idx[in_window], offsets[in_window]] = income[in_window] - expense[in_window]
+
+    # Statistik pengeluaran harian (hari yang punya baris pengeluaran, walaupun totalnya 0)
+    has_expense = np.array([row.expense_count for row in rows], dtype=np.int64) > 0
+    expense_idx = user_idx[has_expense]
+    expense_days = np.bincount(expense_idx, minlength=n_users)
+    expense_mean = _safe_divide(np.bincount(expense_idx, expense[has_expense], minlength=n_users), expense_days)
+    squared_dev = (expense[has_expense] - expense_mean[expense_idx]) ** 2
+    expense_std = np.sqrt(_safe_divide(np.bincount(expense_idx, squared_dev, minlength=n_users), expense_days))
+
+    return {
+        "user_ids": user_ids,
+        "total_income": np.bincount(user_idx, income, minlength=n_users),
+        "total_expense": np.bincount(user_idx, expense, minlength=n_users),
+        "non_sales_income": np.bincount(user_idx, non_sales_income, minlength=n_users),
+        "series": series,
+        "expense_days": expense_days,
+        "expense_mean": expense_mean,
+        "expense_std": expense_std,
+    }
+
+
+# --- Skor P&L DNA (vektor) ---
+
+def profitability_scores(batch):
+    income, expense = batch["total_income"], batch["total_expense"]
+    margin = _safe_divide(income - expense, income) * 100
+    return np.select(
+        [income == 0, margin > 20, (margin >= 10) & (margin <= 20), (margin >= 1) & (margin < 10), margin == 0],
+        [0, 90, 70, 45, 20],
+        default=0
+    ).astype(float)
+
+def stability_scores(batch):
+    mean_profit = batch["series"].mean(axis=1)
+    cv = _safe_divide(batch["series"].std(axis=1), mean_profit)
+    return np.select(
+        [mean_profit <= 0, cv < 0.3, cv < 0.7, cv < 1.2],
+        [10, 95, 80, 60],
+        default=30
+    ).astype(float)
+
+def trend_scores(batch):
+    mean_profit = batch["series"].mean(axis=1)
+    normalized_trend = _safe_divide(least_squares_slope(batch["series"]), mean_profit) * 100
+    return np.select(
+        [mean_profit <= 0, normalized_trend > 0.5, normalized_trend > 0, normalized_trend == 0],
+        [10, 95, 80, 60],
+        default=30
+    ).astype(float)
+
+def income_quality_scores(batch):
+    income = batch["total_income"]
+    quality_ratio = _safe_divide(income - batch["non_sales_income"], income) * 100
+    return np.select(
+        [income == 0, quality_ratio > 95, quality_ratio >= 80, quality_ratio >= 60],
+        [0, 95, 80, 60],
+        default=30
+    ).astype(float)
+
+def load_management_scores(batch):
+    cv_expense = _safe_divide(batch["expense_std"], batch["expense_mean"])
+    predictability = np.select(
+        [batch["expense_days"] < 7, batch["expense_mean"] == 0, cv_expense < 0.4, cv_expense < 0.8],
+        [50, 100, 90, 70],
+        default=40
+    )
+    return 0.5 * profitability_scores(batch) + 0.5 * predictability
+
+def dna_scores_batch(batch):
+    return {
+        "profitability": profitability_scores(batch),
+        "stability": stability_scores(batch),
+        "trend": trend_scores(batch),
+        "income_quality": income_quality_scores(batch),
+        "load_management": load_management_scores(batch),
+    }
+
+
+# --- Skor ICS (vektor) ---
+
+def _ics_column(ics_inputs, key, dtype=float):
+    default = ICS_DEFAULTS[key]
+    return np.array([item.get(key, default) for item in ics_inputs], dtype=dtype)
+
+def ics_scores_batch(ics_inputs):
+    late_3m = _ics_column(ics_inputs, "bill_late_in_3m", bool)
+    total_late = _ics_column(ics_inputs, "bill_total_late")
+    bill_cv = _ics_column(ics_inputs, "bill_cv")
+    bill_ratio = _ics_column(ics_inputs, "bill_ratio")
+    score_ketepatan = np.select([late_3m, total_late > 0], [40, 75], default=100)
+    score_kestabilan = np.select([bill_cv < 0.1, bill_cv < 0.25], [90, 65], default=30)
+    score_rasio = np.select([bill_ratio < 0.1, bill_ratio < 0.25, bill_ratio < 0.4], [100, 80, 50], default=20)
+    bill_payment = 0.5 * score_ketepatan + 0.25 * score_kestabilan + 0.25 * score_rasio
+
+    avg_topup = _ics_column(ics_inputs, "mobile_avg_topup")
+    topup_cv = _ics_column(ics_inputs, "mobile_topup_cv")
+    number_age = _ics_column(ics_inputs, "mobile_number_age")
+    has_banking = _ics_column(ics_inputs, "mobile_has_banking", bool)
+    has_gambling = _ics_column(ics_inputs, "mobile_has_gambling", bool)
+    score_topup = np.select(
+        [(avg_topup > 150000) & (topup_cv < 0.2), (avg_topup > 100000) & (topup_cv < 0.3), (avg_topup > 50000) | (topup_cv < 0.5)],
+        [100, 80, 60],
+        default=40
+    )
+    score_lama_nomor = np.select([number_age > 5, number_age >= 2, number_age >= 1], [100, 80, 60], default=40)
+    score_aplikasi = np.clip(60 + 20 * has_banking - 40 * has_gambling, 0, 100)
+    mobile_usage = 0.5 * score_topup + 0.3 * score_lama_nomor + 0.2 * score_aplikasi
+
+    has_npwp = _ics_column(ics_inputs, "tax_has_npwp", bool)
+    provides_npwp = _ics_column(ics_inputs, "tax_provides_npwp", bool)
+    tax_history = np.select([has_npwp & provides_npwp, has_npwp], [80, 40], default=20).astype(float)
+
+    has_failed = _ics_column(ics_inputs, "credit_has_failed", bool)
+    active_loans = _ics_column(ics_inputs, "credit_active_loans")
+    credit_history = np.select(
+        [has_failed, active_loans == 0, active_loans == 1, active_loans >= 2],
+        [0, 100, 75, 40],
+        default=100
+    ).astype(float)
+
+    return {
+        "bill_payment": bill_payment,
+        "mobile_usage": mobile_usage,
+        "tax_history": tax_history,
+        "credit_history": credit_history,
+    }
+
+
+# --- Gabungan ---
+
+def _score_chunk(user_ids, ics_inputs):
+    # user_id yang sama cukup dimuat sekali
+    unique_ids, inverse = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    dna = {k: v[inverse] for k, v in dna_scores_batch(load_pnl_features_batch(unique_ids)).items()}
+    ics = ics_scores_batch(ics_inputs)
+    pnl_component = sum(dna.values()) * DNA_WEIGHT
+    ics_component = sum(ics.values()) * ICS_WEIGHT
+    final_score = pnl_component + ics_component
+
+    results = []
+    for i, user_id in enumerate(user_ids):
+        results.append({
+            "user_id": int(user_id),
+            "final_health_score": round(float(final_score[i]), 2),
+            "details": {
+                "pnl_score_contribution": round(float(pnl_component[i]), 2),
+                "ics_score_contribution": round(float(ics_component[i]), 2),
+                "pnl_dna_breakdown": {k: round(float(v[i]), 2) for k, v in dna.items()},
+                "ics_breakdown": {k: round(float(v[i]), 2) for k, v in ics.items()}
+            }
+        })
+    return results
+
+
+def _init_worker():
+    # Setiap proses worker butuh app context dan koneksi DB sendiri
+    from main import app
+    app.app_context().push()
+    db.engine.dispose(close=False)
+
+
+def _score_chunk_in_worker(args):
+    return _score_chunk(*args)
+
+
+def score_users(users, workers=None):
+    """
+    Hitung health score untuk list dict {"user_id": ..., <field ICS>...}.
+    Jika `workers` > 1 dan jumlah user melebihi WORKER_CHUNK_SIZE, pekerjaan
+    dibagi ke process pool (harus dipanggil di dalam app context).
+    """
+    user_ids = [int(item["user_id"]) for item in users]
+    chunks = [
+        (user_ids[start:start + WORKER_CHUNK_SIZE], users[start:start + WORKER_CHUNK_SIZE])
+        for start in range(0, len(users), WORKER_CHUNK_SIZE)
+    ]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            chunk_results = executor.map(_score_chunk_in_worker, chunks)
+            return [result for chunk in chunk_results for result in chunk]
+
+    return [result for chunk in chunks for result in _score_chunk(*chunk)]
+
+
+@click.command('score-batch')
+@click.argument('input_file', type=click.File('r'))
+@click.option('--output', type=click.File('w'), default='-', help='File hasil JSON (default: stdout).')
+@click.option('--workers', type=int, default=None, help='Jumlah proses worker untuk batch besar.')
+@with_appcontext
+def score_batch_command(input_file, output, workers):
+    """Hitung health score untuk banyak user dari file JSON."""
+    users = json.load(input_file)
+    results = score_users(users, workers=workers)
+    json.dump(results, output, ensure_ascii=False)
+    click.echo(f"✅ {len(results)} user dinilai.", err=True)
@@ -0,0 +1,10 @@
+"""
+Benchmark jalur panas API dengan data UMKM sintetis.
+
+    python -m benchmarks.run --users 1000 --transactions 50000 --repeat 30
+    python -m benchmarks.run --compare benchmarks/results/<commit-lama>.json
+
+Data dibuat oleh benchmarks/data_generator.py ke database lokal (default SQLite
+benchmarks/bench.db; gunakan --db-uri untuk MySQL lokal). Semua request lewat
+Flask test client dan LLM memakai backend palsu, jadi tidak ada akses jaringan.
+"""
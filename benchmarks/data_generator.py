@@ -0,0 +1,169 @@
+# benchmarks/data_generator.py
+"""
+Generator data UMKM sintetis: user, transaksi harian dengan deskripsi berbahasa
+Indonesia, pengajuan pinjaman, dan aktivitas. Setiap user mendapat profil usaha
+(jenis usaha, omzet harian, rasio pengeluaran, tren, pola akhir pekan) sehingga
+campuran pemasukan/pengeluaran dan skor kesehatan bervariasi antar user.
+
+Data ditulis dengan INSERT multi-baris per chunk, lalu 'daily_totals' dibangun
+ulang dengan rollup_service.rebuild_daily_totals.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models import db, User, Transaction, Application, Activity
+from rollup_service import rebuild_daily_totals
+
+INSERT_CHUNK_SIZE = 5000
+
+BUSINESS_PROFILES = {
+    "warung makan": {
+        "income": ["Penjualan nasi goreng", "Penjualan es teh", "Pesanan katering kantor", "Penjualan ayam geprek",
+                   "Pesanan GoFood", "Penjualan paket nasi box"],
+        "expense": ["Beli beras 25kg", "Beli minyak goreng", "Belanja sayur di pasar", "Beli gas elpiji 3kg",
+                    "Beli ayam potong", "Bayar listrik", "Gaji karyawan", "Sewa tempat"],
+    },
+    "toko kelontong": {
+        "income": ["Penjualan sembako", "Penjualan rokok", "Penjualan pulsa dan token listrik",
+                   "Penjualan grosir ke warung", "Penjualan minuman dingin"],
+        "expense": ["Kulakan sembako di agen", "Beli stok minuman", "Bayar listrik", "Sewa kios",
+                    "Ongkos angkut barang", "Retribusi pasar"],
+    },
+    "konveksi": {
+        "income": ["Pesanan seragam sekolah", "Penjualan kaos sablon", "Pesanan jaket komunitas",
+                   "Penjualan online marketplace", "DP pesanan kemeja kantor"],
+        "expense": ["Beli kain katun", "Beli benang dan kancing", "Upah penjahit", "Servis mesin jahit",
+                    "Ongkos kirim ekspedisi", "Biaya iklan marketplace", "Bayar listrik"],
+    },
+    "laundry": {
+        "income": ["Jasa cuci kiloan", "Jasa cuci bed cover", "Jasa setrika", "Langganan laundry kos"],
+        "expense": ["Beli deterjen", "Beli pewangi", "Bayar air PDAM", "Bayar listrik", "Gaji karyawan",
+                    "Servis mesin cuci"],
+    },
+    "kedai kopi": {
+        "income": ["Penjualan kopi susu", "Penjualan roti bakar", "Pesanan ShopeeFood", "Sewa tempat acara"],
+        "expense": ["Beli biji kopi", "Beli susu UHT", "Beli gula aren", "Gaji barista", "Sewa ruko",
+                    "Biaya iklan Instagram"],
+    },
+}
+NON_SALES_INCOME = ["Pinjaman modal usaha", "Suntikan dana keluarga", "Setoran modal pemilik"]
+BORROWERS = ["Budi Santoso", "Siti Aminah", "Agus Wijaya", "Dewi Lestari", "Rudi Hartono", "Rina Marlina"]
+APPLICATION_STATUSES = ["pending", "approved", "rejected"]
+ACTIVITY_TITLES = ["Transaksi ditambahkan", "Nota diunggah", "Skor kesehatan dihitung", "Laporan diunduh"]
+
+# Body POST /scoring/health-score (data ICS) untuk benchmark dan load test
+HEALTH_SCORE_BODY = {
+    "bill_late_in_3m": False, "bill_total_late": 1, "bill_cv": 0.2, "bill_ratio": 0.15,
+    "mobile_avg_topup": 150000, "mobile_topup_cv": 0.2, "mobile_number_age": 4,
+    "mobile_has_banking": True, "mobile_has_gambling": False,
+    "tax_has_npwp": True, "tax_provides_npwp": True,
+    "credit_has_failed": False, "credit_active_loans": 1,
+}
+
+
+def _user_profile(rng):
+    business = rng.choice(list(BUSINESS_PROFILES))
+    return {
+        "business": business,
+        "daily_income": rng.uniform(300_000, 5_000_000),
+        "expense_ratio": rng.uniform(0.55, 1.1),
+        "trend": rng.uniform(-0.3, 0.6),  # perubahan omzet relatif sepanjang periode
+        "weekend_boost": rng.uniform(0.9, 1.6),
+        "non_sales_share": rng.choice([0, 0, 0.02, 0.05]),
+    }
+
+
+def _user_transactions(rng, user_id, profile, count, start_date, days):
+    templates = BUSINESS_PROFILES[profile["business"]]
+    rows = []
+    for _ in range(count):
+        offset = rng.randrange(days)
+        day = start_date + timedelta(days=offset)
+        level = profile["daily_income"] * (1 + profile["trend"] * offset / days)
+        if day.weekday() >= 5:
+            level *= profile["weekend_boost"]
+
+        roll = rng.random()
+        if roll < profile["non_sales_share"]:
+            trx_type, description = "pemasukan", rng.choice(NON_SALES_INCOME)
+            amount = level * rng.uniform(5, 20)
+        elif roll < 0.5 + profile["non_sales_share"]:
+            trx_type, description = "pemasukan", rng.choice(templates["income"])
+            amount = level * rng.uniform(0.3, 1.7)
+        else:
+            trx_type, description = "pengeluaran", rng.choice(templates["expense"])
+            amount = level * profile["expense_ratio"] * rng.uniform(0.3, 1.7)
+        rows.append({
+            "user_id": user_id,
+            "type": trx_type,
+            "description": description,
+            "amount": round(amount, -2),
+            "date": day,
+        })
+    return rows
+
+
+def sample_transaction_items(rng, count, days=365):
+    """`count` transaksi satu user acak dalam format body POST /transactions/add?mode=bulk."""
+    start_date = date.today() - timedelta(days=days - 1)
+    rows = _user_transactions(rng, None, _user_profile(rng), count, start_date, days)
+    return [
+        {"type": row["type"], "description": row["description"], "amount": row["amount"],
+         "date": row["date"].isoformat()}
+        for row in rows
+    ]
+
+
+def _insert_chunked(table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(insert(table), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def generate_dataset(users=1000, transactions=50000, days=365, seed=42):
+    """
+    Buat `users` user dengan total `transactions` transaksi tersebar di `days` hari
+    terakhir (harus dipanggil di app context, pada database kosong). Mengembalikan
+    list id user yang dibuat.
+    """
+    rng = random.Random(seed)
+    start_date = date.today() - timedelta(days=days - 1)
+    per_user = [transactions // users + (1 if i < transactions % users else 0) for i in range(users)]
+
+    db.session.execute(insert(User.__table__), [
+        {"id": user_id, "username": f"umkm_{user_id}", "password": "-"} for user_id in range(1, users + 1)
+    ])
+
+    transaction_rows, application_rows, activity_rows = [], [], []
+    for user_id, count in zip(range(1, users + 1), per_user):
+        profile = _user_profile(rng)
+        transaction_rows.extend(_user_transactions(rng, user_id, profile, count, start_date, days))
+        for _ in range(rng.randint(0, 12)):
+            application_rows.append({
+                "user_id": user_id,
+                "borrower": rng.choice(BORROWERS),
+                "amount": round(rng.uniform(1_000_000, 50_000_000), -3),
+                "status": rng.choice(APPLICATION_STATUSES),
+                "date": start_date + timedelta(days=rng.randrange(days)),
+                "is_fraud": rng.random() < 0.05,
+            })
+        for _ in range(rng.randint(0, 8)):
+            activity_rows.append({
+                "user_id": user_id,
+                "title": rng.choice(ACTIVITY_TITLES),
+                "description": f"Aktivitas {profile['business']}",
+                "timestamp": datetime.combine(start_date, datetime.min.time())
+                + timedelta(minutes=rng.randrange(days * 24 * 60)),
+            })
+        if len(transaction_rows) >= INSERT_CHUNK_SIZE:
+            _insert_chunked(Transaction.__table__, transaction_rows)
+            transaction_rows = []
+
+    _insert_chunked(Transaction.__table__, transaction_rows)
+    _insert_chunked(Application.__table__, application_rows)
+    _insert_chunked(Activity.__table__, activity_rows)
+    db.session.commit()
+
+    rebuild_daily_totals()
+    return list(range(1, users + 1))
@@ -0,0 +1,401 @@
+# benchmarks/load_test.py
+"""
+Load test HTTP end-to-end: skenario user berbobot dikirim ke server sungguhan
+pada laju target (open loop, request per detik).
+
+    python -m benchmarks.load_test --spawn-server --rps 40 --duration 60 \\
+        --weights login=1,dashboard=4,chart=4,ocr=1,scoring=2 --llm-latency-ms 800
+
+Dengan --spawn-server, server dijalankan dari main.py (perintah bisa diganti
+lewat --server-cmd, mis. gunicorn) dengan LLM_BACKEND=fake dan
+FAKE_LLM_LATENCY_MS sehingga provider LLM diganti stub lokal. Tanpa opsi itu,
+server di --base-url harus sudah dijalankan dengan LLM_BACKEND=fake.
+
+Sebelum pengukuran, --users user didaftarkan lewat /user/register dan diberi
+--seed-transactions transaksi. Selama test, /metrics dibaca setiap detik untuk
+memantau saturasi pool database. Laporan: p50/p95/p99 dan error rate per
+endpoint, RPS tercapai, serta checkout/tunggu/timeout pool.
+
+Latensi diukur dari jadwal open loop (lihat Session), sehingga antrean di sisi
+load generator saat server jenuh tidak disembunyikan; porsi antre itu dilaporkan
+terpisah sebagai p95/p99 queue delay.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import secrets
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw
+
+from benchmarks.data_generator import HEALTH_SCORE_BODY, sample_transaction_items
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WEIGHTS = "login=1,dashboard=4,chart=4,ocr=1,scoring=2"
+CHART_RESOLUTIONS = ("daily", "weekly", "monthly", "yearly")
+# Bagian upload OCR yang memakai ulang nota yang sama (kena cache hasil OCR)
+OCR_REPEAT_SHARE = 0.2
+
+# Metrik /metrics yang dipantau untuk saturasi pool
+POOL_GAUGES = ("db_pool_size", "db_pool_checked_out", "db_pool_waiting", "db_pool_overflow")
+POOL_COUNTERS = ("db_pool_timeouts_total", "db_pool_wait_seconds_sum", "db_pool_wait_seconds_count")
+
+
+# --- Skenario (setiap langkah dicatat dengan nama endpoint-nya) ---
+
+def scenario_login(session):
+    session.request("POST /user/login", "POST", "/user/login",
+                    json={"username": session.user["username"], "password": session.user["password"]},
+                    auth=False)
+
+
+def scenario_dashboard(session):
+    session.request("GET /dashboard/summary", "GET", "/dashboard/summary")
+    session.request("GET /dashboard/financial-health", "GET", "/dashboard/financial-health")
+
+
+def scenario_chart(session):
+    resolution = session.rng.choice(CHART_RESOLUTIONS)
+    session.request(f"GET /transactions/chart ({resolution})", "GET", f"/transactions/chart?resolution={resolution}")
+    session.request("GET /transactions/metrics", "GET", "/transactions/metrics")
+
+
+def scenario_ocr(session):
+    image = session.receipt_image(repeat=session.rng.random() < OCR_REPEAT_SHARE)
+    session.request("POST /ocr/process-receipt", "POST", "/ocr/process-receipt",
+                    files={"image": ("nota.jpg", image, "image/jpeg")})
+
+
+def scenario_scoring(session):
+    session.request("POST /scoring/health-score", "POST", "/scoring/health-score", json=HEALTH_SCORE_BODY)
+
+
+SCENARIOS = {
+    "login": (scenario_login, 1),
+    "dashboard": (scenario_dashboard, 2),
+    "chart": (scenario_chart, 2),
+    "ocr": (scenario_ocr, 1),
+    "scoring": (scenario_scoring, 1),
+}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queue_delays = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, latency_ms, queue_ms=0.0, error=None):
+        with self._lock:
+            self.latencies[name].append(latency_ms)
+            self.queue_delays[name].append(queue_ms)
+            if error is not None:
+                self.errors[name][error] += 1
+
+
+class Session:
+    """
+    Satu eksekusi skenario untuk satu user virtual, dijadwalkan mulai pada `scheduled`
+    (time.perf_counter()).
+
+    Latensi diukur dari waktu request seharusnya dikirim, bukan dari saat thread
+    sempat mengirimnya: request pertama dari jadwal skenario, request berikutnya
+    dari selesainya request sebelumnya. Jika server lambat dan skenario menumpuk di
+    antrean executor, waktu antre itu ikut terhitung (tanpa coordinated omission)
+    dan juga dicatat terpisah sebagai queue delay.
+    """
+
+    _clients = threading.local()
+
+    def __init__(self, base_url, user, recorder, rng, timeout, scheduled):
+        self.base_url = base_url
+        self.user = user
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self._intended_start = scheduled
+
+    def _client(self):
+        client = getattr(self._clients, "client", None)
+        if client is None:
+            client = self._clients.client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        return client
+
+    def request(self, name, method, path, auth=True, **kwargs):
+        headers = {"Authorization": f"Bearer {self.user['token']}"} if auth else {}
+        intended = self._intended_start
+        started = time.perf_counter()
+        try:
+            response = self._client().request(method, path, headers=headers, **kwargs)
+            error = response.status_code if response.status_code >= 400 else None
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        self.recorder.record(name, (finished - intended) * 1000, max(started - intended, 0.0) * 1000, error)
+        self._intended_start = finished
+
+    def receipt_image(self, repeat):
+        """JPEG nota kecil; unik per upload kecuali `repeat` (nota dari kumpulan kecil yang sama)."""
+        seed = self.rng.randrange(5) if repeat else uuid.uuid4().int
+        rng = random.Random(seed)
+        image = Image.new("RGB", (600, 900), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(12):
+            draw.text((40, 60 + line * 60), f"Item {rng.randrange(1000)}  Rp {rng.randrange(1, 500) * 1000}", fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=80)
+        return buffer.getvalue()
+
+
+# --- Persiapan user dan server ---
+
+def prepare_users(base_url, count, seed_transactions, rng, timeout):
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    with httpx.Client(base_url=base_url, timeout=timeout) as client:
+        for i in range(count):
+            user = {"username": f"loadtest_{run_id}_{i}", "password": uuid.uuid4().hex}
+            response = client.post("/user/register", json=user)
+            response.raise_for_status()
+            user["token"] = response.json()["access_token"]
+            if seed_transactions:
+                client.post(
+                    "/transactions/add?mode=bulk",
+                    json={"items": sample_transaction_items(rng, seed_transactions)},
+                    headers={"Authorization": f"Bearer {user['token']}"},
+                ).raise_for_status()
+            users.append(user)
+    return users
+
+
+def spawn_server(args):
+    # /metrics tertutup tanpa METRICS_TOKEN; server lokal memakai token acak jika tidak diberikan
+    args.metrics_token = args.metrics_token or secrets.token_urlsafe(16)
+    env = dict(os.environ, LLM_BACKEND="fake", FAKE_LLM_LATENCY_MS=str(args.llm_latency_ms),
+               METRICS_TOKEN=args.metrics_token)
+    command = shlex.split(args.server_cmd) if args.server_cmd else [
+        sys.executable, "-m", "flask", "--app", "main", "run", "--port", str(args.port), "--with-threads", "--no-reload"
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(args.base_url + "/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                raise SystemExit(f"Server berhenti saat startup (exit code {process.returncode}).")
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("Server tidak merespons dalam 60 detik.")
+
+
+# --- Pemantauan /metrics ---
+
+def parse_metrics(text):
+    """Sampel metrik tanpa label dari teks Prometheus: {nama: nilai}."""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, _, value = line.partition(" ")
+            values[name] = float(value)
+    return values
+
+
+class PoolSampler(threading.Thread):
+    def __init__(self, base_url, metrics_token, interval=1.0):
+        super().__init__(daemon=True)
+        self.client = httpx.Client(base_url=base_url, timeout=5)
+        self.headers = {"Authorization": f"Bearer {metrics_token}"} if metrics_token else {}
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def scrape(self):
+        try:
+            response = self.client.get("/metrics", headers=self.headers)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return None
+        return parse_metrics(response.text)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            sample = self.scrape()
+            if sample is not None:
+                self.samples.append(sample)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def pool_report(before, after, samples):
+    if not samples or before is None or after is None:
+        return None
+    report = {
+        f"{name}_max": max(sample.get(name, 0) for sample in samples) for name in POOL_GAUGES
+    }
+    report["db_pool_checked_out_mean"] = round(float(np.mean([s.get("db_pool_checked_out", 0) for s in samples])), 2)
+    report["samples_with_waiters_pct"] = round(
+        100 * sum(1 for s in samples if s.get("db_pool_waiting", 0) > 0) / len(samples), 1)
+    delta = {name: after.get(name, 0) - before.get(name, 0) for name in POOL_COUNTERS}
+    report["timeouts"] = int(delta["db_pool_timeouts_total"])
+    report["checkouts"] = int(delta["db_pool_wait_seconds_count"])
+    report["wait_ms_mean"] = round(
+        1000 * delta["db_pool_wait_seconds_sum"] / delta["db_pool_wait_seconds_count"], 3
+    ) if delta["db_pool_wait_seconds_count"] else 0.0
+    return report
+
+
+# --- Eksekusi ---
+
+def parse_weights(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Skenario tidak dikenal: {name} (pilihan: {', '.join(SCENARIOS)})")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def run_load(args, users, recorder):
+    """Mulai skenario pada laju tetap sehingga total request mendekati --rps."""
+    weights = parse_weights(args.weights)
+    names = list(weights)
+    probabilities = np.array([weights[name] for name in names]) / sum(weights.values())
+    requests_per_scenario = sum(p * SCENARIOS[name][1] for name, p in zip(names, probabilities))
+    interval = requests_per_scenario / args.rps
+
+    rng = random.Random(args.seed)
+    late_starts = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        tick = 0
+        while True:
+            scheduled = started + tick * interval
+            if scheduled - started >= args.duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.1:
+                late_starts += 1
+            name = rng.choices(names, weights=probabilities)[0]
+            session = Session(args.base_url, rng.choice(users), recorder, random.Random(rng.random()),
+                              args.timeout, scheduled)
+            executor.submit(SCENARIOS[name][0], session)
+            tick += 1
+    return {"scenarios_started": tick, "late_starts": late_starts, "elapsed_s": time.perf_counter() - started}
+
+
+def summarize(recorder, elapsed_s):
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        values = np.asarray(latencies)
+        queue = np.asarray(recorder.queue_delays[name])
+        error_count = sum(recorder.errors[name].values())
+        endpoints[name] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed_s, 2),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2),
+            "queue_p95_ms": round(float(np.percentile(queue, 95)), 2),
+            "queue_p99_ms": round(float(np.percentile(queue, 99)), 2),
+            "error_rate": round(error_count / len(values), 4),
+            "errors": {str(key): count for key, count in recorder.errors[name].items()},
+        }
+    return endpoints
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<42} {'req':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'antre p99':>10} {'error':>7}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<42} {stats['requests']:>6} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['queue_p99_ms']:>10.1f} {stats['error_rate'] * 100:>6.1f}%")
+    total = report["total"]
+    print(f"\nRPS tercapai: {total['rps']:.1f} (target {report['config']['rps']}), "
+          f"error rate {total['error_rate'] * 100:.2f}%, skenario terlambat mulai: {total['late_starts']}")
+    if report["pool"]:
+        pool = report["pool"]
+        print(f"Pool DB: size {pool['db_pool_size_max']:.0f}, checkout maks {pool['db_pool_checked_out_max']:.0f} "
+              f"(rata-rata {pool['db_pool_checked_out_mean']}), overflow maks {pool['db_pool_overflow_max']:.0f}, "
+              f"menunggu maks {pool['db_pool_waiting_max']:.0f} ({pool['samples_with_waiters_pct']}% sampel), "
+              f"tunggu rata-rata {pool['wait_ms_mean']} ms, timeout {pool['timeouts']}")
+    else:
+        print("Pool DB: /metrics tidak bisa dibaca (cek --metrics-token).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test HTTP dengan skenario user berbobot.")
+    parser.add_argument("--base-url", default=None, help="Default http://127.0.0.1:<port>.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--spawn-server", action="store_true", help="Jalankan server dengan stub LLM lokal.")
+    parser.add_argument("--server-cmd", help="Perintah server untuk --spawn-server (default: flask run --with-threads).")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="Latensi stub LLM (--spawn-server).")
+    parser.add_argument("--rps", type=float, default=20, help="Target request per detik.")
+    parser.add_argument("--duration", type=float, default=30, help="Lama pengukuran (detik).")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help="Bobot skenario, mis. " + DEFAULT_WEIGHTS)
+    parser.add_argument("--users", type=int, default=20, help="User virtual yang didaftarkan.")
+    parser.add_argument("--seed-transactions", type=int, default=300, help="Transaksi awal per user.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maksimum skenario berjalan bersamaan.")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout per request (detik).")
+    parser.add_argument("--metrics-token", default=os.getenv("METRICS_TOKEN", ""))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Simpan laporan sebagai JSON.")
+    args = parser.parse_args(argv)
+    args.base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+
+    server = spawn_server(args) if args.spawn_server else None
+    try:
+        users = prepare_users(args.base_url, args.users, args.seed_transactions,
+                              random.Random(args.seed), args.timeout)
+        recorder = Recorder()
+        sampler = PoolSampler(args.base_url, args.metrics_token)
+        before = sampler.scrape()
+        sampler.start()
+        result = run_load(args, users, recorder)
+        sampler.stop()
+        after = sampler.scrape()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    endpoints = summarize(recorder, result["elapsed_s"])
+    total_requests = sum(stats["requests"] for stats in endpoints.values())
+    total_errors = sum(sum(recorder.errors[name].values()) for name in endpoints)
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "metrics_token"},
+        "total": {
+            "requests": total_requests,
+            "rps": round(total_requests / result["elapsed_s"], 2),
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "scenarios_started": result["scenarios_started"],
+            "late_starts": result["late_starts"],
+        },
+        "endpoints": endpoints,
+        "pool": pool_report(before, after, sampler.samples),
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
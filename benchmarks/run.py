@@ -0,0 +1,209 @@
+# benchmarks/run.py
+"""
+Ukur latensi endpoint panas lewat Flask test client dan simpan hasilnya sebagai JSON.
+
+    python -m benchmarks.run [--users 1000] [--transactions 50000] [--days 365]
+                             [--repeat 30] [--db-uri URI] [--reset]
+                             [--output FILE] [--compare FILE]
+
+Setiap kasus dijalankan `--repeat` kali, bergiliran ke user sampel yang berbeda.
+Request pertama untuk setiap user dicatat sebagai "cold" (cache aplikasi kosong),
+sisanya "warm". Jumlah statement SQL per request ikut dicatat.
+
+Semua kasus berjalan di SQLite (default) maupun MySQL; gunakan --db-uri ke MySQL lokal
+untuk angka yang mewakili produksi (rencana query dan pool koneksi berbeda).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Tanpa jaringan: LLM memakai backend palsu (harus diset sebelum llm_gateway di-import)
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import numpy as np
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import func
+
+from app.models import db, User, Transaction
+from benchmarks.data_generator import HEALTH_SCORE_BODY, generate_dataset
+from dashboard_api import dashboard_blueprint
+from koneksi import engine_options
+from metrics_service import capture_sql
+from scoring_api import scoring_blueprint
+from transactions_api import transaction_bp
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_URI = f"sqlite:///{os.path.join(BENCHMARK_DIR, 'bench.db')}"
+SAMPLE_USERS = 10
+
+# (nama kasus, method, path, body JSON)
+CASES = [
+    *[(f"chart_{resolution}", "GET", f"/transactions/chart?resolution={resolution}", None)
+      for resolution in ("daily", "weekly", "monthly", "yearly")],
+    ("chart_daily_lttb", "GET", "/transactions/chart?max_points=60&downsample=lttb", None),
+    ("metrics", "GET", "/transactions/metrics", None),
+    ("metrics_monthly", "GET", "/transactions/metrics?breakdown=monthly", None),
+    ("report_csv", "GET", "/transactions/report?format=csv", None),
+    ("report_xlsx", "GET", "/transactions/report?format=xlsx", None),
+    ("health_score", "POST", "/scoring/health-score", HEALTH_SCORE_BODY),
+    ("dashboard_summary", "GET", "/dashboard/summary", None),
+]
+
+
+def create_app(db_uri):
+    app = Flask("benchmark")
+    app.config.update(
+        JWT_SECRET_KEY="benchmark-secret-key-benchmark-secret-key",
+        SQLALCHEMY_DATABASE_URI=db_uri,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    if db_uri.startswith("mysql"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options()
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(transaction_bp, url_prefix='/transactions')
+    app.register_blueprint(scoring_blueprint, url_prefix='/scoring')
+    app.register_blueprint(dashboard_blueprint)
+    return app
+
+
+def prepare_data(app, args):
+    """
+    Isi database jika masih kosong (atau jika --reset). Mengembalikan token JWT per
+    user sampel dan ukuran dataset yang sebenarnya ada di database.
+    """
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        if db.session.query(User.id).first() is None:
+            started = time.perf_counter()
+            generate_dataset(args.users, args.transactions, args.days, args.seed)
+            print(f"Data dibuat: {args.users} user, {args.transactions} transaksi "
+                  f"({time.perf_counter() - started:.1f} s)", file=sys.stderr)
+        user_ids = [row.id for row in db.session.query(User.id).order_by(User.id).limit(SAMPLE_USERS)]
+        dataset = {
+            "database": db.engine.dialect.name,
+            "users": db.session.query(func.count(User.id)).scalar(),
+            "transactions": db.session.query(func.count(Transaction.id)).scalar(),
+        }
+        return {user_id: create_access_token(identity=str(user_id)) for user_id in user_ids}, dataset
+
+
+def _summary(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {
+        "n": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def run_case(client, tokens, method, path, body, repeat):
+    user_ids = list(tokens)
+    seen = set()
+    cold, warm, sql_counts, errors = [], [], [], {}
+    for i in range(repeat):
+        user_id = user_ids[i % len(user_ids)]
+        headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+        with capture_sql() as statements:
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            response.get_data()  # response streaming (CSV) ikut dihitung sampai selesai
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+            continue
+        (warm if user_id in seen else cold).append(elapsed_ms)
+        seen.add(user_id)
+        sql_counts.append(len(statements))
+    return {
+        "cold": _summary(cold),
+        "warm": _summary(warm),
+        "all": _summary(cold + warm),
+        "sql_statements_per_request": round(float(np.mean(sql_counts)), 2) if sql_counts else None,
+        "errors": errors,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline):
+    """Cetak perubahan p50 per kasus dibanding hasil sebelumnya."""
+    print(f"\n{'kasus':<20} {'p50 lama':>10} {'p50 baru':>10} {'perubahan':>10}")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name, {}).get("all")
+        new = result["all"]
+        if not old or not new:
+            continue
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+        print(f"{name:<20} {old['p50_ms']:>10.2f} {new['p50_ms']:>10.2f} {change:>+9.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark endpoint panas dengan data UMKM sintetis.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=50000, help="Total transaksi semua user.")
+    parser.add_argument("--days", type=int, default=365, help="Panjang riwayat transaksi.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=30, help="Request per kasus.")
+    parser.add_argument("--db-uri", default=os.getenv("BENCH_DATABASE_URI", DEFAULT_DB_URI))
+    parser.add_argument("--reset", action="store_true", help="Hapus dan buat ulang semua tabel (HATI-HATI).")
+    parser.add_argument("--output", help="File hasil JSON (default benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", help="Hasil JSON sebelumnya untuk dibandingkan.")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.db_uri)
+    tokens, dataset = prepare_data(app, args)
+    client = app.test_client()
+
+    commit = _git_commit()
+    results = {}
+    for name, method, path, body in CASES:
+        results[name] = run_case(client, tokens, method, path, body, args.repeat)
+        summary = results[name]["all"]
+        status = f"p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms" if summary else "gagal"
+        errors = f" error {results[name]['errors']}" if results[name]["errors"] else ""
+        print(f"{name:<20} {status}{errors}", file=sys.stderr)
+
+    output = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            **dataset,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    path = args.output or os.path.join(BENCHMARK_DIR, "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Hasil disimpan di {path}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(output, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
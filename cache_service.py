@@ -0,0 +1,62 @@
+# cache_service.py
+"""
+Cache in-memory per proses dengan ukuran terbatas (LRU, opsional dengan TTL)
+dan penghitung hit/miss.
+
+Entri disimpan bersama versi data user (lihat rollup_service.get_data_version);
+entri dengan versi lama dianggap miss dan langsung ditimpa.
+
+Dengan `getsizeof`, `maxsize` dihitung dalam satuan ukuran nilai (mis. jumlah
+titik chart), bukan jumlah entri; nilai yang lebih besar dari `maxsize` tidak di-cache.
+"""
+import threading
+import time
+
+from cachetools import LRUCache, TTLCache
+
+
+class VersionedCache:
+    def __init__(self, name, maxsize, ttl=None, getsizeof=None, timer=time.monotonic):
+        self.name = name
+        entry_size = (lambda entry: getsizeof(entry[1])) if getsizeof else None
+        self._entries = (
+            TTLCache(maxsize=maxsize, ttl=ttl, timer=timer, getsizeof=entry_size) if ttl
+            else LRUCache(maxsize=maxsize, getsizeof=entry_size)
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, value):
+        with self._lock:
+            try:
+                self._entries[key] = (version, value)
+            except ValueError:
+                # Nilai lebih besar dari maxsize (hanya dengan getsizeof): tidak di-cache
+                self._entries.pop(key, None)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "currsize": self._entries.currsize,
+                "maxsize": self._entries.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
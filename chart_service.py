@@ -0,0 +1,213 @@
+# chart_service.py
+"""
+Deret chart pemasukan/pengeluaran untuk /transactions/chart.
+
+Baris harian dibaca dari 'daily_totals' dengan satu query (tanpa fungsi tanggal
+khusus MySQL seperti yearweek/date_format), lalu dikelompokkan per periode dengan
+NumPy. Periode tanpa transaksi tetap muncul dengan nilai 0. Jika `max_points`
+diberikan dan jumlah periode melebihinya, deret diperkecil dengan:
+
+- "bucket": rata-rata periode berurutan per bucket (default),
+- "lttb": Largest-Triangle-Three-Buckets, memilih periode asli yang paling
+  menjaga bentuk kurva pemasukan dan pengeluaran.
+
+Tanpa `max_points`, response tetap dibatasi CHART_MAX_POINTS titik.
+
+Hasil di-cache per (user, resolusi, rentang, max_points, metode) sampai data
+transaksi user berubah.
+"""
+import os
+from datetime import date
+
+import numpy as np
+
+from app.models import db, DailyTotal
+from cache_service import VersionedCache
+from rollup_service import get_data_version
+
+CHART_RESOLUTIONS = ("daily", "weekly", "monthly", "yearly")
+DOWNSAMPLE_METHODS = ("bucket", "lttb")
+# Batas periode setelah gap-filling (~55 tahun harian), agar rentang ekstrem ditolak sebelum dihitung
+MAX_CHART_PERIODS = int(os.getenv("MAX_CHART_PERIODS", 20000))
+# Titik maksimum per response; juga dipakai sebagai max_points jika tidak diberikan
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 2000))
+
+# Ukuran cache dihitung dalam jumlah titik (bukan entri), jadi memori tetap terbatas
+# berapa pun variasi rentang tanggal yang diminta
+chart_cache = VersionedCache(
+    "transaction_chart", maxsize=int(os.getenv("CHART_CACHE_POINTS", 200000)), getsizeof=len
+)
+
+
+class ChartRangeTooLarge(ValueError):
+    """Rentang tanggal menghasilkan lebih dari MAX_CHART_PERIODS periode."""
+
+
+def period_start(days, resolution):
+    """Tanggal awal periode (datetime64[D]) untuk setiap tanggal; minggu dimulai hari Minggu."""
+    if resolution == "daily":
+        return days
+    if resolution == "weekly":
+        # 1970-01-01 adalah hari Kamis, jadi (hari + 4) % 7 = jarak dari hari Minggu sebelumnya
+        offset = days.astype(np.int64)
+        return (offset - (offset + 4) % 7).astype("datetime64[D]")
+    unit = "M" if resolution == "monthly" else "Y"
+    return days.astype(f"datetime64[{unit}]").astype("datetime64[D]")
+
+
+def _period_range(first, last, resolution):
+    if resolution == "daily":
+        return np.arange(first, last + 1, dtype="datetime64[D]")
+    if resolution == "weekly":
+        return np.arange(first, last + 1, 7, dtype="datetime64[D]")
+    unit = "M" if resolution == "monthly" else "Y"
+    return np.arange(
+        first.astype(f"datetime64[{unit}]"), last.astype(f"datetime64[{unit}]") + 1
+    ).astype("datetime64[D]")
+
+
+def period_label(start, resolution):
+    """Label periode, sama dengan format lama (minggu mengikuti YEARWEEK mode 0 MySQL)."""
+    if resolution == "daily":
+        return str(start)
+    if resolution == "weekly":
+        start = start.astype(object)
+        return f"Minggu ke-{(start.timetuple().tm_yday - 1) // 7 + 1:02d}, {start.year}"
+    if resolution == "monthly":
+        return str(start)[:7]
+    return str(start)[:4]
+
+
+def _load_daily_rows(user_id, start_date, end_date):
+    query = db.session.query(
+        DailyTotal.date, DailyTotal.income, DailyTotal.expense
+    ).filter(DailyTotal.user_id == user_id)
+    if start_date:
+        query = query.filter(DailyTotal.date >= start_date)
+    if end_date:
+        query = query.filter(DailyTotal.date <= end_date)
+    rows = query.all()
+    return (
+        np.array([row.date for row in rows], dtype="datetime64[D]"),
+        np.array([row.income for row in rows], dtype=float),
+        np.array([row.expense for row in rows], dtype=float),
+    )
+
+
+def build_chart_series(user_id, resolution, start_date=None, end_date=None):
+    """
+    (awal periode, pemasukan, pengeluaran) untuk setiap periode dari `start_date`
+    (atau transaksi pertama) sampai `end_date` (atau transaksi terakhir), termasuk periode kosong.
+    """
+    days, income, expense = _load_daily_rows(user_id, start_date, end_date)
+    if start_date is None and end_date is None and len(days) == 0:
+        return np.array([], dtype="datetime64[D]"), np.zeros(0), np.zeros(0)
+
+    first = np.datetime64(start_date, "D") if start_date else days.min() if len(days) else np.datetime64(end_date, "D")
+    last = np.datetime64(end_date, "D") if end_date else days.max() if len(days) else np.datetime64(start_date, "D")
+    if last < first:
+        return np.array([], dtype="datetime64[D]"), np.zeros(0), np.zeros(0)
+
+    first, last = period_start(np.array([first, last]), resolution)
+    if (last - first).astype(np.int64) > MAX_CHART_PERIODS * 7:
+        raise ChartRangeTooLarge("Rentang tanggal terlalu panjang untuk resolusi ini")
+    periods = _period_range(first, last, resolution)
+    if len(periods) > MAX_CHART_PERIODS:
+        raise ChartRangeTooLarge("Rentang tanggal terlalu panjang untuk resolusi ini")
+
+    index = np.searchsorted(periods, period_start(days, resolution))
+    return (
+        periods,
+        np.bincount(index, weights=income, minlength=len(periods)),
+        np.bincount(index, weights=expense, minlength=len(periods)),
+    )
+
+
+# --- Downsampling ---
+
+def bucket_average(values, max_points):
+    """Rata-rata per bucket berurutan; mengembalikan (nilai per bucket, index awal, index akhir)."""
+    edges = np.linspace(0, len(values), max_points + 1).astype(np.int64)
+    starts = edges[:-1]
+    sums = np.add.reduceat(values, starts, axis=0)
+    return sums / np.diff(edges)[:, None], starts, edges[1:] - 1
+
+
+def lttb_indices(values, max_points):
+    """
+    Index titik terpilih LTTB untuk deret 2-D (periode x seri). Luas segitiga
+    dijumlahkan untuk semua seri, sehingga lonjakan pemasukan maupun pengeluaran terjaga.
+    Titik pertama dan terakhir selalu ikut.
+    """
+    n = len(values)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = [0]
+    for b in range(max_points - 2):
+        start, end = edges[b], edges[b + 1]
+        # Titik pembanding: rata-rata bucket berikutnya (atau titik terakhir)
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = values[end:next_end].mean(axis=0) if next_end > end else values[-1]
+        prev = selected[-1]
+        area = np.abs(
+            (x[prev] - next_x) * (values[start:end] - values[prev])
+            - (x[prev] - x[start:end, None]) * (next_y - values[prev])
+        ).sum(axis=1)
+        selected.append(start + int(area.argmax()))
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def _chart_points(periods, income, expense, resolution, max_points, method):
+    if not max_points or len(periods) <= max_points:
+        return [
+            {"date": period_label(p, resolution), "income": float(i), "expense": float(e)}
+            for p, i, e in zip(periods, income, expense)
+        ]
+
+    values = np.column_stack([income, expense])
+    if method == "lttb":
+        return [
+            {"date": period_label(periods[k], resolution), "income": float(income[k]), "expense": float(expense[k])}
+            for k in lttb_indices(values, max_points)
+        ]
+
+    averages, starts, ends = bucket_average(values, max_points)
+    return [
+        {
+            "date": period_label(periods[s], resolution),
+            "end_date": period_label(periods[e], resolution),
+            "income": round(float(avg[0]), 2),
+            "expense": round(float(avg[1]), 2),
+        }
+        for avg, s, e in zip(averages, starts, ends)
+    ]
+
+
+def _normalize_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError("Format tanggal harus YYYY-MM-DD") from None
+
+
+def get_chart(user_id, resolution, start_date=None, end_date=None, max_points=None, method="bucket"):
+    """Titik chart ({"date", "income", "expense"}, plus "end_date" untuk bucket), dari cache jika bisa."""
+    user_id = int(user_id)
+    # Dinormalisasi ke YYYY-MM-DD sebelum dipakai sebagai kunci cache dan batas rentang
+    start_date, end_date = _normalize_date(start_date), _normalize_date(end_date)
+
+    max_points = min(max_points or CHART_MAX_POINTS, CHART_MAX_POINTS)
+    key = (user_id, resolution, start_date, end_date, max_points, method)
+    version = get_data_version(user_id)
+    points = chart_cache.get(key, version)
+    if points is None:
+        periods, income, expense = build_chart_series(user_id, resolution, start_date, end_date)
+        points = _chart_points(periods, income, expense, resolution, max_points, method)
+        chart_cache.set(key, version, points)
+    return points
@@ -0,0 +1,188 @@
+# classification_service.py
+"""
+Klasifikasi kategori transaksi dengan jalur cepat lokal.
+
+Urutan pencarian untuk setiap deskripsi (setelah dinormalisasi):
+1. aturan kata kunci lokal untuk kategori yang jelas (Gaji, Sewa, Utilitas, ...),
+2. cache LRU in-memory per proses,
+3. cache permanen di tabel 'transaction_categories',
+4. sisanya dikirim ke AI sekaligus dalam beberapa batch (CLASSIFY_BATCH_SIZE
+   deskripsi per panggilan), lalu disimpan ke kedua cache.
+Deskripsi yang sama dalam satu batch hanya diklasifikasikan sekali.
+"""
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime
+
+from app.models import db, TransactionCategory
+from cache_service import VersionedCache
+from groq_service import classify_transactions_batch
+
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", 40))
+CLASSIFY_CACHE_SIZE = int(os.getenv("CLASSIFY_CACHE_SIZE", 20000))
+# Naikkan jika prompt atau daftar kategori berubah agar isi cache in-memory lama tidak dipakai
+CLASSIFIER_VERSION = 1
+
+# Urutan penting: aturan pertama yang cocok dipakai ("bayar cicilan motor" -> Pinjaman, bukan Aset Tetap)
+CATEGORY_RULES = [
+    ("Gaji", r"\b(gaji|upah|honor|honorarium|thr|lembur|insentif karyawan)\b"),
+    ("Sewa", r"\b(sewa|kontrakan|kontrak tempat|kos kios)\b"),
+    ("Utilitas", r"\b(listrik|pln|token listrik|pdam|air bersih|internet|wifi|indihome|pulsa|telepon|telpon)\b"),
+    ("Pinjaman", r"\b(pinjaman|pinjam|kredit|cicilan|angsuran|kur)\b"),
+    ("Suntikan Dana", r"\b(suntikan dana|setoran modal|tambahan modal|modal usaha|investor)\b"),
+    ("Marketing", r"\b(iklan|promosi|promo|ads|endorse|brosur|spanduk|banner)\b"),
+    ("Aset Tetap", r"\b(mesin|kendaraan|motor|mobil|laptop|komputer|etalase|freezer|kulkas|renovasi)\b"),
+    ("Bahan Baku", r"\b(bahan baku|bahan|kulakan|stok|restock|belanja bahan)\b"),
+    ("Penjualan", r"\b(penjualan|jual|terjual|omzet|omset)\b"),
+]
+_COMPILED_RULES = [(category, re.compile(pattern)) for category, pattern in CATEGORY_RULES]
+
+_NOISE = re.compile(r"\brp\b|[^a-z\s]+")
+_SPACES = re.compile(r"\s+")
+
+memory_cache = VersionedCache("transaction_category", CLASSIFY_CACHE_SIZE)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "descriptions": 0,
+    "duplicates": 0,
+    "rule_hits": 0,
+    "memory_hits": 0,
+    "db_hits": 0,
+    "llm_descriptions": 0,
+    "llm_calls": 0,
+    "llm_failures": 0,
+}
+_table_ready = False
+
+
+def _ensure_table():
+    global _table_ready
+    if not _table_ready:
+        TransactionCategory.__table__.create(db.engine, checkfirst=True)
+        _table_ready = True
+
+
+def normalize_description(description):
+    """Huruf kecil tanpa angka, nominal, dan tanda baca: 'Bayar Listrik Rp 150.000 (Mei)' -> 'bayar listrik mei'."""
+    return _SPACES.sub(" ", _NOISE.sub(" ", (description or "").lower())).strip()
+
+
+def match_rule(normalized):
+    for category, pattern in _COMPILED_RULES:
+        if pattern.search(normalized):
+            return category
+    return None
+
+
+def _description_hash(normalized):
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _load_from_db(normalized_list):
+    _ensure_table()
+    hashes = {_description_hash(n): n for n in normalized_list}
+    rows = db.session.query(
+        TransactionCategory.description_hash, TransactionCategory.category
+    ).filter(TransactionCategory.description_hash.in_(list(hashes))).all()
+    return {hashes[row.description_hash]: row.category for row in rows}
+
+
+def _store_in_db(classified):
+    now = datetime.utcnow()
+    for normalized, category in classified.items():
+        db.session.merge(TransactionCategory(
+            description_hash=_description_hash(normalized),
+            description=normalized,
+            category=category,
+            created_at=now
+        ))
+    db.session.commit()
+
+
+def _record(**counts):
+    with _stats_lock:
+        for key, value in counts.items():
+            _stats[key] += value
+
+
+def classify_transactions(descriptions):
+    """Kategori untuk setiap deskripsi, dengan urutan yang sama seperti input."""
+    normalized_list = [normalize_description(d) for d in descriptions]
+    unique = list(dict.fromkeys(normalized_list))
+    resolved = {}
+    rule_hits = memory_hits = 0
+
+    for normalized in unique:
+        if not normalized:
+            resolved[normalized] = "Lainnya"
+            continue
+        category = match_rule(normalized)
+        if category:
+            rule_hits += 1
+        else:
+            category = memory_cache.get(normalized, CLASSIFIER_VERSION)
+            if category:
+                memory_hits += 1
+        if category:
+            resolved[normalized] = category
+
+    pending = [n for n in unique if n not in resolved]
+    from_db = _load_from_db(pending) if pending else {}
+    for normalized, category in from_db.items():
+        memory_cache.set(normalized, CLASSIFIER_VERSION, category)
+    resolved.update(from_db)
+
+    pending = [n for n in pending if n not in resolved]
+    llm_calls = llm_failures = 0
+    classified = {}
+    for start in range(0, len(pending), CLASSIFY_BATCH_SIZE):
+        chunk = pending[start:start + CLASSIFY_BATCH_SIZE]
+        llm_calls += 1
+        categories = classify_transactions_batch(chunk)
+        if categories is None:
+            # Gagal sementara: kembalikan 'Lainnya' tanpa di-cache agar dicoba lagi lain kali
+            llm_failures += 1
+            resolved.update(dict.fromkeys(chunk, "Lainnya"))
+            continue
+        classified.update(zip(chunk, categories))
+
+    if classified:
+        for normalized, category in classified.items():
+            memory_cache.set(normalized, CLASSIFIER_VERSION, category)
+        _store_in_db(classified)
+        resolved.update(classified)
+
+    _record(
+        descriptions=len(descriptions),
+        duplicates=len(descriptions) - len(unique),
+        rule_hits=rule_hits,
+        memory_hits=memory_hits,
+        db_hits=len(from_db),
+        llm_descriptions=len(pending),
+        llm_calls=llm_calls,
+        llm_failures=llm_failures,
+    )
+    return [resolved[n] for n in normalized_list]
+
+
+def classify_transaction(description):
+    """Versi satu deskripsi dari classify_transactions (memakai cache dan aturan yang sama)."""
+    return classify_transactions([description])[0]
+
+
+def classification_stats():
+    """
+    Statistik kumulatif per proses. `llm_calls_avoided` dibandingkan dengan cara lama
+    (satu panggilan AI per deskripsi); `hit_ratio` adalah porsi deskripsi yang
+    terjawab tanpa AI (aturan, duplikat, atau cache).
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    answered_locally = stats["descriptions"] - stats["llm_descriptions"]
+    stats["llm_calls_avoided"] = stats["descriptions"] - stats["llm_calls"]
+    stats["hit_ratio"] = round(answered_locally / stats["descriptions"], 4) if stats["descriptions"] else 0.0
+    stats["memory_cache"] = memory_cache.stats()
+    return stats
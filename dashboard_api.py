@@ -1,139 +1,136 @@
-from flask import Blueprint, jsonify, request # <--- PASTIKAN 'request' ADA DI SINI!
+from flask import Blueprint, jsonify, request, Response, stream_with_context # <--- PASTIKAN 'request' ADA DI SINI!
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from koneksi import get_conn
+from sqlalchemy import func, case, extract
+from app.models import db, Application, Activity, DailyTotal
+from rollup_service import get_data_version
 from datetime import datetime, timedelta
 import random
 from collections import defaultdict # Pastikan ini diimpor jika digunakan di run_prediction_model
 import decimal # <-- Tambahkan impor ini
 import os # Add this import
-import google.generativeai as genai # Add this import
 import requests # Add this import for making HTTP requests (though genai handles it)
 from dotenv import load_dotenv # Add this import
 import json
+import hashlib
+import logging
+import time
+from cache_service import VersionedCache
+from llm_gateway import gemini_generate, gemini_generate_stream, LLMUnavailable
+from ai_context_service import get_financial_context, estimate_tokens
+from forecast_service import get_user_forecast, forecast_users, FORECAST_HORIZONS
+from user_api import admin_required
 
 
 # Load environment variables
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set. Please set it in your .env file.")
-genai.configure(api_key=GEMINI_API_KEY)
 
-try:
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    print(f"Menggunakan model Gemini: {model.model_name}")
-except Exception as e:
-    print(f"Gagal menginisialisasi model Gemini: {e}")
-    model = None
+dashboard_blueprint = Blueprint('dashboard', __name__)
+logger = logging.getLogger(__name__)
 
+# Cache ringkasan dashboard per user. Entri ditandai dengan versi data transaksi
+# user, jadi transaksi baru langsung terlihat. Tabel applications/activities tidak
+# ditulis oleh aplikasi ini (diisi proses lain), sehingga perubahannya hanya
+# terlihat setelah entri kedaluwarsa: paling lama DASHBOARD_CACHE_TTL detik.
+dashboard_cache = VersionedCache(
+    "dashboard_summary",
+    maxsize=int(os.getenv("DASHBOARD_CACHE_SIZE", 10000)),
+    ttl=int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+)
+
+
+# Nama bulan seperti DATE_FORMAT(date, '%b') MySQL (tidak bergantung locale server)
+MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def monthly_applications_query(user_id):
+    """
+    Jumlah aplikasi dan fraud per bulan kalender (bulan yang sama dari tahun berbeda
+    digabung, seperti GROUP BY DATE_FORMAT(date, '%b') sebelumnya), urut dari bulan
+    dengan tanggal paling awal. extract() berlaku di MySQL maupun SQLite.
+    """
+    month = extract('month', Application.date)
+    return db.session.query(
+        month.label('month'),
+        func.count().label('value'),
+        func.coalesce(func.sum(case((Application.is_fraud == True, 1), else_=0)), 0).label('fraud')
+    ).filter(Application.user_id == user_id).group_by(month).order_by(func.min(Application.date))
+
+
+def _load_totals(user_id):
+    return db.session.query(
+        func.sum(DailyTotal.income).label('income'),
+        func.sum(DailyTotal.expense).label('expense')
+    ).filter(DailyTotal.user_id == user_id).one()
+
+
+def _load_dashboard_summary(user_id):
+    # Chart data (per bulan) sekaligus total aplikasi dan jumlah fraud
+    monthly_rows = monthly_applications_query(user_id).all()
+    total_applications = sum(int(row.value) for row in monthly_rows)
+    fraud_count = sum(int(row.fraud) for row in monthly_rows)
+    chart_data = [{"month": MONTH_ABBR[int(row.month) - 1], "value": row.value} for row in monthly_rows]
+
+    # Fraud rate
+    fraud_rate = int((fraud_count / total_applications) * 100) if total_applications > 0 else 0
+
+    # Recent activities
+    recent_activities = [row._asdict() for row in db.session.query(
+        Activity.id, Activity.title, Activity.timestamp, Activity.description
+    ).filter(Activity.user_id == user_id).order_by(Activity.timestamp.desc()).limit(5)]
+
+    # Latest applications
+    latest_applications = [row._asdict() for row in db.session.query(
+        Application.id, Application.borrower, Application.amount, Application.status, Application.date
+    ).filter(Application.user_id == user_id).order_by(Application.date.desc()).limit(5)]
+
+    # ✅ Hitung pemasukan dan pengeluaran (dari rollup harian)
+    totals = _load_totals(user_id)
+    income = totals.income or 0
+    expense = totals.expense or 0
+
+    margin = round(((income - expense) / income) * 100, 2) if income > 0 else 0
+
+    # ✅ Tambahkan 'margin' ke response
+    return {
+        "fraud_count": fraud_count,
+        "total_applications": total_applications,
+        "fraud_rate": fraud_rate,
+        "growth_percentage": 15,
+        "chart_data": chart_data,
+        "recent_activities": recent_activities,
+        "latest_applications": latest_applications,
+        "income": income,                 # ← Ditambahkan
+        "expense": expense,              # ← Ditambahkan
+        "margin": margin                 # ← Sudah ada
+    }
 
-dashboard_blueprint = Blueprint('dashboard', __name__)
 
 @dashboard_blueprint.route('/dashboard/summary', methods=['GET'])
 @jwt_required()
 def dashboard_summary():
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
 
     try:
-        with get_conn() as conn:
-            cur = conn.cursor(dictionary=True)
-
-            # Total aplikasi
-            cur.execute("SELECT COUNT(*) as total FROM applications WHERE user_id = %s", (user_id,))
-            total_applications = cur.fetchone()['total']
-
-            # Jumlah fraud
-            cur.execute("SELECT COUNT(*) as fraud FROM applications WHERE user_id = %s AND is_fraud = 1", (user_id,))
-            fraud_count = cur.fetchone()['fraud']
-
-            # Fraud rate
-            fraud_rate = int((fraud_count / total_applications) * 100) if total_applications > 0 else 0
-
-            # Chart data (per bulan)
-            cur.execute("""
-                SELECT DATE_FORMAT(date, '%%b') as month, COUNT(*) as value
-                FROM applications
-                WHERE user_id = %s
-                GROUP BY DATE_FORMAT(date, '%%b')
-                ORDER BY MIN(date)
-
-            """, (user_id,))
-            chart_data = cur.fetchall()
-
-            # Customer composition
-            cur.execute("""
-                SELECT category AS name, COUNT(*) as value
-                FROM customers
-                WHERE user_id = %s
-                GROUP BY category
-            """, (user_id,))
-            customer_composition = cur.fetchall()
-
-            # Recent activities
-            cur.execute("""
-                SELECT id, title, timestamp, description
-                FROM activities
-                WHERE user_id = %s
-                ORDER BY timestamp DESC
-                LIMIT 5
-            """, (user_id,))
-            recent_activities = cur.fetchall()
-
-            # Latest applications
-            cur.execute("""
-                SELECT id, borrower, amount, status, date
-                FROM applications
-                WHERE user_id = %s
-                ORDER BY date DESC
-                LIMIT 5
-            """, (user_id,))
-            latest_applications = cur.fetchall()
-
-            # ✅ Hitung pemasukan dan pengeluaran
-            cur.execute("""
-                SELECT SUM(amount) AS income
-                FROM transactions
-                WHERE user_id = %s AND type = 'pemasukan'
-            """, (user_id,))
-            income = cur.fetchone()['income'] or 0
-
-            cur.execute("""
-                SELECT SUM(amount) AS expense
-                FROM transactions
-                WHERE user_id = %s AND type = 'pengeluaran'
-            """, (user_id,))
-            expense = cur.fetchone()['expense'] or 0
-
-            margin = round(((income - expense) / income) * 100, 2) if income > 0 else 0
-
-            # ✅ Tambahkan 'margin' ke response
-            return jsonify({
-            "fraud_count": fraud_count,
-            "total_applications": total_applications,
-            "fraud_rate": fraud_rate,
-            "growth_percentage": 15,
-            "chart_data": chart_data,
-            # "customer_composition": customer_composition,
-            "recent_activities": recent_activities,
-            "latest_applications": latest_applications,
-            "income": income,                 # ← Ditambahkan
-            "expense": expense,              # ← Ditambahkan
-            "margin": margin                 # ← Sudah ada
-        })
+        version = get_data_version(user_id)
+        summary = dashboard_cache.get(user_id, version)
+        if summary is None:
+            summary = _load_dashboard_summary(user_id)
+            dashboard_cache.set(user_id, version, summary)
 
+        return jsonify(summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @dashboard_blueprint.route('/summary', methods=['GET'])
 def get_summary():
-    conn = get_conn()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM summary_data")
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM summary_data")
+        results = cursor.fetchall()
+        cursor.close()
     return jsonify(results)
 
 @dashboard_blueprint.route('/dashboard/financial-health', methods=['GET'])
@@ -142,69 +139,166 @@ def financial_health():
     user_id = get_jwt_identity()
 
     try:
-        with get_conn() as conn:
-            cur = conn.cursor(dictionary=True)
+        totals = _load_totals(user_id)
+        income = totals.income or 0
+        expense = totals.expense or 0
 
-            cur.execute("""
-                SELECT SUM(amount) AS income
-                FROM transactions
-                WHERE user_id = %s AND type = 'pemasukan'
-            """, (user_id,))
-            income = cur.fetchone()['income'] or 0
+        margin = round(((income - expense) / income) * 100, 2) if income > 0 else 0
 
-            cur.execute("""
-                SELECT SUM(amount) AS expense
-                FROM transactions
-                WHERE user_id = %s AND type = 'pengeluaran'
-            """, (user_id,))
-            expense = cur.fetchone()['expense'] or 0
+        return jsonify({
+            "income": income,
+            "expense": expense,
+            "margin": margin
+        })
 
-            margin = round(((income - expense) / income) * 100, 2) if income > 0 else 0
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Batas user per request /dashboard/forecast/batch (hanya admin; semua user lewat CLI 'flask forecast-batch')
+MAX_FORECAST_BATCH_USERS = 5000
+
+
+def _forecast_horizon(value):
+    try:
+        horizon = int(value)
+    except (TypeError, ValueError):
+        return None
+    return horizon if horizon in FORECAST_HORIZONS else None
 
-            return jsonify({
-                "income": income,
-                "expense": expense,
-                "margin": margin
-            })
 
+@dashboard_blueprint.route('/dashboard/forecast', methods=['GET'])
+@jwt_required()
+def cash_flow_forecast():
+    """Prakiraan pemasukan/pengeluaran harian ?days=30|60|90 ke depan (model lokal, tanpa AI)."""
+    horizon = _forecast_horizon(request.args.get('days', 30))
+    if horizon is None:
+        return jsonify({"error": f"Parameter 'days' harus salah satu dari {list(FORECAST_HORIZONS)}."}), 400
+
+    try:
+        return jsonify(get_user_forecast(get_jwt_identity(), horizon)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-# --- Fungsi-fungsi Pembantu (Harus Didefinisikan di Awal) ---
+@dashboard_blueprint.route('/dashboard/forecast/batch', methods=['POST'])
+@admin_required
+def cash_flow_forecast_batch():
+    """Body: {"user_ids": [1, 2, ...], "days": 30} -> total prakiraan per user (hanya admin, lihat ADMIN_USER_IDS)."""
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    horizon = _forecast_horizon(data.get('days', 30))
+    if not isinstance(user_ids, list) or not user_ids or not all(isinstance(uid, int) for uid in user_ids):
+        return jsonify({"error": "Field 'user_ids' harus berupa list integer yang tidak kosong."}), 400
+    if len(user_ids) > MAX_FORECAST_BATCH_USERS:
+        return jsonify({"error": f"Maksimal {MAX_FORECAST_BATCH_USERS} user per request. Gunakan CLI 'flask forecast-batch' untuk semua user."}), 400
+    if horizon is None:
+        return jsonify({"error": f"Field 'days' harus salah satu dari {list(FORECAST_HORIZONS)}."}), 400
+
+    try:
+        results = forecast_users(user_ids, horizon)
+        return jsonify({"results": results, "count": len(results)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Cache jawaban konsultasi untuk pertanyaan yang persis sama (setelah normalisasi).
+# Ringkasan keuangan user ikut menjadi bagian kunci, jadi jawaban otomatis
+# dihitung ulang saat data transaksinya berubah.
+# Naikkan CONSULTATION_PROMPT_VERSION jika isi prompt berubah.
+CONSULTATION_PROMPT_VERSION = 2
+consultation_cache = VersionedCache(
+    "ai_consultation",
+    maxsize=int(os.getenv("CONSULTATION_CACHE_SIZE", 5000)),
+    ttl=int(os.getenv("CONSULTATION_CACHE_TTL", 24 * 3600))
+)
+
+
+def consultation_cache_key(business_details, financial_context=""):
+    """sha256 dari business_details yang dinormalisasi (huruf kecil, spasi dirapikan) dan ringkasan keuangan."""
+    normalized = " ".join(str(business_details).lower().split())
+    return hashlib.sha256(f"{normalized}\n{financial_context}".encode("utf-8")).hexdigest()
+
+
+def _financial_context_section(financial_context):
+    if not financial_context:
+        return ""
+    lines = "\n".join("            " + line for line in financial_context.splitlines())
+    return f"""
+            Ringkasan data keuangan usaha ini dari aplikasi (Rp, rb = ribu, jt = juta):
+{lines}
+            Gunakan data ini untuk mempersonalisasi analisis dan saran.
+"""
+
+
+def _consultation_prompt(business_details, financial_context=""):
+    return f"""
+            Sebagai seorang ahli S3 konsultan bisnis AI yang memilik banyak pengalaman membantu bisnis hingga sukses, saya akan menganalisis informasi yang diberikan oleh seorang pengusaha UMKM (Usaha Mikro Kecil Menengah).
+            Berikut adalah detail yang diberikan pengusaha tentang bisnis mereka:
+
+            "{business_details}"
+{_financial_context_section(financial_context)}
+            Berdasarkan informasi ini, berikan analisis singkat dan saran strategis yang relevan dan personal untuk bisnis tersebut.
+            Fokus pada area seperti potensi pertumbuhan, manajemen keuangan, strategi pemasukan, dan efisiensi pengeluaran.
+            Berikan jawaban yang ramah, mudah dimengerti, dan langsung pada intinya serta jangan bertele tele. jangan gunakan teks bold karena nanti akan keluar **
+
+            Format respons Anda dalam JSON berikut:
+            {{
+                "analysis_summary": "Ringkasan analisis singkat tentang kondisi bisnis yang diceritakan.",
+                "strategic_advice": "Saran strategis personal untuk bisnis ini. (maksimal 200 kata, gunakan bullet points jika cocok)"
+            }}
+
+            Pastikan respons Anda dalam bahasa Indonesia yang baik dan benar.
+            """
+
 
-def get_recent_transactions_for_ai(user_id, days=90):
+def _prepare_consultation(user_id, business_details):
     """
-    Mengambil data transaksi terbaru dari database untuk user_id tertentu.
-    Akan digunakan sebagai konteks untuk model AI.
+    (prompt, cache_key, metrics) untuk satu konsultasi. `metrics` berisi ukuran
+    ringkasan keuangan dan prompt dalam token (estimasi) serta waktu membangun ringkasan.
     """
+    started = time.perf_counter()
     try:
-        with get_conn() as conn:
-            cur = conn.cursor(dictionary=True)
-            cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-
-            cur.execute("""
-                SELECT date, amount, type
-                FROM transactions
-                WHERE user_id = %s AND date >= %s
-                ORDER BY date ASC
-            """, (user_id, cutoff_date))
-            
-            transactions_raw = cur.fetchall()
-            
-            formatted_transactions = []
-            for tx in transactions_raw:
-                formatted_tx = tx.copy()
-                if isinstance(formatted_tx.get("amount"), decimal.Decimal):
-                    formatted_tx["amount"] = float(formatted_tx["amount"])
-                if isinstance(formatted_tx.get("date"), datetime):
-                    formatted_tx["date"] = formatted_tx["date"].strftime("%Y-%m-%d")
-                formatted_transactions.append(formatted_tx)
-                
-            return formatted_transactions
+        financial_context = get_financial_context(user_id)
     except Exception as e:
-        print(f"Error in get_recent_transactions_for_ai: {e}")
-        return [] # Return empty list on error
+        # Ringkasan hanya pelengkap; konsultasi tetap jalan tanpa data keuangan
+        logger.warning("Gagal membangun ringkasan keuangan user %s: %s", user_id, e)
+        financial_context = ""
+    context_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    prompt = _consultation_prompt(business_details, financial_context)
+    metrics = {
+        "context_tokens": estimate_tokens(financial_context),
+        "prompt_tokens": estimate_tokens(prompt),
+        "context_ms": context_ms,
+    }
+    logger.info("Ringkasan keuangan user %s: %d token dalam %s ms; prompt ~%d token.",
+                user_id, metrics["context_tokens"], context_ms, metrics["prompt_tokens"])
+    return prompt, consultation_cache_key(business_details, financial_context), metrics
+
+
+def _metrics_headers(metrics):
+    return {
+        "X-AI-Prompt-Tokens": str(metrics["prompt_tokens"]),
+        "X-AI-Context-Tokens": str(metrics["context_tokens"]),
+        "X-AI-Context-Ms": str(metrics["context_ms"]),
+    }
+
+
+def _parse_consultation(response_text):
+    """JSON konsultasi dari teks jawaban AI; melempar JSONDecodeError/ValueError jika formatnya salah."""
+    if response_text.startswith("```json") and response_text.endswith("```"):
+        json_str = response_text[7:-3].strip()
+    else:
+        json_str = response_text
+
+    print(f"[{datetime.now()}] Attempting to parse JSON string: {json_str[:500]}...")
+
+    ai_consultation_data = json.loads(json_str)
+
+    if not all(k in ai_consultation_data for k in ["analysis_summary", "strategic_advice"]):
+        raise ValueError("AI response format is incorrect or incomplete. Missing keys.")
+    return ai_consultation_data
 
 
 # --- REVISI UTAMA DI SINI: ENDPOINT KONSULTASI AI ---
@@ -212,10 +306,6 @@ def get_recent_transactions_for_ai(user_id, days=90):
 @jwt_required()
 def get_ai_consultation():
     print(f"[{datetime.now()}] Request received for /dashboard/predict ({request.method})")
-    
-    if model is None:
-        print(f"[{datetime.now()}] Error: AI model is not initialized.")
-        return jsonify({"error": "Failed to initialize AI model. Please check server logs."}), 500
 
     # Pastikan blok try ini memiliki indentasi yang benar (di bawah fungsi)
     try: # <--- INDENTASI TRY INI PENTING
@@ -238,47 +328,33 @@ def get_ai_consultation():
                 print(f"[{datetime.now()}] Error: business_details is empty.")
                 return jsonify({"error": "Detail bisnis tidak boleh kosong."}), 400
 
-            prompt = f"""
-            Sebagai seorang ahli S3 konsultan bisnis AI yang memilik banyak pengalaman membantu bisnis hingga sukses, saya akan menganalisis informasi yang diberikan oleh seorang pengusaha UMKM (Usaha Mikro Kecil Menengah).
-            Berikut adalah detail yang diberikan pengusaha tentang bisnis mereka:
-
-            "{user_business_details}"
-
-            Berdasarkan informasi ini, berikan analisis singkat dan saran strategis yang relevan dan personal untuk bisnis tersebut.
-            Fokus pada area seperti potensi pertumbuhan, manajemen keuangan, strategi pemasukan, dan efisiensi pengeluaran.
-            Berikan jawaban yang ramah, mudah dimengerti, dan langsung pada intinya serta jangan bertele tele. jangan gunakan teks bold karena nanti akan keluar **
-
-            Format respons Anda dalam JSON berikut:
-            {{
-                "analysis_summary": "Ringkasan analisis singkat tentang kondisi bisnis yang diceritakan.",
-                "strategic_advice": "Saran strategis personal untuk bisnis ini. (maksimal 200 kata, gunakan bullet points jika cocok)"
-            }}
-
-            Pastikan respons Anda dalam bahasa Indonesia yang baik dan benar.
-            """
+            prompt, cache_key, metrics = _prepare_consultation(user_id, user_business_details)
+            cached = consultation_cache.get(cache_key, CONSULTATION_PROMPT_VERSION)
+            if cached is not None:
+                print(f"[{datetime.now()}] Returning cached AI consultation.")
+                return jsonify(cached), 200, _metrics_headers(metrics)
             
             print(f"[{datetime.now()}] Sending prompt to Gemini. Prompt length: {len(prompt)} chars.")
-            response = model.generate_content(prompt, request_options={"timeout": 60})
+            response = gemini_generate(prompt, deadline=60)
             print(f"[{datetime.now()}] Received response from Gemini. Text length: {len(response.text)} chars.")
 
             response_text = response.text.strip()
-            if response_text.startswith("```json") and response_text.endswith("```"):
-                json_str = response_text[7:-3].strip()
-            else:
-                json_str = response_text
-            
-            print(f"[{datetime.now()}] Attempting to parse JSON string: {json_str[:500]}...")
-            
-            ai_consultation_data = json.loads(json_str)
+            ai_consultation_data = _parse_consultation(response_text)
+            consultation_cache.set(cache_key, CONSULTATION_PROMPT_VERSION, ai_consultation_data)
 
-            if not all(k in ai_consultation_data for k in ["analysis_summary", "strategic_advice"]):
-                raise ValueError("AI response format is incorrect or incomplete. Missing keys.")
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None and getattr(usage, "prompt_token_count", None):
+                # Jumlah token sebenarnya dari Gemini, bukan estimasi
+                metrics["prompt_tokens"] = usage.prompt_token_count
 
             print(f"[{datetime.now()}] Successfully parsed AI response.")
-            return jsonify(ai_consultation_data)
+            return jsonify(ai_consultation_data), 200, _metrics_headers(metrics)
 
     # Pastikan SEMUA blok 'except' ini memiliki indentasi yang SAMA dengan blok 'try' di atasnya.
     # INI ADALAH PENYEBAB PALING MUNGKIN DARI SYNTAXERROR.
+    except LLMUnavailable as e:
+        print(f"[{datetime.now()}] AI provider unavailable: {e}")
+        return jsonify({"error": str(e)}), 503
     except json.JSONDecodeError as e: # <--- Perhatikan Indentasi Baris Ini
         print(f"[{datetime.now()}] Error parsing AI response JSON: {e}")
         print(f"[{datetime.now()}] Raw AI response (potentially truncated or malformed): {response_text}")
@@ -294,3 +370,57 @@ def get_ai_consultation():
     except Exception as e: # <--- Perhatikan Indentasi Baris Ini
         print(f"[{datetime.now()}] Unexpected error during AI consultation: {e}")
         return jsonify({"error": f"Failed to get AI consultation: {str(e)}"}), 500
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@dashboard_blueprint.route("/dashboard/predict/stream", methods=["POST"])
+@jwt_required()
+def stream_ai_consultation():
+    """
+    Varian streaming dari /dashboard/predict (server-sent events). Potongan teks dari
+    Gemini dikirim sebagai event 'delta' begitu tiba; event 'result' berisi JSON yang
+    sama dengan respons non-streaming, atau event 'error' jika gagal.
+    """
+    data = request.get_json(silent=True) or {}
+    user_business_details = data.get('business_details', '')
+    if not user_business_details:
+        return jsonify({"error": "Detail bisnis tidak boleh kosong."}), 400
+
+    prompt, cache_key, metrics = _prepare_consultation(get_jwt_identity(), user_business_details)
+    cached = consultation_cache.get(cache_key, CONSULTATION_PROMPT_VERSION)
+
+    def generate():
+        if cached is not None:
+            yield _sse_event("result", {**cached, "cached": True})
+            return
+
+        chunks = []
+        try:
+            for text in gemini_generate_stream(prompt, deadline=60):
+                chunks.append(text)
+                yield _sse_event("delta", {"text": text})
+            ai_consultation_data = _parse_consultation("".join(chunks).strip())
+        except LLMUnavailable as e:
+            yield _sse_event("error", {"error": str(e), "status": 503})
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning("Format jawaban AI tidak valid (stream): %s", e)
+            yield _sse_event("error", {"error": f"AI provided an invalid format or incomplete data: {e}"})
+            return
+        except Exception as e:
+            logger.exception("Konsultasi AI (stream) gagal")
+            yield _sse_event("error", {"error": f"Failed to get AI consultation: {str(e)}"})
+            return
+
+        consultation_cache.set(cache_key, CONSULTATION_PROMPT_VERSION, ai_consultation_data)
+        yield _sse_event("result", {**ai_consultation_data, "cached": False})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Matikan buffering proxy (nginx) agar event langsung sampai ke client
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **_metrics_headers(metrics)}
+    )
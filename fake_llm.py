@@ -0,0 +1,124 @@
+# fake_llm.py
+"""
+Backend LLM lokal palsu untuk pengujian dan benchmark tanpa jaringan.
+
+Aktifkan dengan LLM_BACKEND=fake. Klien ini meniru bentuk respons
+`client.chat.completions.create(...)` dari SDK Groq dan
+`model.generate_content(...)` dari SDK Gemini, serta mensimulasikan
+latensi provider lewat FAKE_LLM_LATENCY_MS (default 200 ms).
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 200))
+
+# Kategori yang dikembalikan untuk prompt klasifikasi, dipilih berdasarkan kata kunci
+_CATEGORY_KEYWORDS = [
+    ("gaji", "Gaji"),
+    ("sewa", "Sewa"),
+    ("listrik", "Utilitas"),
+    ("jual", "Penjualan"),
+    ("beli", "Bahan Baku"),
+    ("iklan", "Marketing"),
+    ("pinjaman", "Pinjaman"),
+]
+
+_RECEIPT_LINES = [
+    ("Penjualan produk", 250000, "pemasukan"),
+    ("Beli bahan baku", 120000, "pengeluaran"),
+    ("Bayar listrik", 85000, "pengeluaran"),
+    ("Penjualan grosir", 480000, "pemasukan"),
+]
+
+
+def _fake_receipt(seed):
+    """Struktur {"transactions": [...]} yang deterministik untuk isi prompt/gambar tertentu."""
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    today = datetime.now().strftime("%Y-%m-%d")
+    transactions = []
+    for i in range(2 + digest[0] % 3):
+        description, amount, trx_type = _RECEIPT_LINES[(digest[1] + i) % len(_RECEIPT_LINES)]
+        transactions.append({
+            "date": today,
+            "description": description,
+            "amount": amount + digest[2 + i] * 100,
+            "type": trx_type,
+        })
+    return json.dumps({"transactions": transactions})
+
+
+def _fake_category(prompt):
+    lowered = prompt.lower()
+    for keyword, category in _CATEGORY_KEYWORDS:
+        if keyword in lowered:
+            return category
+    return "Lainnya"
+
+
+def _fake_category_batch(prompt):
+    """Satu kategori per baris bernomor ('1. deskripsi') pada prompt klasifikasi batch."""
+    lines = re.findall(r"^\s*\d+\. (.*)$", prompt, flags=re.MULTILINE)
+    return json.dumps({"categories": [_fake_category(line) for line in lines]})
+
+
+def _message_text(messages):
+    parts = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            for part in content:
+                parts.append(part.get("text") or part.get("image_url", {}).get("url", ""))
+    return "\n".join(parts)
+
+
+class _FakeCompletions:
+    def create(self, messages, model=None, response_format=None, **kwargs):
+        time.sleep(FAKE_LLM_LATENCY_MS / 1000)
+        text = _message_text(messages)
+        if response_format and response_format.get("type") == "json_object":
+            content = _fake_category_batch(text) if '"categories"' in text else _fake_receipt(text)
+        else:
+            content = _fake_category(text)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(text) // 4, completion_tokens=len(content) // 4),
+        )
+
+
+class FakeGroqClient:
+    """Pengganti `groq.Groq` dengan antarmuka chat.completions.create yang sama."""
+
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=_FakeCompletions())
+
+
+class FakeGeminiModel:
+    """Pengganti `genai.GenerativeModel` untuk konsultasi bisnis (respons JSON tetap)."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        text = json.dumps({
+            "analysis_summary": "Usaha memiliki arus kas yang cukup stabil dengan ruang untuk efisiensi biaya.",
+            "strategic_advice": "- Catat pengeluaran harian secara rutin\n- Tingkatkan penjualan di hari ramai\n- Sisihkan dana darurat",
+        })
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        if stream:
+            return self._stream(text, usage)
+        time.sleep(FAKE_LLM_LATENCY_MS / 1000)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _stream(self, text, usage, chunk_count=8):
+        """Latensi total yang sama, dibagi rata ke beberapa potongan teks."""
+        size = -(-len(text) // chunk_count)
+        for start in range(0, len(text), size):
+            time.sleep(FAKE_LLM_LATENCY_MS / 1000 / chunk_count)
+            yield SimpleNamespace(text=text[start:start + size], usage_metadata=usage)
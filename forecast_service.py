@@ -0,0 +1,241 @@
+# forecast_service.py
+"""
+Prakiraan arus kas (pemasukan dan pengeluaran harian) tanpa memanggil AI.
+
+Input adalah deret harian FORECAST_HISTORY_DAYS hari terakhir dari 'daily_totals'
+(sama seperti _get_daily_net_income di scoring_api.py, tetapi pemasukan dan
+pengeluaran dipisah). Dua model dijalankan untuk semua deret sekaligus sebagai
+operasi NumPy 2-D (satu baris per deret):
+
+- seasonal naive: rata-rata pola mingguan dari SEASONS_TO_AVERAGE minggu terakhir,
+- simple exponential smoothing: alpha dipilih per deret dari ALPHA_GRID
+  berdasarkan galat one-step-ahead terkecil.
+
+Model untuk setiap deret dipilih lewat backtest BACKTEST_DAYS hari terakhir
+(MAE terkecil). Deret pemasukan dan pengeluaran semua user diproses dalam satu
+pass, sehingga mode batch tidak lebih lambat per user dibanding mode tunggal.
+
+CLI:
+    flask --app main forecast-batch [--days 30] [--output hasil.json]
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from app.models import db, DailyTotal
+from batch_scoring import QUERY_CHUNK_SIZE
+from cache_service import VersionedCache
+from rollup_service import get_data_version
+from scoring_api import extract_pnl_features, _daily_window_series
+
+FORECAST_HORIZONS = (30, 60, 90)
+MAX_HORIZON = max(FORECAST_HORIZONS)
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", 120))
+SEASON_LENGTH = 7
+SEASONS_TO_AVERAGE = 4
+BACKTEST_DAYS = 14
+ALPHA_GRID = np.array([0.1, 0.2, 0.3, 0.5, 0.7])
+MODEL_NAMES = ("seasonal_naive", "exponential_smoothing")
+# Jumlah user per pass NumPy pada mode batch (membatasi memori array 2-D)
+FORECAST_BATCH_CHUNK = int(os.getenv("FORECAST_BATCH_CHUNK", 20000))
+
+# Prakiraan 90 hari per user; valid sampai transaksi user berubah atau hari berganti
+forecast_cache = VersionedCache("cash_forecast", maxsize=int(os.getenv("FORECAST_CACHE_SIZE", 10000)))
+
+
+# --- Model (input: array 2-D, satu baris per deret) ---
+
+def seasonal_naive_forecast(series, horizon):
+    """Pola mingguan rata-rata dari minggu-minggu terakhir, diulang sepanjang horizon."""
+    seasons = max(1, min(SEASONS_TO_AVERAGE, series.shape[1] // SEASON_LENGTH))
+    recent = series[:, -seasons * SEASON_LENGTH:]
+    # Panjang `recent` kelipatan 7, jadi profile[j] jatuh di hari yang sama dengan hari ke-j ke depan
+    profile = recent.reshape(len(series), seasons, SEASON_LENGTH).mean(axis=1)
+    repeats = -(-horizon // SEASON_LENGTH)
+    return np.tile(profile, repeats)[:, :horizon]
+
+
+def exponential_smoothing_forecast(series, horizon):
+    """Simple exponential smoothing; alpha terbaik per deret dari ALPHA_GRID."""
+    n_series, length = series.shape
+    # level[g, i] untuk setiap alpha g dan deret i
+    level = np.repeat(series[:, :1].T, len(ALPHA_GRID), axis=0)
+    squared_error = np.zeros((len(ALPHA_GRID), n_series))
+    alpha = ALPHA_GRID[:, None]
+    for t in range(1, length):
+        error = series[:, t] - level
+        squared_error += error ** 2
+        level = level + alpha * error
+    best = squared_error.argmin(axis=0)
+    final_level = level[best, np.arange(n_series)]
+    return np.repeat(final_level[:, None], horizon, axis=1)
+
+
+_MODELS = (seasonal_naive_forecast, exponential_smoothing_forecast)
+
+
+def forecast_series(series, horizon=MAX_HORIZON):
+    """
+    Prakiraan untuk setiap baris `series`. Mengembalikan (forecast, model_index, mae)
+    dengan forecast berukuran (n, horizon) dan nilai tidak negatif.
+    """
+    series = np.asarray(series, dtype=float)
+    train, holdout = series[:, :-BACKTEST_DAYS], series[:, -BACKTEST_DAYS:]
+    mae = np.stack([
+        np.abs(model(train, BACKTEST_DAYS) - holdout).mean(axis=1) for model in _MODELS
+    ])
+    model_index = mae.argmin(axis=0)
+
+    candidates = np.stack([model(series, horizon) for model in _MODELS])
+    forecast = np.take_along_axis(candidates, model_index[None, :, None], axis=0)[0]
+    return np.clip(forecast, 0, None), model_index, mae
+
+
+# --- Data ---
+
+def load_daily_series_batch(user_ids, days=FORECAST_HISTORY_DAYS):
+    """
+    Deret pemasukan dan pengeluaran harian (2-D, satu baris per elemen `user_ids`, urutan
+    sama) dari 'daily_totals'. user_id yang berulang dimuat sekali lalu disalin ke setiap barisnya.
+    """
+    unique_ids, inverse = np.unique(np.asarray([int(uid) for uid in user_ids], dtype=np.int64), return_inverse=True)
+    user_ids = unique_ids.tolist()
+    position = {uid: i for i, uid in enumerate(user_ids)}
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    rows = []
+    for start in range(0, len(user_ids), QUERY_CHUNK_SIZE):
+        rows.extend(db.session.query(
+            DailyTotal.user_id, DailyTotal.date, DailyTotal.income, DailyTotal.expense
+        ).filter(
+            DailyTotal.user_id.in_(user_ids[start:start + QUERY_CHUNK_SIZE]),
+            DailyTotal.date >= start_date,
+            DailyTotal.date <= end_date
+        ).all())
+
+    user_idx = np.array([position[row.user_id] for row in rows], dtype=np.int64)
+    offsets = (
+        np.array([row.date for row in rows], dtype="datetime64[D]") - np.datetime64(start_date, "D")
+    ).astype(np.int64)
+    income = np.zeros((len(user_ids), days))
+    expense = np.zeros((len(user_ids), days))
+    income[user_idx, offsets] = [row.income for row in rows]
+    expense[user_idx, offsets] = [row.expense for row in rows]
+    return income[inverse], expense[inverse]
+
+
+def _forecast_income_expense(income, expense, horizon):
+    """Pemasukan dan pengeluaran semua user diprakirakan dalam satu panggilan forecast_series."""
+    n_users = len(income)
+    forecast, model_index, mae = forecast_series(np.vstack([income, expense]), horizon)
+    return {
+        "income": forecast[:n_users],
+        "expense": forecast[n_users:],
+        "income_model": model_index[:n_users],
+        "expense_model": model_index[n_users:],
+        "income_mae": mae[:, :n_users],
+        "expense_mae": mae[:, n_users:],
+    }
+
+
+def _compute_user_forecast(user_id):
+    features = extract_pnl_features(user_id)
+    income = _daily_window_series(features, features["income"], FORECAST_HISTORY_DAYS)
+    expense = _daily_window_series(features, features["expense"], FORECAST_HISTORY_DAYS)
+    result = _forecast_income_expense(income[None, :], expense[None, :], MAX_HORIZON)
+    return {
+        "start_date": datetime.utcnow().date() + timedelta(days=1),
+        "income": result["income"][0],
+        "expense": result["expense"][0],
+        "models": {
+            "income": MODEL_NAMES[result["income_model"][0]],
+            "expense": MODEL_NAMES[result["expense_model"][0]],
+        },
+        "backtest_mae": {
+            kind: {name: round(float(result[f"{kind}_mae"][m, 0]), 2) for m, name in enumerate(MODEL_NAMES)}
+            for kind in ("income", "expense")
+        },
+    }
+
+
+def _totals(income, expense):
+    return {
+        "income": round(float(income.sum()), 2),
+        "expense": round(float(expense.sum()), 2),
+        "net": round(float(income.sum() - expense.sum()), 2),
+    }
+
+
+def get_user_forecast(user_id, horizon):
+    """Prakiraan `horizon` hari ke depan (mulai besok) untuk satu user, dari cache jika bisa."""
+    user_id = int(user_id)
+    version = (get_data_version(user_id), datetime.utcnow().date())
+    forecast = forecast_cache.get(user_id, version)
+    if forecast is None:
+        forecast = _compute_user_forecast(user_id)
+        forecast_cache.set(user_id, version, forecast)
+
+    income = forecast["income"][:horizon]
+    expense = forecast["expense"][:horizon]
+    return {
+        "horizon_days": horizon,
+        "models": forecast["models"],
+        "backtest_mae": forecast["backtest_mae"],
+        "totals": _totals(income, expense),
+        "daily": [
+            {
+                "date": (forecast["start_date"] + timedelta(days=i)).isoformat(),
+                "income": round(float(income[i]), 2),
+                "expense": round(float(expense[i]), 2),
+                "net": round(float(income[i] - expense[i]), 2),
+            }
+            for i in range(horizon)
+        ],
+    }
+
+
+def forecast_users(user_ids, horizon):
+    """Total prakiraan `horizon` hari untuk banyak user (satu pass NumPy per FORECAST_BATCH_CHUNK user)."""
+    user_ids = [int(uid) for uid in user_ids]
+    return [
+        result
+        for start in range(0, len(user_ids), FORECAST_BATCH_CHUNK)
+        for result in _forecast_chunk(user_ids[start:start + FORECAST_BATCH_CHUNK], horizon)
+    ]
+
+
+def _forecast_chunk(user_ids, horizon):
+    # user_id yang sama cukup dimuat dan diprakirakan sekali
+    unique_ids, inverse = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    income, expense = load_daily_series_batch(unique_ids)
+    result = _forecast_income_expense(income, expense, horizon)
+    return [
+        {
+            "user_id": user_id,
+            "horizon_days": horizon,
+            "totals": _totals(result["income"][i], result["expense"][i]),
+            "models": {
+                "income": MODEL_NAMES[result["income_model"][i]],
+                "expense": MODEL_NAMES[result["expense_model"][i]],
+            },
+        }
+        for user_id, i in zip(user_ids, inverse)
+    ]
+
+
+@click.command('forecast-batch')
+@click.option('--days', type=click.Choice([str(h) for h in FORECAST_HORIZONS]), default='30',
+              help='Horizon prakiraan dalam hari.')
+@click.option('--output', type=click.File('w'), default='-', help='File hasil JSON (default: stdout).')
+@with_appcontext
+def forecast_batch_command(days, output):
+    """Prakiraan arus kas semua user yang punya transaksi (untuk laporan risiko portofolio)."""
+    user_ids = [row.user_id for row in db.session.query(DailyTotal.user_id).distinct()]
+    results = forecast_users(user_ids, int(days))
+    json.dump(results, output, ensure_ascii=False)
+    click.echo(f"✅ {len(results)} user diprakirakan.", err=True)
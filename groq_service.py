@@ -1,12 +1,19 @@
 # app/services/groq_service.py
-import os
 import base64
-from groq import Groq
 import json
+import logging
+from llm_gateway import groq_chat
 
+logger = logging.getLogger(__name__)
 
-# Inisialisasi Klien Groq
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+# Batas waktu total per panggilan (termasuk retry), dalam detik
+RECEIPT_DEADLINE_SECONDS = 60
+CLASSIFY_DEADLINE_SECONDS = 20
+
+TRANSACTION_CATEGORIES = [
+    "Penjualan", "Bahan Baku", "Gaji", "Sewa", "Utilitas", "Marketing",
+    "Aset Tetap", "Suntikan Dana", "Pinjaman", "Lainnya"
+]
 
 
 def structure_receipt_from_image(image_file):
@@ -15,8 +22,14 @@ def structure_receipt_from_image(image_file):
     Mengekstrak tanggal, deskripsi, jumlah, dan menentukan tipe (pemasukan/pengeluaran).
     Desain untuk robust terhadap error deteksi.
     """
-    image_bytes = base64.b64encode(image_file.read()).decode('utf-8')
-    mime_type = image_file.mimetype
+    return structure_receipt_from_bytes(image_file.read(), image_file.mimetype)
+
+
+def structure_receipt_from_bytes(raw_image_bytes, mime_type):
+    """Sama seperti structure_receipt_from_image, untuk gambar yang sudah dibaca ke memori."""
+    # Hanya data URL yang disimpan; string base64 perantara langsung dibuang
+    # (sebelumnya keduanya tertahan di memori selama panggilan ke AI)
+    image_url = f"data:{mime_type};base64,{base64.b64encode(raw_image_bytes).decode('ascii')}"
     
     # PROMPT YANG DIPERBARUI
     prompt = """
@@ -90,7 +103,8 @@ def structure_receipt_from_image(image_file):
     Pastikan setiap angka adalah integer atau float, bukan string.
     """
     
-    chat_completion = client.chat.completions.create(
+    chat_completion = groq_chat(
+        deadline=RECEIPT_DEADLINE_SECONDS,
         messages=[
             {
                 "role": "user",
@@ -98,7 +112,7 @@ def structure_receipt_from_image(image_file):
                     {"type": "text", "text": prompt},
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:{mime_type};base64,{image_bytes}"},
+                        "image_url": {"url": image_url},
                     },
                 ],
             }
@@ -126,7 +140,7 @@ def classify_transaction(description: str) -> str:
     """
     AI #2: Mengklasifikasikan deskripsi transaksi ke dalam kategori yang ditentukan.
     """
-    categories = "Penjualan, Bahan Baku, Gaji, Sewa, Utilitas, Marketing, Aset Tetap, Suntikan Dana, Pinjaman, Lainnya"
+    categories = ", ".join(TRANSACTION_CATEGORIES)
     
     prompt = f"""
         Anda adalah AI akuntan. Klasifikasikan deskripsi transaksi ini ke dalam SATU kategori dari daftar berikut: [{categories}].
@@ -135,14 +149,48 @@ def classify_transaction(description: str) -> str:
     """
     
     try:
-        chat_completion = client.chat.completions.create(
+        chat_completion = groq_chat(
+            deadline=CLASSIFY_DEADLINE_SECONDS,
             messages=[{"role": "user", "content": prompt}],
             model="llama3-8b-8192",
             temperature=0,
         )
         category = chat_completion.choices[0].message.content.strip()
         
-        return category if category in categories.split(', ') else "Lainnya"
+        return category if category in TRANSACTION_CATEGORIES else "Lainnya"
     except Exception:
         return "Lainnya"
 
+
+
+def classify_transactions_batch(descriptions):
+    """
+    Klasifikasi banyak deskripsi dalam SATU panggilan AI.
+    Mengembalikan list kategori dengan urutan yang sama, atau None jika output AI
+    tidak bisa dipakai (jumlah tidak cocok / bukan JSON) agar tidak ikut di-cache.
+    """
+    numbered = "\n".join(f"{i}. {description}" for i, description in enumerate(descriptions, start=1))
+
+    prompt = f"""
+        Anda adalah AI akuntan. Klasifikasikan SETIAP deskripsi transaksi bernomor di bawah ini ke dalam SATU kategori dari daftar berikut: [{", ".join(TRANSACTION_CATEGORIES)}].
+        {numbered}
+        Kembalikan HANYA JSON dengan format {{"categories": ["<kategori 1>", "<kategori 2>", ...]}},
+        berisi tepat {len(descriptions)} kategori dengan urutan yang sama seperti nomor deskripsi.
+    """
+
+    try:
+        chat_completion = groq_chat(
+            deadline=CLASSIFY_DEADLINE_SECONDS,
+            messages=[{"role": "user", "content": prompt}],
+            model="llama3-8b-8192",
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        result = json.loads(chat_completion.choices[0].message.content).get('categories')
+    except Exception as e:
+        logger.warning("Klasifikasi batch gagal (%d deskripsi): %s", len(descriptions), e)
+        return None
+
+    if not isinstance(result, list) or len(result) != len(descriptions):
+        return None
+    return [category if category in TRANSACTION_CATEGORIES else "Lainnya" for category in result]
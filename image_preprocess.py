@@ -0,0 +1,161 @@
+# image_preprocess.py
+"""
+Persiapan gambar nota sebelum dikirim ke model vision.
+
+Upload dibaca langsung dari stream Werkzeug (file besar sudah di-spool ke disk),
+diperkecil ke resolusi maksimum yang masih cukup untuk OCR, lalu di-encode
+ulang sebagai JPEG. Gambar yang sudah kecil dikirim apa adanya. Setiap halaman
+PDF di-render menjadi satu gambar JPEG dengan batas resolusi yang sama.
+
+Total body request dibatasi MAX_CONTENT_LENGTH (main.py) sebelum di-spool;
+OCR_MAX_UPLOAD_BYTES membatasi ukuran per file di dalamnya.
+"""
+import io
+import os
+import threading
+import time
+
+import pypdfium2 as pdfium
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+OCR_MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", 2000))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", 85))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "0") == "1"
+# Gambar di bawah ukuran ini dan dalam batas resolusi tidak di-encode ulang
+OCR_PASSTHROUGH_BYTES = int(os.getenv("OCR_PASSTHROUGH_BYTES", 512 * 1024))
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", 150))
+# Batas jumlah halaman (gambar + halaman PDF) dalam satu request
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", 50))
+
+# pdfium tidak thread-safe (termasuk antar dokumen), jadi render PDF diserialkan
+_pdfium_lock = threading.Lock()
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class InvalidDocument(Exception):
+    pass
+
+
+def stream_size(stream):
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def check_upload_size(stream):
+    """Ukuran upload dalam byte; melempar ImageTooLarge jika melebihi OCR_MAX_UPLOAD_BYTES."""
+    size = stream_size(stream)
+    if size > OCR_MAX_UPLOAD_BYTES:
+        raise ImageTooLarge(
+            f"Ukuran file {size} byte melebihi batas {OCR_MAX_UPLOAD_BYTES} byte."
+        )
+    return size
+
+
+def prepare_image_for_ocr(stream, mime_type):
+    """
+    Mengembalikan (image_bytes, mime_type, stats). Melempar ImageTooLarge jika
+    upload melebihi OCR_MAX_UPLOAD_BYTES atau resolusinya melebihi batas Pillow,
+    dan InvalidDocument jika gambar rusak. File yang bukan gambar (mis. PDF)
+    dikembalikan apa adanya.
+    """
+    original_bytes = check_upload_size(stream)
+
+    stream.seek(0)
+    try:
+        image = Image.open(stream)
+        original_size = image.size
+    except UnidentifiedImageError:
+        image = None
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(f"Resolusi gambar terlalu besar: {e}")
+
+    fits = image is not None and max(image.size) <= OCR_MAX_IMAGE_SIDE
+    if image is None or (fits and original_bytes <= OCR_PASSTHROUGH_BYTES and not OCR_GRAYSCALE):
+        stream.seek(0)
+        raw = stream.read()
+        size = list(image.size) if image is not None else None
+        return raw, mime_type, _stats(original_bytes, len(raw), size, size, resized=False)
+
+    # JPEG bisa di-decode langsung pada resolusi lebih kecil (jauh lebih hemat memori)
+    try:
+        image.draft("L" if OCR_GRAYSCALE else "RGB", (OCR_MAX_IMAGE_SIDE, OCR_MAX_IMAGE_SIDE))
+        image = ImageOps.exif_transpose(image)
+        jpeg_bytes, sent_size = _encode_jpeg(image)
+    except (OSError, SyntaxError, ValueError) as e:
+        # Header terbaca tetapi isi gambar rusak/terpotong
+        raise InvalidDocument(f"Gambar tidak dapat dibaca: {e}")
+    if len(jpeg_bytes) >= original_bytes:
+        # Hasil encode ulang tidak lebih kecil; kirim file asli
+        stream.seek(0)
+        raw = stream.read()
+        return raw, mime_type, _stats(original_bytes, len(raw), original_size, original_size, resized=False)
+
+    return jpeg_bytes, "image/jpeg", _stats(
+        original_bytes, len(jpeg_bytes), original_size, sent_size, resized=True
+    )
+
+
+def pdf_page_images(stream):
+    """
+    Render setiap halaman PDF menjadi JPEG siap OCR. Mengembalikan list
+    (image_bytes, mime_type, stats) per halaman.
+    """
+    original_bytes = check_upload_size(stream)
+    stream.seek(0)
+    with _pdfium_lock:
+        return _render_pdf(stream, original_bytes)
+
+
+def _render_pdf(stream, original_bytes):
+    try:
+        pdf = pdfium.PdfDocument(stream)
+    except pdfium.PdfiumError as e:
+        raise InvalidDocument(f"File PDF tidak dapat dibaca: {e}")
+    try:
+        if len(pdf) > OCR_MAX_PAGES:
+            raise ImageTooLarge(f"PDF berisi {len(pdf)} halaman, melebihi batas {OCR_MAX_PAGES} halaman.")
+
+        pages = []
+        for index in range(len(pdf)):
+            started = time.perf_counter()
+            page = pdf[index]
+            try:
+                # Render langsung di resolusi akhir; halaman besar tidak perlu di-render penuh lalu diperkecil
+                scale = min(OCR_PDF_DPI / 72, OCR_MAX_IMAGE_SIDE / max(page.get_size()))
+                image = page.render(scale=scale).to_pil()
+            finally:
+                page.close()
+            jpeg_bytes, sent_size = _encode_jpeg(image)
+            stats = _stats(original_bytes // len(pdf), len(jpeg_bytes), image.size, sent_size, resized=True)
+            stats["render_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            pages.append((jpeg_bytes, "image/jpeg", stats))
+        return pages
+    finally:
+        pdf.close()
+
+
+def _encode_jpeg(image):
+    """Perkecil ke OCR_MAX_IMAGE_SIDE lalu encode sebagai JPEG; mengembalikan (jpeg_bytes, ukuran)."""
+    image = image.convert("L" if OCR_GRAYSCALE else "RGB")
+    image.thumbnail((OCR_MAX_IMAGE_SIDE, OCR_MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    return output.getvalue(), image.size
+
+
+def _stats(original_bytes, sent_bytes, original_size, sent_size, resized):
+    return {
+        "original_bytes": original_bytes,
+        "sent_bytes": sent_bytes,
+        "bytes_saved": original_bytes - sent_bytes,
+        "original_size": list(original_size) if original_size else None,
+        "sent_size": list(sent_size) if sent_size else None,
+        "resized": resized
+    }
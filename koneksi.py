@@ -1,8 +1,32 @@
-import mysql.connector
-from mysql.connector import pooling, Error
-from contextlib import contextmanager
+# koneksi.py
+"""
+Satu pool koneksi database untuk ORM (Flask-SQLAlchemy) dan query SQL mentah.
+
+Engine SQLAlchemy dikonfigurasi lewat database_uri() dan engine_options() (lihat
+main.py); get_conn() meminjam koneksi mysql.connector dari pool engine yang sama,
+sehingga endpoint ORM dan endpoint SQL mentah berbagi ukuran dan batas pool.
+
+Pengaturan lewat environment:
+    DB_POOL_SIZE       koneksi tetap di pool (default 10)
+    DB_MAX_OVERFLOW    koneksi tambahan saat pool penuh (default 10)
+    DB_POOL_TIMEOUT    detik maksimum menunggu koneksi bebas (default 10)
+    DB_POOL_RECYCLE    umur maksimum koneksi dalam detik (default 1800, di bawah wait_timeout MySQL)
+    DB_POOL_PRE_PING   cek koneksi sebelum dipakai (default 1)
+    DB_POOL_WARMUP     koneksi yang dibuka saat request pertama (default = DB_POOL_SIZE)
+"""
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+from app.models import db
+from metrics_service import db_pool_wait, record_sql
 
 load_dotenv()
 
@@ -11,58 +35,221 @@ PORT        = int(os.getenv('DB_PORT', 3306))
 DATABASE    = os.getenv('DB_NAME')  # ✅ sesuai dengan .env
 USER        = os.getenv('DB_USER')
 PASSWORD    = os.getenv('DB_PASSWORD')
-POOL_SIZE   = int(os.getenv('DB_POOL_SIZE', 5))
+POOL_SIZE   = int(os.getenv('DB_POOL_SIZE', 10))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False', '')
+POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', POOL_SIZE))
 SSL_FILENAME = os.getenv('SSL_CERT_FILENAME')  # optional
 
 use_ssl = SSL_FILENAME is not None and SSL_FILENAME.strip() != ""
 
 if use_ssl:
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        SSL_CERT_PATH = os.path.join(current_dir, SSL_FILENAME)
-        if not os.path.exists(SSL_CERT_PATH):
-            raise FileNotFoundError(f"SSL cert file not found: {SSL_CERT_PATH}")
-    except NameError:
-        SSL_CERT_PATH = SSL_FILENAME
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    SSL_CERT_PATH = os.path.join(current_dir, SSL_FILENAME)
+    if not os.path.exists(SSL_CERT_PATH):
+        print(f"⚠️ SSL cert file not found: {SSL_CERT_PATH}")
 else:
     SSL_CERT_PATH = None
 
-try:
-    pool_config = {
-        "pool_name": "mypool",
-        "pool_size": POOL_SIZE,
-        "host": HOST,
-        "port": PORT,
-        "database": DATABASE,
-        "user": USER,
-        "password": PASSWORD,
-        "charset": "utf8"
-    }
 
+class _PoolStats:
+    """Penghitung waktu tunggu checkout, dipakai bersama oleh semua pool di proses ini."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def begin(self):
+        with self._lock:
+            self.waiting += 1
+
+    def end(self, wait_ms, timed_out=False):
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_ms_total, 1),
+                "wait_ms_max": round(self.wait_ms_max, 1),
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 2) if self.checkouts else 0.0,
+            }
+
+
+pool_wait_stats = _PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mencatat berapa lama setiap checkout menunggu (termasuk pre-ping)."""
+
+    def connect(self):
+        pool_wait_stats.begin()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            pool_wait_stats.end(0, timed_out=True)
+            raise
+        waited = time.perf_counter() - started
+        pool_wait_stats.end(waited * 1000)
+        db_pool_wait.observe(waited)
+        return connection
+
+
+class _TimedCursor:
+    """Cursor mysql.connector yang mencatat setiap execute ke metrics_service."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            record_sql("raw", operation, time.perf_counter() - started)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            record_sql("raw", operation, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def database_uri():
+    return f"mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}"
+
+
+def engine_options():
+    """Nilai SQLALCHEMY_ENGINE_OPTIONS untuk pool bersama."""
+    # charset mengikuti default Flask-SQLAlchemy untuk MySQL (utf8mb4), sama seperti ORM sebelumnya
+    connect_args = {}
     if use_ssl:
-        pool_config.update({
+        connect_args.update({
             "ssl_ca": SSL_CERT_PATH,
             "ssl_verify_cert": False,
             "tls_versions": ['TLSv1.2']
         })
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
 
-    connection_pool = pooling.MySQLConnectionPool(**pool_config)
-    print("✅ Connection pool created successfully.")
-except Error as err:
-    print(f"❌ Error creating connection pool: {err}")
-    exit(1)
 
 @contextmanager
 def get_conn():
-    conn = None
+    """
+    Koneksi mysql.connector mentah dari pool engine (butuh app context).
+    Pool habis (tidak ada koneksi bebas dalam DB_POOL_TIMEOUT detik) dilaporkan
+    sebagai mysql.connector PoolError agar `except Error` di pemanggil tetap berlaku.
+    """
+    try:
+        conn = db.engine.raw_connection()
+    except SQLAlchemyError as e:
+        raise PoolError(msg=f"Tidak bisa mendapat koneksi database: {e}") from e
     try:
-        conn = connection_pool.get_connection()
-        conn.autocommit = False 
-        yield conn
-    except Error as e:
-        if conn:
-            conn.rollback()
-        raise e
+        yield _TimedConnection(conn)
+    except Error:
+        conn.rollback()
+        raise
     finally:
-        if conn:
+        # Mengembalikan koneksi ke pool (transaksi yang belum di-commit di-rollback oleh pool)
+        conn.close()
+
+
+def warm_pool(count=POOL_WARMUP):
+    """
+    Buka `count` koneksi sekaligus lalu kembalikan ke pool, agar request pertama
+    tidak menanggung biaya handshake (TLS + auth). Gagal di sini tidak menghentikan app.
+    """
+    count = min(count, POOL_SIZE + MAX_OVERFLOW)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(db.engine.raw_connection())
+        print(f"✅ Connection pool siap ({len(connections)} koneksi).")
+    except (SQLAlchemyError, Error) as err:
+        print(f"❌ Gagal menyiapkan connection pool ({len(connections)}/{count} koneksi): {err}")
+    finally:
+        for conn in connections:
             conn.close()
+    return len(connections)
+
+
+def init_pool_warmup(app):
+    """
+    Panaskan pool satu kali saat request pertama masuk, di thread background agar
+    request itu tidak ikut menunggu. Tidak dijalankan saat import, jadi perintah
+    CLI (score-batch, forecast-batch, ensure-indexes) dan proses worker batch
+    tidak membuka koneksi yang tidak dipakai.
+    """
+    started = threading.Event()
+    lock = threading.Lock()
+
+    def warm():
+        with app.app_context():
+            warm_pool()
+
+    @app.before_request
+    def _warm_pool_on_first_request():
+        if started.is_set():
+            return
+        with lock:
+            if started.is_set():
+                return
+            started.set()
+        threading.Thread(target=warm, name="db-pool-warmup", daemon=True).start()
+
+
+def pool_stats():
+    """Kondisi pool engine saat ini plus statistik waktu tunggu checkout."""
+    pool = db.engine.pool
+    stats = {"max_overflow": MAX_OVERFLOW}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    stats.update(pool_wait_stats.snapshot())
+    return stats
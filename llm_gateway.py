@@ -0,0 +1,367 @@
+# llm_gateway.py
+"""
+Satu pintu untuk semua panggilan LLM (Groq dan Gemini).
+
+- Klien tiap provider dibuat sekali per proses dan dipakai ulang (koneksi HTTP
+  di-pool, batas lewat LLM_MAX_CONNECTIONS).
+- Setiap panggilan punya deadline total; percobaan ulang (LLM_MAX_RETRIES) memakai
+  exponential backoff dengan jitter dan hanya untuk error sementara
+  (timeout, koneksi, 429, 5xx) selama deadline masih tersisa.
+- Semaphore per provider (LLM_MAX_CONCURRENCY) membatasi panggilan paralel per
+  proses; request yang tidak mendapat slot dalam LLM_QUEUE_TIMEOUT detik langsung
+  gagal sehingga provider yang lambat tidak menahan semua worker web.
+- Circuit breaker: setelah LLM_BREAKER_THRESHOLD kegagalan sementara berturut-turut,
+  panggilan ke provider itu langsung ditolak selama LLM_BREAKER_COOLDOWN detik,
+  lalu satu panggilan percobaan menentukan apakah circuit ditutup kembali.
+
+LLM_BACKEND=fake memakai backend lokal dari fake_llm.py (tanpa jaringan).
+"""
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+import httpx
+from dotenv import load_dotenv
+from groq import Groq
+
+from fake_llm import FakeGroqClient, FakeGeminiModel
+from metrics_service import llm_request_duration
+
+# Klien dibuat saat import, jadi .env harus sudah dibaca di sini
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "")
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 60))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 8))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 5))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMUnavailable(Exception):
+    """Provider tidak dipanggil: circuit sedang terbuka atau semua slot panggilan terpakai."""
+
+
+class _Provider:
+    def __init__(self, name):
+        self.name = name
+        self.semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rejected_open": 0,
+            "rejected_busy": 0,
+            "in_flight": 0,
+            "latency_ms_total": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < LLM_BREAKER_COOLDOWN:
+            return "open"
+        return "half_open"
+
+    def admit(self):
+        """Tolak panggilan saat circuit terbuka; saat half-open hanya satu panggilan percobaan."""
+        with self._lock:
+            state = self.state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+            self.counters["rejected_open"] += 1
+        raise LLMUnavailable(f"Layanan AI ({self.name}) sedang tidak tersedia, coba lagi nanti.")
+
+    def record(self, key, value=1):
+        with self._lock:
+            self.counters[key] += value
+
+    def record_success(self, latency_ms):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            self.counters["successes"] += 1
+            self.counters["latency_ms_total"] += latency_ms
+        llm_request_duration.observe(latency_ms / 1000, self.name)
+
+    def record_usage(self, response):
+        """Tambahkan jumlah token dari objek usage Groq (`usage`) atau Gemini (`usage_metadata`)."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            prompt, completion = getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0)
+        else:
+            usage = getattr(response, "usage_metadata", None)
+            prompt = getattr(usage, "prompt_token_count", 0)
+            completion = getattr(usage, "candidates_token_count", 0)
+        with self._lock:
+            if isinstance(prompt, int):
+                self.counters["prompt_tokens"] += prompt
+            if isinstance(completion, int):
+                self.counters["completion_tokens"] += completion
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self, transient):
+        with self._lock:
+            self.counters["failures"] += 1
+            if self._trial_running:
+                # Percobaan half-open gagal (atau error lain): buka lagi circuit-nya
+                self._trial_running = False
+                if transient:
+                    self._opened_at = time.monotonic()
+                return
+            if transient:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= LLM_BREAKER_THRESHOLD:
+                    self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["state"] = self.state()
+            stats["consecutive_failures"] = self._consecutive_failures
+        stats["max_concurrency"] = LLM_MAX_CONCURRENCY
+        stats["avg_latency_ms"] = (
+            round(stats["latency_ms_total"] / stats["successes"], 1) if stats["successes"] else 0.0
+        )
+        return stats
+
+
+_providers = {"groq": _Provider("groq"), "gemini": _Provider("gemini")}
+
+
+def _status_code(error):
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_transient_error(error):
+    """Error yang layak dicoba ulang dan dihitung oleh circuit breaker."""
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    # groq.APIConnectionError/APITimeoutError dan google.api_core DeadlineExceeded/ServiceUnavailable
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError", "DeadlineExceeded", "ServiceUnavailable"):
+        return True
+    status = _status_code(error)
+    return status is not None and (status in _RETRYABLE_STATUS or status >= 500)
+
+
+def _backoff_seconds(attempt):
+    # "Full jitter": acak antara 0 dan batas exponential agar retry dari banyak worker tidak serempak
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _acquire_slot(provider, deadline_at):
+    provider.admit()
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0 or not provider.semaphore.acquire(timeout=min(LLM_QUEUE_TIMEOUT, remaining)):
+        provider.record("rejected_busy")
+        provider.cancel_trial()
+        raise LLMUnavailable(f"Layanan AI ({provider.name}) sedang sibuk, coba lagi nanti.")
+    provider.record("calls")
+    provider.record("in_flight")
+
+
+def _release_slot(provider):
+    provider.record("in_flight", -1)
+    provider.semaphore.release()
+
+
+def _retry_delay(provider, error, attempt, deadline_at):
+    """Catat kegagalan; mengembalikan jeda sebelum percobaan berikutnya atau None jika tidak perlu retry."""
+    transient = is_transient_error(error)
+    provider.record_failure(transient)
+    delay = _backoff_seconds(attempt)
+    if not transient or attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline_at:
+        return None
+    provider.record("retries")
+    return delay
+
+
+def call_llm(provider_name, send, deadline=None):
+    """
+    Jalankan `send(timeout_seconds)` untuk provider tertentu dengan batas konkurensi,
+    retry, dan circuit breaker. `timeout_seconds` adalah sisa deadline dan harus
+    diteruskan ke SDK provider. Error permanen atau error terakhir diteruskan apa adanya.
+    """
+    provider = _providers[provider_name]
+    deadline_at = time.monotonic() + (deadline or LLM_DEADLINE_SECONDS)
+    attempt = 0
+
+    while True:
+        _acquire_slot(provider, deadline_at)
+        started = time.monotonic()
+        try:
+            result = send(deadline_at - started)
+        except Exception as e:
+            error = e
+        except BaseException:
+            # Mis. SystemExit/KeyboardInterrupt: bukan kegagalan provider, tetapi slot percobaan half-open dilepas
+            provider.cancel_trial()
+            raise
+        else:
+            provider.record_success((time.monotonic() - started) * 1000)
+            provider.record_usage(result)
+            return result
+        finally:
+            _release_slot(provider)
+
+        delay = _retry_delay(provider, error, attempt, deadline_at)
+        if delay is None:
+            raise error
+        attempt += 1
+        time.sleep(delay)
+
+
+def stream_llm(provider_name, send, deadline=None):
+    """
+    Versi streaming dari call_llm: `send(timeout_seconds)` mengembalikan iterable
+    potongan teks yang diteruskan apa adanya. Slot semaphore ditahan sampai stream
+    selesai (atau ditutup client), dan retry hanya dilakukan sebelum potongan
+    pertama terkirim.
+    """
+    provider = _providers[provider_name]
+    deadline_at = time.monotonic() + (deadline or LLM_DEADLINE_SECONDS)
+    attempt = 0
+
+    while True:
+        _acquire_slot(provider, deadline_at)
+        started = time.monotonic()
+        sent_any = False
+        try:
+            for chunk in send(deadline_at - started):
+                sent_any = True
+                yield chunk
+        except Exception as e:
+            error = e
+        except BaseException:
+            # GeneratorExit saat client SSE menutup koneksi di tengah stream: tidak dihitung
+            # sukses/gagal, tetapi slot percobaan half-open dilepas agar breaker bisa menutup lagi
+            provider.cancel_trial()
+            raise
+        else:
+            provider.record_success((time.monotonic() - started) * 1000)
+            return
+        finally:
+            _release_slot(provider)
+
+        delay = _retry_delay(provider, error, attempt, deadline_at)
+        if delay is None or sent_any:
+            raise error
+        attempt += 1
+        time.sleep(delay)
+
+
+# --- Groq ---
+
+def _create_groq_client():
+    if LLM_BACKEND == "fake":
+        return FakeGroqClient()
+    return Groq(
+        api_key=os.environ.get("GROQ_API_KEY"),
+        max_retries=0,  # retry diatur oleh call_llm
+        http_client=httpx.Client(limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS
+        )),
+    )
+
+
+_groq_client = _create_groq_client()
+
+
+def groq_chat(deadline=None, **kwargs):
+    """`client.chat.completions.create(**kwargs)` lewat gateway; mengembalikan objek completion."""
+    return call_llm(
+        "groq",
+        lambda timeout: _groq_client.chat.completions.create(timeout=timeout, **kwargs),
+        deadline,
+    )
+
+
+# --- Gemini ---
+
+_gemini_model = None
+_gemini_lock = threading.Lock()
+
+
+def _get_gemini_model():
+    """Model Gemini dibuat sekali saat pertama dipakai (klien gRPC-nya dipakai ulang)."""
+    global _gemini_model
+    with _gemini_lock:
+        if _gemini_model is None:
+            if LLM_BACKEND == "fake":
+                _gemini_model = FakeGeminiModel(GEMINI_MODEL_NAME)
+            else:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise LLMUnavailable("GEMINI_API_KEY environment variable not set. Please set it in your .env file.")
+                genai.configure(api_key=api_key)
+                _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+                print(f"Menggunakan model Gemini: {_gemini_model.model_name}")
+        return _gemini_model
+
+
+def gemini_generate(prompt, deadline=None):
+    """`model.generate_content(prompt)` lewat gateway; mengembalikan respons Gemini."""
+    model = _get_gemini_model()
+    return call_llm(
+        "gemini",
+        lambda timeout: model.generate_content(prompt, request_options={"timeout": timeout}),
+        deadline,
+    )
+
+
+def _gemini_text_chunks(response):
+    chunk = None
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Potongan tanpa teks (mis. hanya metadata/safety)
+            continue
+        if text:
+            yield text
+    # Jumlah token stream tersedia di potongan terakhir
+    _providers["gemini"].record_usage(chunk)
+
+
+def gemini_generate_stream(prompt, deadline=None):
+    """Potongan teks dari `model.generate_content(prompt, stream=True)` lewat gateway."""
+    model = _get_gemini_model()
+    return stream_llm(
+        "gemini",
+        lambda timeout: _gemini_text_chunks(
+            model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        ),
+        deadline,
+    )
+
+
+def gateway_stats():
+    return {name: provider.stats() for name, provider in _providers.items()}
@@ -1,30 +1,37 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, jwt_required
+from werkzeug.exceptions import RequestEntityTooLarge
 from app.models import db
 from user_api import user_blueprint
 from transactions_api import transaction_bp
 from dashboard_api import dashboard_blueprint
 from ocr_api import ocr_blueprint
 from scoring_api import scoring_blueprint
+from metrics_api import metrics_blueprint
+from rollup_service import rebuild_daily_totals_command
+from batch_scoring import score_batch_command
+from forecast_service import forecast_batch_command
+from schema_service import ensure_indexes_command
+from koneksi import database_uri, engine_options, init_pool_warmup, pool_stats
+from metrics_service import init_metrics
+from query_profiler import init_query_profiler
 from dotenv import load_dotenv
 import os
 
 # ✅ Load .env file
 load_dotenv()
 
-# ✅ Ambil dari environment
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-db_name = os.getenv("DB_NAME")
-
 # ✅ Konfigurasi Flask & DB
 app = Flask(__name__)
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "fallback-secret")
-app.config["SQLALCHEMY_DATABASE_URI"] = f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+# ✅ Satu pool untuk ORM dan get_conn() (lihat koneksi.py)
+app.config["SQLALCHEMY_DATABASE_URI"] = database_uri()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options()
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# ✅ Batas ukuran body per request (upload nota, import NDJSON). Werkzeug menolak
+# request yang lebih besar dengan 413 sebelum body di-spool ke memori/disk.
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_CONTENT_LENGTH", 50 * 1024 * 1024))
 
 # ✅ Init ekstensi
 db.init_app(app)
@@ -37,11 +44,37 @@ app.register_blueprint(transaction_bp, url_prefix='/transactions')
 app.register_blueprint(ocr_blueprint, url_prefix='/ocr')
 app.register_blueprint(scoring_blueprint, url_prefix='/scoring')
 app.register_blueprint(dashboard_blueprint)
+app.register_blueprint(metrics_blueprint)
+
+# ✅ Latensi endpoint dan statement SQL per request (dibaca lewat /metrics)
+init_metrics(app)
+# ✅ Detektor query lambat/N+1, hanya aktif jika QUERY_PROFILE=1
+init_query_profiler(app)
+
+# ✅ Perintah CLI (flask --app main <perintah>)
+app.cli.add_command(rebuild_daily_totals_command)
+app.cli.add_command(score_batch_command)
+app.cli.add_command(forecast_batch_command)
+app.cli.add_command(ensure_indexes_command)
+
+# ✅ Buka koneksi pool saat request pertama (bukan saat import, agar perintah CLI tidak ikut)
+init_pool_warmup(app)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    return jsonify({"error": f"Ukuran request melebihi batas {app.config['MAX_CONTENT_LENGTH']} byte."}), 413
 
 
 @app.route('/')
 def index():
     return jsonify({"message": "Welcome! Available prefixes: /user, /transactions, /dashboard"})
 
+
+@app.route('/db/pool-stats', methods=['GET'])
+@jwt_required()
+def get_pool_stats():
+    return jsonify(pool_stats()), 200
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,80 @@
+# metrics_api.py
+"""
+GET /metrics: metrik performa dalam format teks Prometheus.
+
+Histogram dan counter berasal dari metrics_service.py; kondisi pool database dan
+counter gateway LLM dibaca saat scrape. Endpoint ini membutuhkan header
+"Authorization: Bearer <METRICS_TOKEN>"; tanpa METRICS_TOKEN endpoint ditutup (403),
+karena isinya (nama endpoint, kondisi pool, status circuit breaker) bersifat internal.
+"""
+import hmac
+import os
+
+from flask import Blueprint, Response, request
+
+from koneksi import pool_stats
+from llm_gateway import gateway_stats
+from metrics_service import format_labels, render_registry
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+# (nama metrik, tipe, key di pool_stats(), keterangan)
+_POOL_METRICS = [
+    ("db_pool_size", "gauge", "pool_size", "Ukuran tetap pool database."),
+    ("db_pool_checked_out", "gauge", "checked_out", "Koneksi yang sedang dipinjam."),
+    ("db_pool_idle", "gauge", "idle", "Koneksi bebas di pool."),
+    ("db_pool_overflow", "gauge", "overflow", "Koneksi overflow yang sedang terbuka."),
+    ("db_pool_waiting", "gauge", "waiting", "Checkout yang sedang menunggu koneksi."),
+    ("db_pool_timeouts_total", "counter", "timeouts", "Checkout yang gagal (timeout atau error koneksi)."),
+]
+
+# (nama metrik, tipe, key di gateway_stats()[provider], keterangan)
+_LLM_METRICS = [
+    ("llm_calls_total", "counter", "calls", "Panggilan LLM yang dikirim (termasuk retry)."),
+    ("llm_failures_total", "counter", "failures", "Panggilan LLM yang gagal."),
+    ("llm_retries_total", "counter", "retries", "Retry panggilan LLM."),
+    ("llm_rejected_open_total", "counter", "rejected_open", "Panggilan ditolak karena circuit terbuka."),
+    ("llm_rejected_busy_total", "counter", "rejected_busy", "Panggilan ditolak karena semua slot terpakai."),
+    ("llm_in_flight", "gauge", "in_flight", "Panggilan LLM yang sedang berjalan."),
+    ("llm_prompt_tokens_total", "counter", "prompt_tokens", "Token prompt yang dikirim."),
+    ("llm_completion_tokens_total", "counter", "completion_tokens", "Token jawaban yang diterima."),
+]
+
+
+def _render_samples(name, metric_type, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines += [f"{name}{labels} {value}" for labels, value in samples]
+    return lines
+
+
+def render_metrics():
+    lines = render_registry()
+
+    pool = pool_stats()
+    for name, metric_type, key, help_text in _POOL_METRICS:
+        if key in pool:
+            lines += _render_samples(name, metric_type, help_text, [("", pool[key])])
+
+    providers = gateway_stats()
+    for name, metric_type, key, help_text in _LLM_METRICS:
+        lines += _render_samples(name, metric_type, help_text, [
+            (format_labels(("provider",), (provider,)), stats[key]) for provider, stats in providers.items()
+        ])
+    lines += _render_samples("llm_breaker_state", "gauge", "Circuit breaker: 0 closed, 1 half-open, 2 open.", [
+        (format_labels(("provider",), (provider,)), _BREAKER_STATES[stats["state"]])
+        for provider, stats in providers.items()
+    ])
+    return "\n".join(lines) + "\n"
+
+
+@metrics_blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not METRICS_TOKEN:
+        return Response("METRICS_TOKEN belum diset\n", status=403, mimetype="text/plain")
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,209 @@
+# metrics_service.py
+"""
+Metrik performa per proses dalam format teks Prometheus (dibaca lewat GET /metrics,
+lihat metrics_api.py).
+
+- Latensi setiap endpoint (histogram per endpoint, method, dan status).
+- Jumlah dan durasi statement SQL, baik dari SQLAlchemy (event cursor engine)
+  maupun dari cursor get_conn() (dibungkus di koneksi.py); juga dihitung per request.
+- Latensi panggilan LLM per provider (dicatat oleh llm_gateway.py) dan waktu tunggu
+  checkout pool database (dicatat oleh koneksi.py).
+
+Setiap pencatatan hanya berupa bisect + penambahan di bawah lock per metrik,
+sehingga overhead di jalur request dapat diabaikan.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [jumlah per bucket (non-kumulatif, + bucket +Inf), total, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((labels, (list(e[0]), e[1], e[2])) for labels, e in self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), bucket_counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render_registry():
+    return [line for metric in _registry for line in metric.render()]
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Latensi request per endpoint.", ("endpoint", "method", "status"))
+sql_statement_duration = Histogram(
+    "sql_statement_duration_seconds", "Durasi statement SQL.", ("source",), SQL_BUCKETS)
+sql_statements_per_request = Histogram(
+    "sql_statements_per_request", "Jumlah statement SQL per request.", ("endpoint",), COUNT_BUCKETS)
+sql_seconds_per_request = Histogram(
+    "sql_seconds_per_request", "Total waktu SQL per request.", ("endpoint",), SQL_BUCKETS)
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "Latensi panggilan LLM yang berhasil.", ("provider",))
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds", "Waktu tunggu checkout koneksi dari pool.", (), SQL_BUCKETS)
+
+
+# --- SQL ---
+
+# List penampung (statement, detik) yang sedang aktif, lihat capture_sql()
+_sql_captures = ContextVar("sql_captures", default=())
+
+
+def start_sql_capture():
+    """Mulai mengumpulkan statement SQL; mengembalikan (list (statement, detik), token untuk stop)."""
+    captured = []
+    return captured, _sql_captures.set(_sql_captures.get() + (captured,))
+
+
+def stop_sql_capture(token):
+    _sql_captures.reset(token)
+
+
+@contextmanager
+def capture_sql():
+    """Kumpulkan setiap statement SQL di blok ini sebagai list (statement, detik)."""
+    captured, token = start_sql_capture()
+    try:
+        yield captured
+    finally:
+        stop_sql_capture(token)
+
+
+def record_sql(source, statement, seconds):
+    """Catat satu statement SQL (`source`: 'orm' atau 'raw') ke metrik global dan request aktif."""
+    sql_statement_duration.observe(seconds, source)
+    for captured in _sql_captures.get():
+        captured.append((statement, seconds))
+    if has_request_context():
+        stats = g.get("_sql_stats")
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += seconds
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["_query_started"].pop()
+    record_sql("orm", statement, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Statement yang gagal tetap dihitung, dan stack waktu mulai tidak tertinggal
+    started = context.connection.info.get("_query_started") if context.connection is not None else None
+    if started:
+        record_sql("orm", context.statement, time.perf_counter() - started.pop())
+
+
+# --- Request ---
+
+def _start_request():
+    g._request_started = time.perf_counter()
+    g._sql_stats = [0, 0.0]
+
+
+def _observe_request(started, endpoint, method, status_code, sql_stats):
+    http_request_duration.observe(time.perf_counter() - started, endpoint, method, status_code)
+    count, seconds = sql_stats
+    sql_statements_per_request.observe(count, endpoint)
+    sql_seconds_per_request.observe(seconds, endpoint)
+
+
+def _finish_request(response):
+    started = g.get("_request_started")
+    if started is None:
+        return response
+    args = (started, request.endpoint or "unmatched", request.method, response.status_code, g._sql_stats)
+    if response.is_streamed:
+        # Body stream (CSV laporan, SSE, file) baru dijalankan setelah after_request;
+        # latensi dan SQL-nya dicatat saat server menutup response
+        response.call_on_close(lambda: _observe_request(*args))
+    else:
+        _observe_request(*args)
+    return response
+
+
+def init_metrics(app):
+    """Pasang pencatatan latensi dan SQL per request untuk semua blueprint di `app`."""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -1,250 +1,396 @@
-<<<<<<< HEAD
 from flask import Blueprint, request, jsonify, g
 from app.models import db, Transaction  # pastikan Transaction juga diimport di sini
-from groq_service import structure_receipt_from_image, classify_transaction
+from groq_service import structure_receipt_from_bytes
+from classification_service import classify_transactions, classification_stats
 from user_api import token_required
+from rollup_service import add_to_daily_totals
+from ocr_jobs import submit_ocr_job, get_ocr_job, OcrQueueFull
+from ocr_cache import image_hash, get_cached_result, store_result, find_saved_upload, mark_upload_saved
+from image_preprocess import (
+    prepare_image_for_ocr, pdf_page_images, check_upload_size, ImageTooLarge, InvalidDocument, OCR_MAX_PAGES
+)
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime # Import datetime for current date and parsing
 
 ocr_blueprint = Blueprint('ocr', __name__)
 
-@ocr_blueprint.route('/process-receipt', methods=['POST'])
-@token_required
-def process_receipt_endpoint():
-    user_id = g.user.id
-=======
-# ocr_api.py
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", 4))
+# Satu pool untuk semua request agar jumlah panggilan AI paralel per proses tetap terbatas
+_page_executor = ThreadPoolExecutor(max_workers=OCR_PAGE_WORKERS, thread_name_prefix="ocr-page")
 
-import os
-import base64
-import json
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from groq import Groq
-from datetime import datetime
-
-# Impor model dan session database dari proyek utama
-from app.models import db, Transaction
-
-# Inisialisasi Klien Groq (pastikan GROQ_API_KEY ada di file .env Anda)
-try:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-except Exception as e:
-    print(f"❌ Peringatan: Gagal menginisialisasi Groq Client. Error: {e}")
-    client = None
-
-# Buat Blueprint untuk OCR
-ocr_blueprint = Blueprint('ocr', __name__)
+# Batas per request /ocr/classify; setiap deskripsi bisa memicu lookup cache, DB, dan AI
+MAX_CLASSIFY_DESCRIPTIONS = int(os.getenv("MAX_CLASSIFY_DESCRIPTIONS", 1000))
+MAX_DESCRIPTION_LENGTH = 255  # sama dengan kolom transactions.description
+
+def build_receipt_transactions(user_id, json_string):
+    """Objek Transaction (belum disimpan) dari output AI (string JSON {"transactions": [...]})."""
+    data = json.loads(json_string)
+
+    transactions_data = data.get('transactions', [])
+    
+    transactions_to_save = []
+
+    if isinstance(transactions_data, list):
+        for trx in transactions_data:
+            description = trx.get('description', '')
+            amount_raw = trx.get('amount', 0) 
+            # Langsung gunakan 'type' dari output AI. Default ke 'pengeluaran' jika tidak ada (walaupun prompt sudah mengaturnya)
+            trx_type = trx.get('type', 'pengeluaran') 
+            
+            def clean_amount(value):
+                if isinstance(value, (int, float)): return value
+                if isinstance(value, str):
+                    try:
+                        # Menggunakan int(float(...)) untuk memastikan handling desimal jika ada, lalu ke integer
+                        return int(float(value.replace('Rp', '').replace('.', '').replace(',', '').strip()))
+                    except (ValueError, AttributeError): return 0
+                return 0
+            
+            amount = clean_amount(amount_raw)
+            
+            # Pastikan amount tidak negatif jika AI entah bagaimana mengembalikan negatif
+            if amount < 0:
+                amount = 0
+
+            # Periksa apakah tipe valid dan jumlahnya masuk akal
+            if trx_type in ['pemasukan', 'pengeluaran']: 
+                transaction_date_str = trx.get('date')
+                transaction_date = datetime.now().date() 
+                if transaction_date_str:
+                    try:
+                        # Parsing tanggal yang lebih robust jika diperlukan, atau cukup percaya AI
+                        transaction_date = datetime.strptime(transaction_date_str, '%Y-%m-%d').date()
+                    except ValueError:
+                        # Jika format dari AI salah, fallback ke tanggal sekarang
+                        pass 
+                
+                new_transaction = Transaction(
+                    user_id=user_id,
+                    description=description,
+                    amount=float(amount), # Pastikan ini float sesuai model
+                    type=trx_type, 
+                    # Tidak ada 'category' yang dikirim ke model jika memang tidak ada kolomnya
+                    date=transaction_date
+                )
+                transactions_to_save.append(new_transaction)
+            else:
+                print(f"Skipping transaction due to invalid type: {trx_type} for description: {description}")
 
+    return transactions_to_save
 
-# --- Helper Functions (dari groq_service.py) ---
 
-def structure_receipt_from_image(image_file):
+def _add_receipt_transactions(user_id, transactions_to_save):
+    db.session.add_all(transactions_to_save)
+    add_to_daily_totals(user_id, [(t.date, t.type, t.amount, t.description) for t in transactions_to_save])
+
+
+def save_receipt_transactions(user_id, json_string, digest=None):
     """
-    AI #1: Mengubah gambar nota/laporan menjadi JSON terstruktur.
+    Simpan transaksi dari output AI (string JSON {"transactions": [...]}).
+    Jika `digest` (hash gambar) diberikan, nota dicatat sebagai sudah disimpan.
+    Mengembalikan (payload, status_code); exception diteruskan ke pemanggil.
     """
-    image_bytes = base64.b64encode(image_file.read()).decode('utf-8')
-    mime_type = image_file.mimetype
-    
-    prompt = """
-        Anda adalah AI akuntan yang sangat teliti.
-        Analisis gambar laporan keuangan ini baris per baris.
-        Untuk setiap baris transaksi yang valid (abaikan 'Saldo' atau 'Total'), ekstrak informasi berikut:
-        1. `date`: Tanggal transaksi dalam format YYYY-MM-DD. Jika tahun tidak ada, asumsikan tahun berjalan.
-        2. `description`: Teks lengkap dari kolom 'Keterangan'.
-        3. `income`: Angka dari kolom 'Pemasukan'. Jika kosong, nilainya 0.
-        4. `expense`: Angka dari kolom 'Pengeluaran'. Jika kosong, nilainya 0.
-
-        Hasilkan output HANYA dalam format JSON yang berisi satu kunci utama "transactions"
-        yang nilainya adalah sebuah ARRAY dari objek transaksi. Contoh: {"transactions": [{"date": ...}, ...]}
+    transactions_to_save = build_receipt_transactions(user_id, json_string)
+
+    if transactions_to_save:
+        _add_receipt_transactions(user_id, transactions_to_save)
+        if digest:
+            mark_upload_saved(user_id, digest, len(transactions_to_save))
+        db.session.commit()
+        
+        return {
+            "message": "Laporan berhasil diproses dan disimpan.",
+            "saved_count": len(transactions_to_save)
+        }, 201
+    else:
+        return {"message": "Tidak ada transaksi valid yang terdeteksi untuk disimpan."}, 200
+
+
+def _structure_receipt_cached(digest, load_image):
     """
-    
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:{mime_type};base64,{image_bytes}"},
-                    },
-                ],
-            }
-        ],
-        model="llama3-groq-8b-8192-tool-use-preview", # Model yang support JSON mode
-        response_format={"type": "json_object"},
-        temperature=0.1,
-        max_tokens=2048,
-    )
-    
-    return chat_completion.choices[0].message.content
+    Hasil OCR dari cache berdasarkan hash gambar; panggil AI hanya jika belum ada.
+    `load_image()` mengembalikan (image_bytes, mime_type, stats) dan hanya dipanggil
+    saat cache miss, sehingga gambar tidak perlu di-decode/diperkecil jika hasilnya sudah ada.
+    Mengembalikan (json_string, from_cache, image_stats).
+    """
+    json_string = get_cached_result(digest)
+    if json_string is not None:
+        return json_string, True, None
+
+    image_bytes, mime_type, image_stats = load_image()
+    json_string = structure_receipt_from_bytes(image_bytes, mime_type)
+    # Hasil kosong bisa jadi kegagalan sementara dari AI, jadi tidak di-cache
+    if json.loads(json_string).get('transactions'):
+        store_result(digest, json_string)
+    return json_string, False, image_stats
+
+
+def _duplicate_upload_payload(previous_upload):
+    return {
+        "message": "Nota ini sudah pernah diproses dan disimpan sebelumnya.",
+        "saved_count": 0,
+        "duplicate": True,
+        "previous_saved_count": previous_upload.saved_count
+    }
+
+
+def _process_receipt_job(user_id, digest, prepared_image, force_insert):
+    previous_upload = None if force_insert else find_saved_upload(user_id, digest)
+    if previous_upload:
+        return _duplicate_upload_payload(previous_upload), 200
+
+    json_string, from_cache, image_stats = _structure_receipt_cached(digest, lambda: prepared_image)
+    payload, status_code = save_receipt_transactions(user_id, json_string, digest)
+    return {**payload, "from_cache": from_cache, "image": image_stats}, status_code
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
 
-# Catatan: Model 'Transaction' Anda tidak punya kolom 'category'.
-# Fungsi 'classify_transaction' tidak akan digunakan untuk menyimpan ke DB,
-# tapi bisa dipakai jika Anda ingin menampilkan kategori di response.
-# Jika ingin menyimpan kategori, tambahkan kolom 'category' di model Transaction.
+def _is_pdf(file):
+    return file.mimetype == 'application/pdf' or file.filename.lower().endswith('.pdf')
+
+
+def _collect_pages(files, prepare_now):
+    """
+    Pecah upload menjadi daftar halaman {"page", "digest", "file", "prepared"}.
+    Halaman PDF selalu di-render di sini. Gambar biasa diperkecil di worker, kecuali
+    `prepare_now` (mode async: stream upload tidak bisa dibaca lagi setelah request selesai).
+    """
+    pages = []
+    for file in files:
+        if _is_pdf(file):
+            for number, prepared in enumerate(pdf_page_images(file.stream), start=1):
+                pages.append({
+                    "page": f"{file.filename}#{number}",
+                    "digest": hashlib.sha256(prepared[0]).hexdigest(),
+                    "file": None,
+                    "prepared": prepared
+                })
+        else:
+            check_upload_size(file.stream)
+            pages.append({
+                "page": file.filename,
+                "digest": image_hash(file.stream),
+                "file": None if prepare_now else file,
+                "prepared": prepare_image_for_ocr(file.stream, file.mimetype) if prepare_now else None
+            })
+        if len(pages) > OCR_MAX_PAGES:
+            raise ImageTooLarge(f"Jumlah halaman melebihi batas {OCR_MAX_PAGES} halaman per upload.")
+    return pages
+
+
+def _extract_page(page, submitted_at):
+    """Dijalankan di _page_executor: perkecil gambar (jika belum) lalu panggil AI. Tidak menyentuh DB."""
+    started = time.perf_counter()
+    prepared = page["prepared"] or prepare_image_for_ocr(page["file"].stream, page["file"].mimetype)
+    prepared_at = time.perf_counter()
+    json_string = structure_receipt_from_bytes(prepared[0], prepared[1])
+    return json_string, prepared[2], {
+        "queued_ms": round((started - submitted_at) * 1000, 1),
+        "prepare_ms": round((prepared_at - started) * 1000, 1),
+        "ocr_ms": _elapsed_ms(prepared_at)
+    }
+
+
+def _process_receipt_pages(user_id, pages, force_insert):
+    """
+    Ekstraksi semua halaman secara paralel (maks. OCR_PAGE_WORKERS panggilan AI
+    sekaligus), lalu simpan gabungan transaksinya dalam satu commit.
+    Mengembalikan (payload, status_code) dengan rincian waktu per halaman.
+    """
+    started = time.perf_counter()
+    reports = [{"page": page["page"]} for page in pages]
+    results = [None] * len(pages)
+    futures = {}
+    seen_digests = set()
+
+    for i, page in enumerate(pages):
+        digest = page["digest"]
+        if digest in seen_digests or (not force_insert and find_saved_upload(user_id, digest)):
+            reports[i]["duplicate"] = True
+            continue
+        seen_digests.add(digest)
+
+        cached = get_cached_result(digest)
+        if cached is not None:
+            results[i] = cached
+            reports[i]["from_cache"] = True
+        else:
+            futures[_page_executor.submit(_extract_page, page, time.perf_counter())] = i
+
+    for future, i in futures.items():
+        try:
+            json_string, image_stats, timing = future.result()
+        except Exception as e:
+            reports[i]["error"] = str(e)
+            continue
+        # Hasil kosong bisa jadi kegagalan sementara dari AI, jadi tidak di-cache
+        if json.loads(json_string).get('transactions'):
+            store_result(pages[i]["digest"], json_string)
+        results[i] = json_string
+        reports[i].update(from_cache=False, image=image_stats, **timing)
+    extract_ms = _elapsed_ms(started)
+
+    transactions_to_save = []
+    for i, json_string in enumerate(results):
+        if json_string is None:
+            continue
+        page_transactions = build_receipt_transactions(user_id, json_string)
+        reports[i]["saved_count"] = len(page_transactions)
+        if page_transactions:
+            transactions_to_save.extend(page_transactions)
+            mark_upload_saved(user_id, pages[i]["digest"], len(page_transactions))
+
+    if transactions_to_save:
+        _add_receipt_transactions(user_id, transactions_to_save)
+    db.session.commit()
+
+    payload = {
+        "message": "Laporan berhasil diproses dan disimpan." if transactions_to_save
+        else "Tidak ada transaksi valid yang terdeteksi untuk disimpan.",
+        "saved_count": len(transactions_to_save),
+        "page_count": len(pages),
+        "pages": reports,
+        "extract_ms": extract_ms,
+        "total_ms": _elapsed_ms(started)
+    }
+    return payload, 201 if transactions_to_save else 200
+
+
+def _process_receipt_batch(user_id, files, force_insert):
+    """Beberapa file dan/atau PDF multi-halaman dalam satu request."""
+    is_async = request.args.get('mode') == 'async'
+    started = time.perf_counter()
+    try:
+        pages = _collect_pages(files, prepare_now=is_async)
+    except ImageTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except InvalidDocument as e:
+        return jsonify({"error": str(e)}), 400
+    split_ms = _elapsed_ms(started)
+
+    if is_async:
+        try:
+            job_id = submit_ocr_job(user_id, _process_receipt_pages, user_id, pages, force_insert)
+        except OcrQueueFull as e:
+            return jsonify({"error": str(e)}), 429
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "page_count": len(pages),
+            "status_url": f"/ocr/jobs/{job_id}"
+        }), 202
+
+    try:
+        payload, status_code = _process_receipt_pages(user_id, pages, force_insert)
+        return jsonify({**payload, "split_ms": split_ms}), status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-# --- API Endpoint ---
 
 @ocr_blueprint.route('/process-receipt', methods=['POST'])
-@jwt_required() # ✅ Menggunakan decorator dari Flask-JWT-Extended
+@token_required
 def process_receipt_endpoint():
-    # ✅ Mengambil user_id dari token JWT
-    user_id = get_jwt_identity()
-    
-    if not client:
-        return jsonify({"error": "Layanan AI tidak terkonfigurasi. Periksa GROQ_API_KEY."}), 503
-
->>>>>>> 4b73e29c84ae99afa1155b8cfa09a32981670d65
+    user_id = g.user.id
     if 'image' not in request.files:
         return jsonify({"error": "File gambar tidak ditemukan."}), 400
 
-    file = request.files['image']
-    if file.filename == '':
+    files = [f for f in request.files.getlist('image') if f.filename != '']
+    if not files:
         return jsonify({"error": "File tidak dipilih."}), 400
+    # ?force_insert=1 tetap menyimpan transaksi walaupun nota yang sama sudah pernah disimpan
+    force_insert = request.args.get('force_insert') in ('1', 'true')
+
+    # Beberapa field 'image' sekaligus atau PDF: setiap halaman diekstraksi paralel
+    if len(files) > 1 or _is_pdf(files[0]):
+        return _process_receipt_batch(user_id, files, force_insert)
+
+    file = files[0]
+    # Upload besar sudah di-spool ke disk oleh Werkzeug; jangan dibaca utuh ke memori
+    try:
+        check_upload_size(file.stream)
+    except ImageTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    digest = image_hash(file.stream)
+
+    # Mode job: langsung kembalikan job_id, ekstraksi dikerjakan di background.
+    # Gambar diperkecil di sini karena stream upload tidak bisa dibaca lagi setelah request selesai.
+    if request.args.get('mode') == 'async':
+        try:
+            prepared_image = prepare_image_for_ocr(file.stream, file.mimetype)
+            job_id = submit_ocr_job(user_id, _process_receipt_job, user_id, digest, prepared_image, force_insert)
+        except ImageTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        except InvalidDocument as e:
+            return jsonify({"error": str(e)}), 400
+        except OcrQueueFull as e:
+            return jsonify({"error": str(e)}), 429
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/ocr/jobs/{job_id}"
+        }), 202
 
-<<<<<<< HEAD
     json_string = None 
     try:
-        json_string = structure_receipt_from_image(file)
-        data = json.loads(json_string) 
+        previous_upload = None if force_insert else find_saved_upload(user_id, digest)
+        if previous_upload:
+            return jsonify(_duplicate_upload_payload(previous_upload)), 200
 
-        transactions_data = data.get('transactions', [])
-        
-        transactions_to_save = []
-
-        if isinstance(transactions_data, list):
-            for trx in transactions_data:
-                description = trx.get('description', '')
-                amount_raw = trx.get('amount', 0) 
-                # Langsung gunakan 'type' dari output AI. Default ke 'pengeluaran' jika tidak ada (walaupun prompt sudah mengaturnya)
-                trx_type = trx.get('type', 'pengeluaran') 
-                
-                def clean_amount(value):
-                    if isinstance(value, (int, float)): return value
-                    if isinstance(value, str):
-                        try:
-                            # Menggunakan int(float(...)) untuk memastikan handling desimal jika ada, lalu ke integer
-                            return int(float(value.replace('Rp', '').replace('.', '').replace(',', '').strip()))
-                        except (ValueError, AttributeError): return 0
-                    return 0
-                
-                amount = clean_amount(amount_raw)
-                
-                # Pastikan amount tidak negatif jika AI entah bagaimana mengembalikan negatif
-                if amount < 0:
-                    amount = 0
-
-                # Periksa apakah tipe valid dan jumlahnya masuk akal
-                if trx_type in ['pemasukan', 'pengeluaran']: 
-                    transaction_date_str = trx.get('date')
-                    transaction_date = datetime.now().date() 
-                    if transaction_date_str:
-                        try:
-                            # Parsing tanggal yang lebih robust jika diperlukan, atau cukup percaya AI
-                            transaction_date = datetime.strptime(transaction_date_str, '%Y-%m-%d').date()
-                        except ValueError:
-                            # Jika format dari AI salah, fallback ke tanggal sekarang
-                            pass 
-                    
-                    new_transaction = Transaction(
-                        user_id=user_id,
-                        description=description,
-                        amount=float(amount), # Pastikan ini float sesuai model
-                        type=trx_type, 
-                        # Tidak ada 'category' yang dikirim ke model jika memang tidak ada kolomnya
-                        date=transaction_date
-                    )
-                    transactions_to_save.append(new_transaction)
-                else:
-                    print(f"Skipping transaction due to invalid type: {trx_type} for description: {description}")
-
-
-        if transactions_to_save:
-            db.session.add_all(transactions_to_save)
-            db.session.commit()
-            
-            return jsonify({
-                "message": "Laporan berhasil diproses dan disimpan.",
-                "saved_count": len(transactions_to_save)
-            }), 201
-        else:
-            return jsonify({"message": "Tidak ada transaksi valid yang terdeteksi untuk disimpan."}), 200
+        json_string, from_cache, image_stats = _structure_receipt_cached(
+            digest, lambda: prepare_image_for_ocr(file.stream, file.mimetype)
+        )
+        payload, status_code = save_receipt_transactions(user_id, json_string, digest)
+        return jsonify({**payload, "from_cache": from_cache, "image": image_stats}), status_code
 
+    except ImageTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except InvalidDocument as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e), "raw_output_from_ai": json_string}), 500
-=======
-    json_string_from_ai = ""
-    try:
-        # 1. Panggil AI untuk mengekstrak data dari gambar
-        json_string_from_ai = structure_receipt_from_image(file)
-        data = json.loads(json_string_from_ai)
 
-        # Ambil list transaksi dari kunci 'transactions'
-        transactions = data.get('transactions', [])
-        
-        if not isinstance(transactions, list):
-             return jsonify({
-                 "error": "Format JSON dari AI tidak sesuai, array 'transactions' tidak ditemukan.",
-                 "raw_output_from_ai": json_string_from_ai
-            }), 500
-
-        saved_count = 0
-        for item in transactions:
-            # 2. Proses setiap item transaksi
-            description = item.get('description', '')
-            income = float(item.get('income', 0))
-            expense = float(item.get('expense', 0))
-            date_str = item.get('date')
-
-            if not date_str or not description:
-                continue # Lewati jika data penting tidak ada
-
-            # Tentukan tipe dan jumlah
-            trx_type = None
-            amount = 0
-            if income > 0:
-                trx_type = 'pemasukan'
-                amount = income
-            elif expense > 0:
-                trx_type = 'pengeluaran'
-                amount = expense
-            
-            if not trx_type or amount <= 0:
-                continue # Lewati jika tidak ada jumlah yang valid
-            
-            # 3. Simpan ke database menggunakan SQLAlchemy
-            try:
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                
-                new_transaction = Transaction(
-                    user_id=user_id,
-                    type=trx_type,
-                    description=description.strip(),
-                    amount=amount,
-                    date=date_obj
-                )
-                db.session.add(new_transaction)
-                saved_count += 1
-            except (ValueError, TypeError) as e:
-                # Lewati item ini jika tanggal tidak valid
-                print(f"Skipping item due to invalid date: {date_str}, Error: {e}")
-                continue
-
-        if saved_count > 0:
-            db.session.commit()
-            return jsonify({
-                "message": f"{saved_count} transaksi berhasil diproses dan disimpan."
-            }), 201
-        else:
-            return jsonify({"message": "Tidak ada transaksi valid yang dapat disimpan dari gambar."}), 200
 
+@ocr_blueprint.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_ocr_job_status(job_id):
+    job = get_ocr_job(job_id, g.user.id)
+    if job is None:
+        return jsonify({"error": "Job tidak ditemukan."}), 404
+    return jsonify(job), 200
+
+
+@ocr_blueprint.route('/classify', methods=['POST'])
+@token_required
+def classify_descriptions():
+    """Body: {"descriptions": ["Bayar listrik", ...]} -> kategori dengan urutan yang sama."""
+    descriptions = (request.get_json(silent=True) or {}).get('descriptions')
+    if not isinstance(descriptions, list) or not all(isinstance(d, str) for d in descriptions):
+        return jsonify({"error": "'descriptions' harus berupa list string."}), 400
+    if len(descriptions) > MAX_CLASSIFY_DESCRIPTIONS:
+        return jsonify({"error": f"Maksimal {MAX_CLASSIFY_DESCRIPTIONS} deskripsi per request."}), 400
+    if any(len(d) > MAX_DESCRIPTION_LENGTH for d in descriptions):
+        return jsonify({"error": f"Panjang deskripsi maksimal {MAX_DESCRIPTION_LENGTH} karakter."}), 400
+
+    try:
+        categories = classify_transactions(descriptions)
     except Exception as e:
-        db.session.rollback() # ✅ Rollback jika terjadi kesalahan
-        return jsonify({
-            "error": f"Terjadi kesalahan: {str(e)}",
-            "raw_output_from_ai": json_string_from_ai
-        }), 500
->>>>>>> 4b73e29c84ae99afa1155b8cfa09a32981670d65
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "results": [{"description": d, "category": c} for d, c in zip(descriptions, categories)]
+    }), 200
+
+
+@ocr_blueprint.route('/classification-stats', methods=['GET'])
+@token_required
+def get_classification_stats():
+    return jsonify(classification_stats()), 200
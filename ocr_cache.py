@@ -0,0 +1,107 @@
+# ocr_cache.py
+"""
+Cache hasil OCR berdasarkan isi gambar (content-addressed).
+
+Kunci cache adalah sha256 dari byte gambar yang diupload, sehingga upload
+ulang nota yang sama tidak memanggil model vision lagi. Ukuran cache dibatasi
+OCR_CACHE_MAX_BYTES (jumlah panjang JSON hasil); jika terlampaui, entri yang
+paling lama tidak dipakai dihapus sampai total turun ke OCR_CACHE_EVICT_TO_RATIO
+dari batas. last_used_at hanya diperbarui jika sudah lebih tua dari
+OCR_CACHE_TOUCH_SECONDS, sehingga cache hit biasanya tidak menulis ke database.
+Tabel 'ocr_uploads' mencatat nota yang transaksinya sudah disimpan per user
+agar upload ulang tidak menghasilkan transaksi ganda.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, inspect
+
+from app.models import db, OcrResult, OcrUpload
+
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+OCR_CACHE_EVICT_TO_RATIO = 0.9
+OCR_CACHE_TOUCH_SECONDS = int(os.getenv("OCR_CACHE_TOUCH_SECONDS", 3600))
+
+_tables_ready = False
+
+
+def _ensure_tables():
+    global _tables_ready
+    if not _tables_ready:
+        OcrResult.__table__.create(db.engine, checkfirst=True)
+        OcrUpload.__table__.create(db.engine, checkfirst=True)
+        columns = {column["name"] for column in inspect(db.engine).get_columns(OcrResult.__tablename__)}
+        if "size" not in columns:
+            # Tabel dari versi lama (batas jumlah entri): tambah kolom ukuran lalu isi dari data yang ada
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {OcrResult.__tablename__} ADD COLUMN size INTEGER NOT NULL DEFAULT 0"
+                )
+                connection.exec_driver_sql(f"UPDATE {OcrResult.__tablename__} SET size = LENGTH(result)")
+        _tables_ready = True
+
+
+def image_hash(stream):
+    """sha256 dari isi file upload, dibaca per blok dari stream lalu posisinya dikembalikan ke awal."""
+    stream.seek(0)
+    digest = hashlib.file_digest(stream, "sha256").hexdigest()
+    stream.seek(0)
+    return digest
+
+
+def get_cached_result(digest):
+    """String JSON hasil OCR untuk gambar ini, atau None jika belum ada."""
+    _ensure_tables()
+    entry = db.session.query(OcrResult.result, OcrResult.last_used_at).filter_by(image_hash=digest).first()
+    if entry is None:
+        return None
+    now = datetime.utcnow()
+    if entry.last_used_at < now - timedelta(seconds=OCR_CACHE_TOUCH_SECONDS):
+        # Cukup kasar untuk urutan eviction; hit berikutnya dalam interval ini tanpa write
+        OcrResult.query.filter_by(image_hash=digest).update({"last_used_at": now}, synchronize_session=False)
+        db.session.commit()
+    return entry.result
+
+
+def store_result(digest, json_string):
+    """Simpan hasil OCR lalu buang entri tertua jika total ukuran cache melebihi OCR_CACHE_MAX_BYTES."""
+    _ensure_tables()
+    now = datetime.utcnow()
+    db.session.merge(OcrResult(
+        image_hash=digest, result=json_string, size=len(json_string.encode("utf-8")),
+        created_at=now, last_used_at=now
+    ))
+    db.session.commit()
+
+    total = db.session.query(func.coalesce(func.sum(OcrResult.size), 0)).scalar()
+    if total > OCR_CACHE_MAX_BYTES:
+        _evict(total - int(OCR_CACHE_MAX_BYTES * OCR_CACHE_EVICT_TO_RATIO))
+
+
+def _evict(bytes_to_free):
+    """Hapus entri yang paling lama tidak dipakai sampai minimal `bytes_to_free` byte terbebas."""
+    freed = 0
+    cutoff = None
+    rows = db.session.query(OcrResult.last_used_at, OcrResult.size).order_by(OcrResult.last_used_at)
+    for row in rows.yield_per(1000):
+        freed += row.size
+        cutoff = row.last_used_at
+        if freed >= bytes_to_free:
+            break
+    if cutoff is not None:
+        OcrResult.query.filter(OcrResult.last_used_at <= cutoff).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def find_saved_upload(user_id, digest):
+    """Catatan upload sebelumnya jika transaksi dari nota ini sudah pernah disimpan user."""
+    _ensure_tables()
+    return db.session.get(OcrUpload, (int(user_id), digest))
+
+
+def mark_upload_saved(user_id, digest, saved_count):
+    """Catat nota sebagai sudah disimpan. Tidak melakukan commit (ikut transaksi insert)."""
+    db.session.merge(OcrUpload(
+        user_id=int(user_id), image_hash=digest, saved_count=saved_count, created_at=datetime.utcnow()
+    ))
@@ -0,0 +1,110 @@
+# ocr_jobs.py
+"""
+Pipeline OCR asinkron.
+
+Upload diterima, job dicatat di tabel 'ocr_jobs' dengan status 'queued', lalu
+dikerjakan oleh thread pool berukuran tetap (OCR_JOB_WORKERS). Jumlah job yang
+menunggu + berjalan dibatasi OCR_JOB_MAX_PENDING agar memori gambar yang
+tertahan tidak tumbuh tanpa batas; di atas batas itu upload ditolak dengan 429. Status disimpan di DB sehingga bisa dibaca
+oleh proses web mana pun.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from app.models import db, OcrJob
+
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", 4))
+OCR_JOB_MAX_PENDING = int(os.getenv("OCR_JOB_MAX_PENDING", 100))
+
+_executor = ThreadPoolExecutor(max_workers=OCR_JOB_WORKERS, thread_name_prefix="ocr-job")
+_pending = threading.BoundedSemaphore(OCR_JOB_MAX_PENDING)
+_table_ready = False
+
+logger = logging.getLogger(__name__)
+
+
+class OcrQueueFull(Exception):
+    pass
+
+
+def _ensure_table():
+    global _table_ready
+    if not _table_ready:
+        OcrJob.__table__.create(db.engine, checkfirst=True)
+        _table_ready = True
+
+
+def _finish_job(job_id, status, result=None, error=None):
+    job = db.session.get(OcrJob, job_id)
+    job.status = status
+    job.result = json.dumps(result) if result is not None else None
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _run_job(app, job_id, handler, args):
+    try:
+        with app.app_context():
+            try:
+                db.session.get(OcrJob, job_id).status = 'running'
+                db.session.commit()
+
+                payload, status_code = handler(*args)
+                _finish_job(job_id, 'done', {"status_code": status_code, **payload})
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("Job OCR %s gagal", job_id)
+                _finish_job(job_id, 'failed', error=str(e))
+            finally:
+                db.session.remove()
+    finally:
+        _pending.release()
+
+
+def submit_ocr_job(user_id, handler, *args):
+    """
+    Catat job baru lalu jalankan `handler(*args)` di thread pool. `handler` harus
+    mengembalikan (payload_dict, status_code). Melempar OcrQueueFull jika antrean penuh.
+    """
+    if not _pending.acquire(blocking=False):
+        raise OcrQueueFull(f"Antrean OCR penuh ({OCR_JOB_MAX_PENDING} job).")
+
+    try:
+        _ensure_table()
+        job = OcrJob(
+            id=uuid.uuid4().hex,
+            user_id=int(user_id),
+            status='queued',
+            created_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        _executor.submit(_run_job, current_app._get_current_object(), job.id, handler, args)
+        return job.id
+    except Exception:
+        _pending.release()
+        raise
+
+
+def get_ocr_job(job_id, user_id):
+    """Job milik user (None jika tidak ada) dalam bentuk dict siap dikirim sebagai JSON."""
+    _ensure_table()
+    job = OcrJob.query.filter_by(id=job_id, user_id=int(user_id)).first()
+    if job is None:
+        return None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -0,0 +1,179 @@
+# query_profiler.py
+"""
+Detektor query lambat dan pola N+1 untuk development/staging (opt-in: QUERY_PROFILE=1).
+
+Setiap statement SQL dalam satu request (ORM maupun get_conn, lewat
+metrics_service.capture_sql) dicatat bersama bentuk ternormalisasinya (literal
+dan parameter diganti '?', daftar IN/VALUES diringkas). Request ditandai jika:
+
+- jumlah statement melebihi budget endpoint (ENDPOINT_QUERY_BUDGETS) atau
+  QUERY_BUDGET_COUNT,
+- total waktu SQL melebihi QUERY_BUDGET_MS,
+- satu bentuk statement diulang QUERY_REPEAT_THRESHOLD kali atau lebih (indikasi N+1),
+- ada statement yang lebih lama dari QUERY_SLOW_MS.
+
+Laporan request yang ditandai ditulis sebagai satu baris JSON ke logger
+'query_profiler' (ke file QUERY_PROFILE_LOG jika diset). Untuk pengujian,
+assert_query_budget() memeriksa budget yang sama tanpa perlu QUERY_PROFILE.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, request
+
+from metrics_service import capture_sql, start_sql_capture, stop_sql_capture
+
+QUERY_PROFILE_ENABLED = os.getenv("QUERY_PROFILE", "0") == "1"
+QUERY_PROFILE_LOG = os.getenv("QUERY_PROFILE_LOG", "")
+QUERY_PROFILE_LOG_ALL = os.getenv("QUERY_PROFILE_LOG_ALL", "0") == "1"
+QUERY_BUDGET_COUNT = int(os.getenv("QUERY_BUDGET_COUNT", 10))
+QUERY_BUDGET_MS = float(os.getenv("QUERY_BUDGET_MS", 200))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 3))
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", 100))
+
+# Jumlah statement maksimum per endpoint (cache miss, data kosong); endpoint lain memakai QUERY_BUDGET_COUNT
+ENDPOINT_QUERY_BUDGETS = {
+    "transactions.get_transaction_chart": 2,
+    "transactions.get_transaction_metrics": 1,
+    "scoring.get_business_health_score": 2,
+    "dashboard.dashboard_summary": 5,
+    "dashboard.financial_health": 1,
+    "dashboard.cash_flow_forecast": 2,
+}
+
+logger = logging.getLogger("query_profiler")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\(\?(?:, \?)*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Bentuk statement tanpa literal/parameter, mis. 'SELECT ... WHERE user_id = ? AND id IN (...)'."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _WHITESPACE.sub(" ", shape).strip()
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _VALUES_ROWS.sub(r"\1, ...", shape)
+
+
+def analyze_queries(captured, endpoint=None, max_queries=None, max_ms=None, max_repeats=None):
+    """
+    Ringkasan statement (list (statement, detik)) beserta pelanggaran budget.
+    `max_repeats` adalah jumlah maksimum statement dengan bentuk yang sama.
+    """
+    if max_queries is None:
+        max_queries = ENDPOINT_QUERY_BUDGETS.get(endpoint, QUERY_BUDGET_COUNT)
+    max_ms = QUERY_BUDGET_MS if max_ms is None else max_ms
+    max_repeats = QUERY_REPEAT_THRESHOLD - 1 if max_repeats is None else max_repeats
+
+    shapes = defaultdict(lambda: [0, 0.0])
+    for statement, seconds in captured:
+        entry = shapes[normalize_sql(statement)]
+        entry[0] += 1
+        entry[1] += seconds * 1000
+
+    sql_ms = sum(seconds for _, seconds in captured) * 1000
+    repeated = sorted(
+        ({"shape": shape, "count": count, "total_ms": round(ms, 2)}
+         for shape, (count, ms) in shapes.items() if count > max_repeats),
+        key=lambda item: -item["count"],
+    )
+    slow = sorted(
+        ({"shape": normalize_sql(statement), "ms": round(seconds * 1000, 2)}
+         for statement, seconds in captured if seconds * 1000 >= QUERY_SLOW_MS),
+        key=lambda item: -item["ms"],
+    )
+
+    violations = []
+    if len(captured) > max_queries:
+        violations.append(f"{len(captured)} statement > budget {max_queries}")
+    if sql_ms > max_ms:
+        violations.append(f"{sql_ms:.1f} ms SQL > budget {max_ms:.0f} ms")
+    if repeated:
+        violations.append(f"{len(repeated)} bentuk statement diulang (kemungkinan N+1)")
+    if slow:
+        violations.append(f"{len(slow)} statement lebih lama dari {QUERY_SLOW_MS:.0f} ms")
+
+    return {
+        "query_count": len(captured),
+        "distinct_shapes": len(shapes),
+        "sql_ms": round(sql_ms, 2),
+        "violations": violations,
+        "repeated": repeated,
+        "slow": slow[:10],
+    }
+
+
+# --- Mode request (QUERY_PROFILE=1) ---
+
+def _start_profile():
+    g._query_profile = start_sql_capture()
+    g._query_profile_started = time.perf_counter()
+
+
+def _finish_profile(response):
+    profile = g.get("_query_profile")
+    if profile is not None:
+        report = analyze_queries(profile[0], request.endpoint)
+        if report["violations"] or QUERY_PROFILE_LOG_ALL:
+            logger.warning(json.dumps({
+                "event": "sql_profile",
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "request_ms": round((time.perf_counter() - g._query_profile_started) * 1000, 2),
+                **report,
+            }, ensure_ascii=False))
+    return response
+
+
+def _stop_profile(exc):
+    profile = g.pop("_query_profile", None)
+    if profile is not None:
+        stop_sql_capture(profile[1])
+
+
+def init_query_profiler(app):
+    """Pasang profiler ke `app` jika QUERY_PROFILE=1 (tanpa overhead jika tidak aktif)."""
+    if not QUERY_PROFILE_ENABLED:
+        return
+    if QUERY_PROFILE_LOG:
+        handler = logging.FileHandler(QUERY_PROFILE_LOG)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_stop_profile)
+
+
+# --- Helper pengujian ---
+
+@contextmanager
+def assert_query_budget(endpoint=None, max_queries=None, max_ms=None, max_repeats=None):
+    """
+    Gagal (AssertionError) jika SQL di dalam blok melanggar budget. Tanpa `max_queries`,
+    budget diambil dari ENDPOINT_QUERY_BUDGETS[endpoint]. Contoh:
+
+        with assert_query_budget("transactions.get_transaction_chart"):
+            client.get("/transactions/chart", headers=headers)
+    """
+    with capture_sql() as captured:
+        yield captured
+    report = analyze_queries(captured, endpoint, max_queries, max_ms, max_repeats)
+    if report["violations"]:
+        raise AssertionError(
+            f"Budget query {endpoint or ''} terlampaui: {'; '.join(report['violations'])}\n"
+            + json.dumps(report, indent=2, ensure_ascii=False)
+        )
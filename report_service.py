@@ -0,0 +1,83 @@
+# report_service.py
+"""
+Ekspor laporan transaksi dengan memori konstan.
+
+Baris dibaca per halaman REPORT_PAGE_SIZE dengan keyset pagination
+(WHERE (date, id) > (tanggal_terakhir, id_terakhir) ORDER BY date, id LIMIT n)
+dan langsung ditulis ke output: CSV di-stream ke response, XLSX ditulis oleh
+xlsxwriter dalam mode constant_memory ke file sementara di disk.
+
+Bukan server-side cursor: driver mysqlconnector tidak mendukungnya dan selalu
+mem-buffer seluruh hasil query, jadi yield_per tetap memuat semua baris ke memori.
+Dengan keyset, memori per halaman tetap dan setiap halaman memakai index
+(user_id, date, ...) tanpa OFFSET.
+"""
+import csv
+import io
+import os
+import tempfile
+
+import xlsxwriter
+from sqlalchemy import select, tuple_
+
+from app.models import db, Transaction
+
+REPORT_PAGE_SIZE = int(os.getenv("REPORT_PAGE_SIZE", 2000))
+REPORT_HEADERS = ["Tanggal", "Jenis", "Deskripsi", "Jumlah"]
+REPORT_SHEET_NAME = "Laporan Transaksi"
+
+
+def iter_report_rows(user_id, start_date=None, end_date=None):
+    """Baris laporan (tanggal, jenis, deskripsi, jumlah), diurutkan per tanggal lalu id."""
+    stmt = select(
+        Transaction.id, Transaction.date, Transaction.type, Transaction.description, Transaction.amount
+    ).where(Transaction.user_id == user_id)
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    stmt = stmt.order_by(Transaction.date, Transaction.id).limit(REPORT_PAGE_SIZE)
+
+    last_key = None
+    while True:
+        page_stmt = stmt if last_key is None else stmt.where(
+            tuple_(Transaction.date, Transaction.id) > tuple_(*last_key)
+        )
+        rows = db.session.execute(page_stmt).all()
+        for row in rows:
+            yield row.date.strftime("%Y-%m-%d"), row.type, row.description, float(row.amount)
+        if len(rows) < REPORT_PAGE_SIZE:
+            return
+        last_key = (rows[-1].date, rows[-1].id)
+
+
+def iter_report_csv(rows):
+    """Potongan teks CSV; dikirim per REPORT_PAGE_SIZE baris."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_HEADERS)
+
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if index % REPORT_PAGE_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def write_report_xlsx(rows):
+    """Tulis laporan ke file sementara (terhapus otomatis saat ditutup) dan kembalikan file-nya."""
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+    worksheet = workbook.add_worksheet(REPORT_SHEET_NAME)
+    header_format = workbook.add_format({"bold": True, "border": 1})
+
+    worksheet.write_row(0, 0, REPORT_HEADERS, header_format)
+    for row_index, row in enumerate(rows, start=1):
+        worksheet.write_row(row_index, 0, row)
+
+    workbook.close()
+    output.seek(0)
+    return output
@@ -0,0 +1,148 @@
+# rollup_service.py
+"""
+Rollup harian transaksi per user (tabel 'daily_totals') dan versi data
+per user (tabel 'data_versions', dinaikkan setiap ada transaksi baru dan
+dipakai sebagai kunci invalidasi cache).
+
+Setiap insert ke 'transactions' harus memanggil `add_to_daily_totals` di dalam
+session yang sama sebelum commit, sehingga rollup ikut ter-commit atau ikut
+ter-rollback bersama transaksinya. Untuk backfill gunakan:
+
+    flask --app main rebuild-daily-totals [--user-id ID]
+
+Saat deploy, `flask --app main ensure-indexes` (schema_service.py) membuat tabel
+'daily_totals'/'data_versions' dan kolom barunya jika belum ada, lalu menjalankan
+backfill ini secara otomatis.
+"""
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, case, and_, or_, delete, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.models import db, Transaction, DailyTotal, DataVersion
+
+# Pemasukan yang mengandung kata kunci ini bukan hasil penjualan
+# (dipakai oleh skor income_quality di scoring_api.py)
+NON_SALES_KEYWORDS = ['suntikan', 'pinjaman', 'setoran', 'transfer pribadi', 'modal']
+
+
+def is_non_sales_income(description):
+    description = (description or '').lower()
+    return any(keyword in description for keyword in NON_SALES_KEYWORDS)
+
+
+def _additive_upsert(model, rows, key_columns, additive_columns):
+    """INSERT multi-baris; jika key sudah ada, nilai kolom `additive_columns` ditambahkan."""
+    dialect = db.session.get_bind().dialect.name
+    table = model.__table__
+
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            {name: table.c[name] + stmt.inserted[name] for name in additive_columns}
+        )
+
+    dialect_module = postgresql if dialect == 'postgresql' else sqlite
+    stmt = dialect_module.insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        set_={name: table.c[name] + stmt.excluded[name] for name in additive_columns},
+    )
+
+
+def bump_data_version(user_ids):
+    """Naikkan versi data user (kunci invalidasi cache). Tidak melakukan commit."""
+    rows = [{'user_id': int(user_id), 'version': 1} for user_id in sorted(set(user_ids))]
+    if rows:
+        db.session.execute(_additive_upsert(DataVersion, rows, ['user_id'], ['version']))
+
+
+def get_data_version(user_id):
+    """Versi data transaksi user saat ini (0 jika belum pernah ada transaksi)."""
+    return db.session.query(DataVersion.version).filter_by(user_id=user_id).scalar() or 0
+
+
+def add_to_daily_totals(user_id, entries):
+    """
+    Tambahkan transaksi baru ke rollup harian.
+    `entries` adalah iterable berisi tuple (date, type, amount, description).
+    Tidak melakukan commit; pemanggil yang menentukan batas transaksinya.
+    """
+    per_day = defaultdict(
+        lambda: {'income': 0.0, 'expense': 0.0, 'count': 0, 'non_sales_income': 0.0, 'expense_count': 0}
+    )
+    for date, trx_type, amount, description in entries:
+        bucket = per_day[date]
+        if trx_type == 'pemasukan':
+            bucket['income'] += float(amount)
+            if is_non_sales_income(description):
+                bucket['non_sales_income'] += float(amount)
+        elif trx_type == 'pengeluaran':
+            bucket['expense'] += float(amount)
+            bucket['expense_count'] += 1
+        bucket['count'] += 1
+
+    if not per_day:
+        return
+
+    rows = [
+        {'user_id': int(user_id), 'date': date, **totals}
+        for date, totals in sorted(per_day.items())
+    ]
+    db.session.execute(_additive_upsert(
+        DailyTotal, rows, ['user_id', 'date'], ['income', 'expense', 'count', 'non_sales_income', 'expense_count']
+    ))
+    bump_data_version([user_id])
+
+
+def rebuild_daily_totals(user_id=None):
+    """Hitung ulang 'daily_totals' dari tabel 'transactions' (semua user atau satu user)."""
+    DailyTotal.__table__.create(db.engine, checkfirst=True)
+    DataVersion.__table__.create(db.engine, checkfirst=True)
+
+    is_income = Transaction.type == 'pemasukan'
+    is_expense = Transaction.type == 'pengeluaran'
+    description = func.lower(Transaction.description)
+    is_non_sales = or_(*[description.like(f'%{keyword}%') for keyword in NON_SALES_KEYWORDS])
+
+    user_ids = select(Transaction.user_id).distinct()
+    delete_stmt = delete(DailyTotal)
+    source = select(
+        Transaction.user_id,
+        Transaction.date,
+        func.sum(case((is_income, Transaction.amount), else_=0)),
+        func.sum(case((is_expense, Transaction.amount), else_=0)),
+        func.count(Transaction.id),
+        func.sum(case((and_(is_income, is_non_sales), Transaction.amount), else_=0)),
+        func.sum(case((is_expense, 1), else_=0)),
+    )
+    if user_id is not None:
+        user_ids = user_ids.where(Transaction.user_id == user_id)
+        delete_stmt = delete_stmt.where(DailyTotal.user_id == user_id)
+        source = source.where(Transaction.user_id == user_id)
+    source = source.group_by(Transaction.user_id, Transaction.date)
+
+    try:
+        db.session.execute(delete_stmt)
+        result = db.session.execute(
+            insert(DailyTotal).from_select(
+                ['user_id', 'date', 'income', 'expense', 'count', 'non_sales_income', 'expense_count'], source
+            )
+        )
+        bump_data_version(db.session.scalars(user_ids))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result.rowcount
+
+
+@click.command('rebuild-daily-totals')
+@click.option('--user-id', type=int, default=None, help='Hanya bangun ulang rollup untuk user ini.')
+@with_appcontext
+def rebuild_daily_totals_command(user_id):
+    """Backfill tabel daily_totals dari tabel transactions."""
+    row_count = rebuild_daily_totals(user_id)
+    click.echo(f"✅ daily_totals dibangun ulang ({row_count} baris).")
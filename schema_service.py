@@ -0,0 +1,243 @@
+# schema_service.py
+"""
+Bootstrap skema dan index untuk query yang paling sering dijalankan.
+
+Index komposit dideklarasikan di app/models.py (__table_args__), sehingga
+database baru mendapatkannya lewat create_all. Untuk database yang sudah ada,
+perintah berikut membuat tabel/index yang belum ada, menambahkan kolom baru di
+model ke tabel lama (lalu mengisinya, mis. membangun ulang 'daily_totals'), dan
+menjalankan EXPLAIN pada query chart, metrics, scoring, dashboard, konteks AI,
+dan laporan:
+
+    flask --app main ensure-indexes [--explain-only]
+
+Jalankan perintah ini di setiap deploy sebelum aplikasi menerima request;
+aplikasi sendiri tidak mengubah skema saat startup.
+
+Jika ada query yang rencana eksekusinya membaca seluruh tabel (atau seluruh
+index) alih-alih memakai index per user, perintah gagal dengan exit code 1.
+
+Di tabel yang hampir kosong optimizer memang memilih full scan, jadi scan pada
+tabel dengan kurang dari PLAN_CHECK_MIN_ROWS baris hanya dilaporkan sebagai
+"belum bisa dinilai", tidak menggagalkan perintah. Jalankan pada data yang
+mewakili produksi; tanpa --user-id, EXPLAIN memakai user dengan data terbanyak.
+"""
+import os
+from datetime import date, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, inspect, select
+
+from app.models import db, Transaction, DailyTotal, Application, Activity, DataVersion
+from dashboard_api import monthly_applications_query
+from rollup_service import rebuild_daily_totals
+
+# Tabel yang selalu dibaca per user; full scan di tabel ini adalah regresi
+HOT_TABLES = ('transactions', 'daily_totals', 'applications', 'activities', 'data_versions')
+
+# Tabel dengan baris lebih sedikit dari ini terlalu kecil untuk menilai rencana query
+PLAN_CHECK_MIN_ROWS = int(os.getenv("PLAN_CHECK_MIN_ROWS", 1000))
+# Pengisian kolom yang baru ditambahkan ke tabel lama (kolom tanpa entri di sini cukup memakai default)
+COLUMN_BACKFILLS = {
+    "ocr_results.size": "UPDATE ocr_results SET size = LENGTH(result)",
+}
+
+# type=index (scan index berurutan) dianggap full scan jika perkiraan baris yang dibaca
+# mencapai bagian ini dari tabel; di bawahnya berarti scan berhenti lebih awal (ORDER BY ... LIMIT)
+MYSQL_INDEX_SCAN_SHARE = 0.5
+
+
+def hot_queries(user_id=1, today=None):
+    """
+    (nama, statement) untuk setiap query panas, meniru filter di endpoint aslinya.
+    Chart bulanan dashboard memakai query builder yang sama dengan endpoint-nya.
+    """
+    today = today or date.today()
+    start = today - timedelta(days=90)
+    return [
+        ("transactions/chart", select(
+            DailyTotal.date, DailyTotal.income, DailyTotal.expense
+        ).where(
+            DailyTotal.user_id == user_id, DailyTotal.date >= start, DailyTotal.date <= today
+        )),
+        ("transactions/metrics", select(
+            func.sum(DailyTotal.income), func.sum(DailyTotal.expense), func.sum(DailyTotal.count),
+            func.min(DailyTotal.date), func.max(DailyTotal.date)
+        ).where(DailyTotal.user_id == user_id, DailyTotal.date >= start, DailyTotal.date <= today)),
+        ("scoring/pnl_features", select(
+            DailyTotal.date, DailyTotal.income, DailyTotal.expense, DailyTotal.non_sales_income
+        ).where(DailyTotal.user_id == user_id).order_by(DailyTotal.date)),
+        ("dashboard/data_version", select(DataVersion.version).where(DataVersion.user_id == user_id)),
+        ("dashboard/monthly_applications", monthly_applications_query(user_id).statement),
+        ("dashboard/latest_applications", select(
+            Application.id, Application.borrower, Application.amount, Application.status, Application.date
+        ).where(Application.user_id == user_id).order_by(Application.date.desc()).limit(5)),
+        ("dashboard/recent_activities", select(
+            Activity.id, Activity.title, Activity.timestamp, Activity.description
+        ).where(Activity.user_id == user_id).order_by(Activity.timestamp.desc()).limit(5)),
+        ("dashboard/totals", select(
+            func.sum(DailyTotal.income), func.sum(DailyTotal.expense)
+        ).where(DailyTotal.user_id == user_id)),
+        ("ai_context/top_expenses", select(
+            Transaction.description, func.sum(Transaction.amount), func.count()
+        ).where(
+            Transaction.user_id == user_id, Transaction.type == 'pengeluaran', Transaction.date >= start
+        ).group_by(Transaction.description)),
+        ("transactions/report", select(
+            Transaction.date, Transaction.type, Transaction.description, Transaction.amount
+        ).where(
+            Transaction.user_id == user_id, Transaction.date >= start, Transaction.date <= today
+        ).order_by(Transaction.date)),
+    ]
+
+
+def _mysql_full_scans(connection, sql, table_rows):
+    """(tabel, keterangan) untuk setiap akses yang membaca seluruh tabel atau seluruh index."""
+    scans = []
+    for row in connection.exec_driver_sql(f"EXPLAIN {sql}").mappings():
+        table = row['table']
+        if table not in HOT_TABLES:
+            continue
+        full_index = (
+            row['type'] == 'index'
+            and (row['rows'] or 0) >= MYSQL_INDEX_SCAN_SHARE * max(table_rows.get(table, 0), 1)
+        )
+        if row['type'] == 'ALL' or full_index:
+            scans.append((table, f"{table}: type={row['type']}, key={row['key']}, rows={row['rows']}"))
+    return scans
+
+
+def _sqlite_full_scans(connection, sql, table_rows):
+    # Kolom terakhir EXPLAIN QUERY PLAN: "SEARCH t USING INDEX ..." atau "SCAN t [USING ... INDEX ...]"
+    details = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [
+        (detail.split()[1], detail) for detail in details
+        if detail.startswith("SCAN ") and detail.split()[1] in HOT_TABLES
+    ]
+
+
+_PLAN_CHECKS = {"mysql": _mysql_full_scans, "sqlite": _sqlite_full_scans}
+
+
+def _busiest_user(connection):
+    """User dengan rollup harian terbanyak (1 jika belum ada data), agar EXPLAIN memakai data nyata."""
+    user_id = connection.execute(
+        select(DailyTotal.user_id).group_by(DailyTotal.user_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    return user_id or 1
+
+
+def check_query_plans(user_id=None):
+    """
+    Jalankan EXPLAIN untuk setiap query panas. Mengembalikan list
+    {"query", "sql", "full_scans", "small_tables"}; `full_scans` kosong berarti index
+    terpakai. Scan pada tabel dengan kurang dari PLAN_CHECK_MIN_ROWS baris masuk ke
+    `small_tables` (rencananya belum bisa dinilai) dan tidak dihitung sebagai regresi.
+    """
+    dialect = db.engine.dialect
+    check = _PLAN_CHECKS.get(dialect.name)
+    if check is None:
+        raise click.ClickException(f"EXPLAIN untuk dialect '{dialect.name}' belum didukung.")
+
+    results = []
+    with db.engine.connect() as connection:
+        table_rows = {
+            table.name: connection.execute(select(func.count()).select_from(table)).scalar()
+            for table in db.metadata.sorted_tables if table.name in HOT_TABLES
+        }
+        if user_id is None:
+            user_id = _busiest_user(connection)
+        for name, stmt in hot_queries(user_id):
+            sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            scans = check(connection, sql, table_rows)
+            results.append({
+                "query": name,
+                "sql": sql,
+                "full_scans": [detail for table, detail in scans if table_rows.get(table, 0) >= PLAN_CHECK_MIN_ROWS],
+                "small_tables": sorted({table for table, _ in scans if table_rows.get(table, 0) < PLAN_CHECK_MIN_ROWS}),
+            })
+    return results
+
+
+def _add_missing_columns(inspector):
+    """ALTER TABLE ADD COLUMN untuk kolom model yang belum ada di tabel lama. Mengembalikan 'tabel.kolom'."""
+    dialect = db.engine.dialect
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}"
+            if column.default is not None and column.default.is_scalar:
+                ddl += f" NOT NULL DEFAULT {column.default.arg!r}"
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(ddl)
+                if f"{table.name}.{column.name}" in COLUMN_BACKFILLS:
+                    connection.exec_driver_sql(COLUMN_BACKFILLS[f"{table.name}.{column.name}"])
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def ensure_schema():
+    """
+    Buat tabel yang belum ada dan tambahkan kolom baru ke tabel lama. Jika 'daily_totals'
+    baru dibuat atau kolomnya bertambah, rollup dibangun ulang dari 'transactions'.
+    Mengembalikan (tabel baru, kolom baru).
+    """
+    existing_tables = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    created_tables = sorted(set(inspect(db.engine).get_table_names()) - existing_tables)
+    added_columns = _add_missing_columns(inspect(db.engine))
+
+    if DailyTotal.__tablename__ in created_tables or any(
+        column.startswith(f"{DailyTotal.__tablename__}.") for column in added_columns
+    ):
+        rebuild_daily_totals()
+    return created_tables, added_columns
+
+
+def ensure_indexes():
+    """Buat index yang dideklarasikan di model tetapi belum ada. Mengembalikan nama index baru."""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+
+@click.command('ensure-indexes')
+@click.option('--explain-only', is_flag=True, help='Hanya cek rencana query, tanpa membuat index.')
+@click.option('--user-id', type=int, default=None, help='User contoh untuk query EXPLAIN (default: data terbanyak).')
+@with_appcontext
+def ensure_indexes_command(explain_only, user_id):
+    """Buat index untuk query panas lalu pastikan lewat EXPLAIN bahwa index-nya terpakai."""
+    if not explain_only:
+        created_tables, added_columns = ensure_schema()
+        if created_tables:
+            click.echo(f"✅ Tabel dibuat: {', '.join(created_tables)}")
+        if added_columns:
+            click.echo(f"✅ Kolom ditambahkan: {', '.join(added_columns)}")
+        created = ensure_indexes()
+        click.echo(f"✅ Index dibuat: {', '.join(created)}" if created else "✅ Semua index sudah ada.")
+
+    regressions = []
+    for result in check_query_plans(user_id):
+        if result["full_scans"]:
+            regressions.append(result)
+            click.echo(f"❌ {result['query']}: {'; '.join(result['full_scans'])}", err=True)
+        elif result["small_tables"]:
+            click.echo(f"⚠️  {result['query']}: full scan pada tabel kecil ({', '.join(result['small_tables'])}, "
+                       f"< {PLAN_CHECK_MIN_ROWS} baris), rencana belum bisa dinilai")
+        else:
+            click.echo(f"✅ {result['query']}")
+
+    if regressions:
+        raise click.ClickException(
+            f"{len(regressions)} query membaca seluruh tabel: {', '.join(r['query'] for r in regressions)}"
+        )
@@ -2,44 +2,69 @@
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, case
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import re
+import os
 
 # Impor dari proyek yang sudah ada
-from app.models import db, Transaction
+from app.models import db, DailyTotal
+from batch_scoring import least_squares_slope, score_users
+from cache_service import VersionedCache
+from rollup_service import get_data_version
+from user_api import admin_required
 
 scoring_blueprint = Blueprint('scoring', __name__)
 
+# Batas user per request /health-score/batch (batch lebih besar lewat CLI)
+MAX_BATCH_USERS = 5000
+
+# Cache P&L DNA per user; valid selama versi data transaksi user tidak berubah
+dna_cache = VersionedCache("health_score_dna", maxsize=int(os.getenv("HEALTH_SCORE_CACHE_SIZE", 10000)))
+
 # --- SEMUA FUNGSI KALKULASI (calculate_... ) TETAP SAMA SEPERTI SEBELUMNYA ---
-# (Fungsi-fungsi ini tidak perlu diubah, jadi saya tidak menampilkannya lagi agar ringkas)
+# P&L DNA dihitung dari satu snapshot fitur (lihat extract_pnl_features),
+# sehingga satu request health-score cukup satu query ke database.
+
+def extract_pnl_features(user_id):
+    """
+    Mengambil seluruh riwayat harian user dari 'daily_totals' dalam SATU query
+    dan mengubahnya menjadi array NumPy yang dipakai semua skor P&L DNA.
+    """
+    rows = db.session.query(
+        DailyTotal.date,
+        DailyTotal.income,
+        DailyTotal.expense,
+        DailyTotal.non_sales_income,
+        DailyTotal.expense_count
+    ).filter(DailyTotal.user_id == user_id).order_by(DailyTotal.date).all()
+
+    return {
+        "dates": np.array([row.date for row in rows], dtype="datetime64[D]"),
+        "income": np.array([row.income for row in rows], dtype=float),
+        "expense": np.array([row.expense for row in rows], dtype=float),
+        "non_sales_income": np.array([row.non_sales_income for row in rows], dtype=float),
+        "expense_count": np.array([row.expense_count for row in rows], dtype=np.int64),
+    }
+
+def _daily_window_series(features, values, days=60):
+    """Deret harian `values` untuk `days` hari terakhir (hari tanpa transaksi = 0)."""
+    end_date = np.datetime64(datetime.utcnow().date(), "D")
+    start_date = end_date - (days - 1)
+    offsets = (features["dates"] - start_date).astype(int)
+    in_window = (offsets >= 0) & (offsets < days)
+    series = np.zeros(days)
+    series[offsets[in_window]] = values[in_window]
+    return series
+
+def _daily_net_income_series(features, days=60):
+    return _daily_window_series(features, features["income"] - features["expense"], days)
 
 def _get_daily_net_income(user_id, days=60):
-    # ... (kode tidak berubah)
-    end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=days - 1)
-    results = db.session.query(
-        func.date(Transaction.date).label('tx_date'),
-        func.sum(case((Transaction.type == 'pemasukan', Transaction.amount), else_=0)).label('income'),
-        func.sum(case((Transaction.type == 'pengeluaran', Transaction.amount), else_=0)).label('expense')
-    ).filter(
-        Transaction.user_id == user_id,
-        Transaction.date.between(start_date, end_date)
-    ).group_by('tx_date').order_by('tx_date').all()
-    daily_profits_map = {res.tx_date: res.income - res.expense for res in results}
-    profit_series = []
-    for i in range(days):
-        current_date = start_date + timedelta(days=i)
-        profit = daily_profits_map.get(current_date, 0)
-        profit_series.append(profit)
-    return np.array(profit_series)
-
-def calculate_profitability_score(user_id):
-    # ... (kode tidak berubah)
-    total_income = db.session.query(func.sum(Transaction.amount)).filter_by(user_id=user_id, type='pemasukan').scalar() or 0
-    total_expense = db.session.query(func.sum(Transaction.amount)).filter_by(user_id=user_id, type='pengeluaran').scalar() or 0
+    return _daily_net_income_series(extract_pnl_features(user_id), days)
+
+def calculate_profitability_score(features):
+    total_income = features["income"].sum()
+    total_expense = features["expense"].sum()
     if total_income == 0: return 0
     margin = ((total_income - total_expense) / total_income) * 100
     if margin > 20: return 90
@@ -48,9 +73,8 @@ def calculate_profitability_score(user_id):
     if margin == 0: return 20
     return 0
 
-def calculate_stability_score(user_id):
-    # ... (kode tidak berubah)
-    profit_series = _get_daily_net_income(user_id, days=60)
+def calculate_stability_score(features):
+    profit_series = _daily_net_income_series(features, days=60)
     if len(profit_series) < 7: return 0
     mean_profit = np.mean(profit_series)
     std_dev = np.std(profit_series)
@@ -61,55 +85,37 @@ def calculate_stability_score(user_id):
     if 0.7 <= cv < 1.2: return 60
     return 30
 
-def calculate_trend_score(user_id):
-    # ... (kode tidak berubah)
-    profit_series = _get_daily_net_income(user_id, days=60)
+def calculate_trend_score(features):
+    profit_series = _daily_net_income_series(features, days=60)
     if len(profit_series) < 14: return 50
     mean_profit = np.mean(profit_series)
     if mean_profit <= 0: return 10
-    X = np.arange(len(profit_series)).reshape(-1, 1)
-    y = profit_series
-    model = LinearRegression()
-    model.fit(X, y)
-    slope = model.coef_[0]
+    slope = least_squares_slope(profit_series)
     normalized_trend = (slope / mean_profit) * 100
     if normalized_trend > 0.5: return 95
     if 0 < normalized_trend <= 0.5: return 80
     if normalized_trend == 0: return 60
     return 30
 
-def calculate_income_quality_score(user_id):
-    # ... (kode tidak berubah)
-    non_sales_keywords = ['suntikan', 'pinjaman', 'setoran', 'transfer pribadi', 'modal']
-    income_transactions = Transaction.query.filter_by(user_id=user_id, type='pemasukan').all()
-    if not income_transactions: return 0
-    total_income = 0
-    sales_income = 0
-    for tx in income_transactions:
-        total_income += tx.amount
-        if not any(keyword in tx.description.lower() for keyword in non_sales_keywords):
-            sales_income += tx.amount
+def calculate_income_quality_score(features):
+    # Pemasukan non-penjualan (suntikan, pinjaman, modal, ...) sudah dipisahkan
+    # di rollup harian, lihat NON_SALES_KEYWORDS di rollup_service.py
+    total_income = features["income"].sum()
     if total_income == 0: return 0
+    sales_income = total_income - features["non_sales_income"].sum()
     quality_ratio = (sales_income / total_income) * 100
     if quality_ratio > 95: return 95
     if 80 <= quality_ratio <= 95: return 80
     if 60 <= quality_ratio < 80: return 60
     return 30
 
-def calculate_load_management_score(user_id):
-    # ... (kode tidak berubah)
-    efficiency_score = calculate_profitability_score(user_id)
-    expense_txs = db.session.query(
-        func.date(Transaction.date).label('tx_date'),
-        func.sum(Transaction.amount).label('daily_expense')
-    ).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == 'pengeluaran'
-    ).group_by('tx_date').all()
-    if len(expense_txs) < 7:
+def calculate_load_management_score(features):
+    efficiency_score = calculate_profitability_score(features)
+    # Setiap hari yang punya baris pengeluaran ikut dihitung, termasuk yang totalnya 0
+    daily_expenses = features["expense"][features["expense_count"] > 0]
+    if len(daily_expenses) < 7:
         predictability_score = 50
     else:
-        daily_expenses = [tx.daily_expense for tx in expense_txs]
         mean_expense = np.mean(daily_expenses)
         std_expense = np.std(daily_expenses)
         if mean_expense == 0:
@@ -122,6 +128,28 @@ def calculate_load_management_score(user_id):
     final_score = (0.5 * efficiency_score) + (0.5 * predictability_score)
     return final_score
 
+def calculate_dna_scores(features):
+    return {
+        "profitability": calculate_profitability_score(features),
+        "stability": calculate_stability_score(features),
+        "trend": calculate_trend_score(features),
+        "income_quality": calculate_income_quality_score(features),
+        "load_management": calculate_load_management_score(features)
+    }
+
+def get_cached_dna_scores(user_id):
+    """
+    P&L DNA dari cache jika transaksi user belum berubah. Tanggal hari ini ikut
+    menjadi bagian versi karena jendela 60 hari bergeser setiap hari.
+    """
+    user_id = int(user_id)
+    version = (get_data_version(user_id), datetime.utcnow().date())
+    dna_scores = dna_cache.get(user_id, version)
+    if dna_scores is None:
+        dna_scores = calculate_dna_scores(extract_pnl_features(user_id))
+        dna_cache.set(user_id, version, dna_scores)
+    return dna_scores
+
 def calculate_bill_payment_score(late_in_last_3_months, total_late, monthly_bill_cv, bill_to_income_ratio):
     # ... (kode tidak berubah)
     if late_in_last_3_months: score_ketepatan = 40
@@ -184,13 +212,9 @@ def get_business_health_score():
     try:
         # --- Hitung P&L Score (bobot 70%) ---
         # (Perhitungan ini tidak berubah, karena mengambil data dari DB)
-        dna_scores = {
-            "profitability": calculate_profitability_score(user_id),
-            "stability": calculate_stability_score(user_id),
-            "trend": calculate_trend_score(user_id),
-            "income_quality": calculate_income_quality_score(user_id),
-            "load_management": calculate_load_management_score(user_id)
-        }
+        # (Satu query untuk seluruh riwayat user, lalu semua skor dihitung dari snapshot itu;
+        #  hasilnya di-cache sampai ada transaksi baru)
+        dna_scores = get_cached_dna_scores(user_id)
         pnl_score_component = sum(score * 0.14 for score in dna_scores.values())
 
         # --- Hitung ICS Score (bobot 30%) ---
@@ -229,4 +253,38 @@ def get_business_health_score():
         }), 200
 
     except Exception as e:
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@scoring_blueprint.route('/health-score/batch', methods=['POST'])
+@admin_required
+def get_business_health_score_batch():
+    """
+    Health score untuk banyak user dalam satu request (hanya admin, lihat ADMIN_USER_IDS).
+    Body: {"users": [{"user_id": 1, <field ICS seperti /health-score>}, ...]}
+    """
+    data = request.get_json()
+    users = (data or {}).get("users")
+    if not isinstance(users, list) or not users:
+        return jsonify({"error": "Field 'users' harus berupa list yang tidak kosong."}), 400
+    if len(users) > MAX_BATCH_USERS:
+        return jsonify({"error": f"Maksimal {MAX_BATCH_USERS} user per request. Gunakan CLI 'flask score-batch' untuk batch lebih besar."}), 400
+    if not all(isinstance(item, dict) and "user_id" in item for item in users):
+        return jsonify({"error": "Setiap item di 'users' wajib memiliki 'user_id'."}), 400
+
+    try:
+        results = score_users(users)
+        return jsonify({
+            "results": results,
+            "count": len(results),
+            "message": "Health score calculated successfully."
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@scoring_blueprint.route('/health-score/cache-stats', methods=['GET'])
+@admin_required
+def get_health_score_cache_stats():
+    return jsonify(dna_cache.stats()), 200
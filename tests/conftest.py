@@ -0,0 +1,64 @@
+# tests/conftest.py
+"""
+Fixture bersama: aplikasi Flask dengan semua blueprint di atas SQLite in-memory,
+LLM memakai backend palsu (tanpa jaringan).
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy.pool import StaticPool
+
+from app.models import db, User
+from dashboard_api import dashboard_blueprint
+from ocr_api import ocr_blueprint
+from scoring_api import scoring_blueprint
+from transactions_api import transaction_bp
+
+
+@pytest.fixture
+def app():
+    app = Flask("tests")
+    app.config.update(
+        TESTING=True,
+        JWT_SECRET_KEY="test-secret-key-test-secret-key-0123",
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        SQLALCHEMY_ENGINE_OPTIONS={"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(transaction_bp, url_prefix='/transactions')
+    app.register_blueprint(ocr_blueprint, url_prefix='/ocr')
+    app.register_blueprint(scoring_blueprint, url_prefix='/scoring')
+    app.register_blueprint(dashboard_blueprint)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, username="umkm_1", password="-"), User(id=2, username="umkm_2", password="-")])
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """auth_headers(user_id) -> header Authorization dengan JWT untuk user tersebut."""
+    def make(user_id=1):
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+    return make
@@ -0,0 +1,123 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import chart_service
+from cache_service import VersionedCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_chart_cache(monkeypatch):
+    cache = VersionedCache("transaction_chart", maxsize=chart_service.CHART_MAX_POINTS * 4, getsizeof=len)
+    monkeypatch.setattr(chart_service, "chart_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def transactions(client, auth_headers):
+    rng = random.Random(1)
+    items = [
+        {"type": rng.choice(["pemasukan", "pengeluaran"]), "amount": rng.randrange(1, 100) * 1000,
+         "date": (date(2022, 12, 20) + timedelta(days=rng.randrange(500))).isoformat(), "description": "x"}
+        for _ in range(300)
+    ]
+    response = client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1))
+    assert response.status_code == 201
+    return items
+
+
+def _week_label(day):
+    # YEARWEEK(date, 0) MySQL: minggu dimulai hari Minggu
+    sunday = day - timedelta(days=(day.weekday() + 1) % 7)
+    return f"Minggu ke-{(sunday.timetuple().tm_yday - 1) // 7 + 1:02d}, {sunday.year}"
+
+
+def _expected_totals(items, resolution):
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for item in items:
+        day = date.fromisoformat(item["date"])
+        label = {"daily": str(day), "weekly": _week_label(day), "monthly": str(day)[:7], "yearly": str(day.year)}
+        totals[label[resolution]][0 if item["type"] == "pemasukan" else 1] += item["amount"]
+    return dict(totals)
+
+
+@pytest.mark.parametrize("resolution", chart_service.CHART_RESOLUTIONS)
+def test_chart_totals_match_transactions(client, auth_headers, transactions, resolution):
+    points = client.get(f"/transactions/chart?resolution={resolution}", headers=auth_headers(1)).get_json()
+    non_empty = {p["date"]: [p["income"], p["expense"]] for p in points if p["income"] or p["expense"]}
+    assert non_empty == _expected_totals(transactions, resolution)
+    assert len({p["date"] for p in points}) == len(points)
+
+
+@pytest.mark.parametrize("day, label", [
+    (date(2023, 1, 1), "Minggu ke-01, 2023"),
+    (date(2022, 12, 31), "Minggu ke-52, 2022"),
+    (date(2024, 1, 1), "Minggu ke-53, 2023"),
+])
+def test_week_label_follows_mysql_yearweek(day, label):
+    start = chart_service.period_start(np.array([day], dtype="datetime64[D]"), "weekly")[0]
+    assert chart_service.period_label(start, "weekly") == label
+
+
+def test_chart_gap_filled(client, auth_headers):
+    points = client.get("/transactions/chart?start_date=2020-01-01&end_date=2020-01-05", headers=auth_headers(1)).get_json()
+    assert [p["date"] for p in points] == [f"2020-01-0{d}" for d in range(1, 6)]
+    assert all(p["income"] == 0 and p["expense"] == 0 for p in points)
+
+
+@pytest.mark.parametrize("method", chart_service.DOWNSAMPLE_METHODS)
+def test_chart_max_points(client, auth_headers, transactions, method):
+    full = client.get("/transactions/chart", headers=auth_headers(1)).get_json()
+    points = client.get(f"/transactions/chart?max_points=50&downsample={method}", headers=auth_headers(1)).get_json()
+    assert len(points) == 50
+    assert points[0]["date"] == full[0]["date"]
+    if method == "lttb":
+        assert points[-1] == full[-1]
+        assert max(full, key=lambda p: p["income"]) in points
+
+
+def test_chart_without_max_points_is_capped(client, auth_headers, fresh_chart_cache):
+    points = client.get("/transactions/chart?start_date=1990-01-01&end_date=2040-01-01", headers=auth_headers(1)).get_json()
+    assert len(points) == chart_service.CHART_MAX_POINTS
+    assert fresh_chart_cache.stats()["currsize"] == chart_service.CHART_MAX_POINTS
+
+
+def test_chart_cache_bounded_by_points(client, auth_headers, fresh_chart_cache):
+    for year in range(1990, 2000):
+        client.get(f"/transactions/chart?start_date={year}-01-01&end_date=2040-01-01", headers=auth_headers(1))
+    assert fresh_chart_cache.stats()["currsize"] <= fresh_chart_cache.stats()["maxsize"]
+
+
+@pytest.mark.parametrize("query", [
+    "max_points=2", "max_points=x", f"max_points={chart_service.CHART_MAX_POINTS + 1}", "downsample=foo",
+    "resolution=hourly", "start_date=2024-13-01", "start_date=2024-1-5", "end_date=2024/01/05", "start_date=1800-01-01&end_date=2070-01-01",
+])
+def test_chart_invalid_parameters(client, auth_headers, query):
+    assert client.get(f"/transactions/chart?{query}", headers=auth_headers(1)).status_code == 400
+
+
+def test_chart_cache_invalidated_by_new_transaction(client, auth_headers, transactions, fresh_chart_cache):
+    client.get("/transactions/chart?resolution=yearly", headers=auth_headers(1))
+    client.get("/transactions/chart?resolution=yearly", headers=auth_headers(1))
+    assert fresh_chart_cache.hits == 1
+
+    client.post("/transactions/add", json={"type": "pemasukan", "items": [
+        {"amount": 5, "date": "2024-05-01", "description": "y"}
+    ]}, headers=auth_headers(1))
+    points = client.get("/transactions/chart?resolution=yearly", headers=auth_headers(1)).get_json()
+    assert points[-1]["income"] == _expected_totals(transactions, "yearly")["2024"][0] + 5
+
+
+def test_chart_invalid_date_message(client, auth_headers):
+    response = client.get("/transactions/chart?start_date=2024-1-5", headers=auth_headers(1))
+    assert response.get_json() == {"error": "Format tanggal harus YYYY-MM-DD"}
+
+
+def test_chart_dates_normalized(client, auth_headers, fresh_chart_cache):
+    compact = client.get("/transactions/chart?start_date=20240101&end_date=20240103", headers=auth_headers(1))
+    assert [p["date"] for p in compact.get_json()] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    client.get("/transactions/chart?start_date=2024-01-01&end_date=2024-01-03", headers=auth_headers(1))
+    assert fresh_chart_cache.hits == 1
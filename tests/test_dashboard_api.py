@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+import user_api
+
+
+def test_forecast_batch_forbidden_for_non_admin(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    response = client.post("/dashboard/forecast/batch", json={"user_ids": [2], "days": 30}, headers=auth_headers(1))
+    assert response.status_code == 403
+
+
+def test_forecast_batch_for_admin(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    response = client.post("/dashboard/forecast/batch", json={"user_ids": [1], "days": 30}, headers=auth_headers(2))
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 1
+
+
+def test_dashboard_summary_groups_applications_by_calendar_month(app, client, auth_headers):
+    from datetime import date, datetime
+    from app.models import db, Activity, Application, DailyTotal
+
+    db.session.add_all([
+        Application(user_id=1, borrower="A", amount=100, status="ok", date=date(2023, 3, 5), is_fraud=False),
+        Application(user_id=1, borrower="B", amount=200, status="ok", date=date(2024, 3, 9), is_fraud=True),
+        Application(user_id=1, borrower="C", amount=300, status="ok", date=date(2024, 1, 2), is_fraud=False),
+        Application(user_id=2, borrower="D", amount=400, status="ok", date=date(2024, 1, 2), is_fraud=True),
+        Activity(user_id=1, title="Login", description="-", timestamp=datetime(2024, 1, 2, 8)),
+        DailyTotal(user_id=1, date=date(2024, 1, 2), income=1000, expense=250, count=2),
+    ])
+    db.session.commit()
+
+    response = client.get("/dashboard/summary", headers=auth_headers(1))
+    assert response.status_code == 200
+    summary = response.get_json()
+    # Maret 2023 dan Maret 2024 digabung seperti DATE_FORMAT(date, '%b'), urut dari tanggal paling awal
+    assert summary["chart_data"] == [{"month": "Mar", "value": 2}, {"month": "Jan", "value": 1}]
+    assert (summary["total_applications"], summary["fraud_count"], summary["fraud_rate"]) == (3, 1, 33)
+    assert [row["borrower"] for row in summary["latest_applications"]] == ["B", "C", "A"]
+    assert [row["title"] for row in summary["recent_activities"]] == ["Login"]
+    assert (summary["income"], summary["expense"], summary["margin"]) == (1000, 250, 75.0)
+
+    health = client.get("/dashboard/financial-health", headers=auth_headers(1)).get_json()
+    assert health == {"income": 1000, "expense": 250, "margin": 75.0}
+
+
+def test_cached_summary_refreshes_after_writes(client, auth_headers, monkeypatch):
+    from datetime import date
+    import dashboard_api
+    from app.models import db, Application
+    from cache_service import VersionedCache
+
+    now = [0.0]
+    monkeypatch.setattr(dashboard_api, "dashboard_cache",
+                        VersionedCache("dashboard_summary", maxsize=100, ttl=30, timer=lambda: now[0]))
+
+    def summary():
+        return client.get("/dashboard/summary", headers=auth_headers(1)).get_json()
+
+    assert summary()["income"] == 0
+    # Transaksi baru menaikkan versi data: langsung terlihat
+    items = [{"type": "pemasukan", "amount": 5000, "date": "2024-01-01", "description": "jual"}]
+    client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1))
+    assert summary()["income"] == 5000
+
+    # Aplikasi ditulis oleh proses lain: cache tetap dipakai sampai TTL habis
+    db.session.add(Application(user_id=1, borrower="A", amount=1, status="ok", date=date(2024, 1, 2), is_fraud=False))
+    db.session.commit()
+    assert summary()["total_applications"] == 0
+    now[0] += 31
+    assert summary()["total_applications"] == 1
+
+
+def test_consultation_without_financial_context_is_logged(client, auth_headers, monkeypatch, caplog):
+    import logging
+    import dashboard_api
+
+    def broken_context(user_id):
+        raise RuntimeError("rollup tidak tersedia")
+
+    monkeypatch.setattr(dashboard_api, "get_financial_context", broken_context)
+    with caplog.at_level(logging.INFO, logger="dashboard_api"):
+        response = client.post("/dashboard/predict", json={"business_details": "Warung kopi"},
+                               headers=auth_headers(1))
+
+    assert response.status_code == 200
+    assert response.headers["X-AI-Context-Tokens"] == "0"
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("rollup tidak tersedia" in message for message in messages)
+    assert any(message.startswith("Ringkasan keuangan user 1: 0 token") for message in messages)
+
+
+# --- Konsultasi AI: streaming SSE dan cache jawaban ---
+
+def _sse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block.strip():
+            event_line, data_line = block.split("\n")
+            events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def llm_streams(monkeypatch):
+    import dashboard_api
+    from cache_service import VersionedCache
+
+    monkeypatch.setattr(dashboard_api, "consultation_cache", VersionedCache("ai_consultation", maxsize=10))
+    calls = []
+    original = dashboard_api.gemini_generate_stream
+
+    def counting(prompt, **kwargs):
+        calls.append(prompt)
+        return original(prompt, **kwargs)
+
+    monkeypatch.setattr(dashboard_api, "gemini_generate_stream", counting)
+    return calls
+
+
+def test_predict_stream_sends_deltas_then_result(client, auth_headers, llm_streams):
+    response = client.post("/dashboard/predict/stream", json={"business_details": "Warung kopi di Bandung"},
+                           headers=auth_headers(1))
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["X-Accel-Buffering"] == "no" and int(response.headers["X-AI-Prompt-Tokens"]) > 0
+
+    events = _sse_events(response)
+    names = [name for name, _ in events]
+    assert names == ["delta"] * (len(events) - 1) + ["result"] and len(events) > 2
+    streamed = json.loads("".join(data["text"] for _, data in events[:-1]))
+    result = events[-1][1]
+    assert result == {**streamed, "cached": False}
+    assert set(result) == {"analysis_summary", "strategic_advice", "cached"}
+    assert len(llm_streams) == 1
+
+
+def test_repeated_question_is_served_from_consultation_cache(client, auth_headers, llm_streams):
+    first = _sse_events(client.post("/dashboard/predict/stream", json={"business_details": "Warung kopi di Bandung"},
+                                    headers=auth_headers(1)))
+    # Pertanyaan yang sama setelah normalisasi (huruf besar/kecil, spasi)
+    repeated = _sse_events(client.post("/dashboard/predict/stream",
+                                       json={"business_details": "  warung KOPI di   bandung "},
+                                       headers=auth_headers(1)))
+    assert repeated == [("result", {**first[-1][1], "cached": True})]
+    assert len(llm_streams) == 1
+
+    non_streaming = client.post("/dashboard/predict", json={"business_details": "Warung kopi di Bandung"},
+                                headers=auth_headers(1))
+    assert non_streaming.get_json() == {k: v for k, v in first[-1][1].items() if k != "cached"}
+
+
+def test_predict_stream_reports_unavailable_provider(client, auth_headers, llm_streams, monkeypatch):
+    import dashboard_api
+    from llm_gateway import LLMUnavailable
+
+    def unavailable(prompt, **kwargs):
+        raise LLMUnavailable("gemini: circuit breaker terbuka")
+        yield  # generator
+
+    monkeypatch.setattr(dashboard_api, "gemini_generate_stream", unavailable)
+    events = _sse_events(client.post("/dashboard/predict/stream", json={"business_details": "Toko kue"},
+                                     headers=auth_headers(1)))
+    assert events == [("error", {"error": "gemini: circuit breaker terbuka", "status": 503})]
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import forecast_service
+import user_api
+from app.models import db, DailyTotal
+from cache_service import VersionedCache
+
+EXPENSE_PER_DAY = 50.0
+
+
+def weekly_income(day):
+    """Pola mingguan murni: seasonal naive memprakirakannya tanpa galat."""
+    return 100.0 * (day.toordinal() % 7 + 1)
+
+
+@pytest.fixture(autouse=True)
+def fresh_forecast_cache(monkeypatch):
+    monkeypatch.setattr(forecast_service, "forecast_cache", VersionedCache("cash_forecast", maxsize=100))
+
+
+@pytest.fixture
+def weekly_series(app):
+    today = datetime.utcnow().date()
+    db.session.add_all([
+        DailyTotal(user_id=1, date=today - timedelta(days=i), income=weekly_income(today - timedelta(days=i)),
+                   expense=EXPENSE_PER_DAY, count=2)
+        for i in range(forecast_service.FORECAST_HISTORY_DAYS)
+    ])
+    db.session.commit()
+    tomorrow = today + timedelta(days=1)
+    return sum(weekly_income(tomorrow + timedelta(days=i)) for i in range(30))
+
+
+def test_forecast_series_selects_model_by_backtest_mae():
+    days = np.arange(forecast_service.FORECAST_HISTORY_DAYS)
+    weekly = 100.0 * (days % 7 + 1)
+    # Level naik 20 hari sebelum akhir: rata-rata mingguan masih tercampur level lama, SES sudah menyesuaikan
+    level_shift = np.where(days < len(days) - 20, 10.0, 500.0)
+    forecast, model_index, mae = forecast_service.forecast_series(np.vstack([weekly, level_shift]), 7)
+
+    assert [forecast_service.MODEL_NAMES[m] for m in model_index] == ["seasonal_naive", "exponential_smoothing"]
+    assert mae[0, 0] == 0 and mae[1, 0] > 0
+    assert mae[1, 1] < mae[0, 1]
+    np.testing.assert_allclose(forecast[0], weekly[-7:])
+    np.testing.assert_allclose(forecast[1], 500.0, rtol=1e-3)
+
+
+def test_user_forecast_for_known_series(client, auth_headers, weekly_series):
+    result = client.get("/dashboard/forecast?days=30", headers=auth_headers(1)).get_json()
+
+    assert result["models"] == {"income": "seasonal_naive", "expense": "seasonal_naive"}
+    assert result["backtest_mae"]["income"]["seasonal_naive"] == 0
+    assert result["backtest_mae"]["income"]["exponential_smoothing"] > 0
+    assert result["backtest_mae"]["expense"] == {"seasonal_naive": 0, "exponential_smoothing": 0}
+    assert result["totals"] == {"income": weekly_series, "expense": 30 * EXPENSE_PER_DAY,
+                                "net": weekly_series - 30 * EXPENSE_PER_DAY}
+    assert len(result["daily"]) == 30
+
+
+def test_forecast_batch_repeated_user_ids(client, auth_headers, weekly_series, monkeypatch):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    response = client.post("/dashboard/forecast/batch", json={"user_ids": [1, 2, 1], "days": 30},
+                           headers=auth_headers(2))
+    results = response.get_json()["results"]
+
+    assert [r["user_id"] for r in results] == [1, 2, 1]
+    assert results[0] == results[2]
+    assert results[0]["totals"] == {"income": weekly_series, "expense": 30 * EXPENSE_PER_DAY,
+                                    "net": weekly_series - 30 * EXPENSE_PER_DAY}
+    assert results[0]["models"] == {"income": "seasonal_naive", "expense": "seasonal_naive"}
+    assert results[1]["totals"] == {"income": 0.0, "expense": 0.0, "net": 0.0}
+
+
+def test_load_daily_series_batch_keeps_request_order(weekly_series):
+    income, expense = forecast_service.load_daily_series_batch([1, 2, 1])
+    assert income[0].sum() > 0 and income[1].sum() == 0
+    np.testing.assert_array_equal(income[0], income[2])
+    np.testing.assert_array_equal(expense[0], expense[2])
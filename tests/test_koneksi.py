@@ -0,0 +1,22 @@
+import threading
+
+import koneksi
+
+
+def test_pool_warmed_once_on_first_request(app, client, monkeypatch):
+    calls = []
+    done = threading.Event()
+
+    def fake_warm_pool():
+        calls.append(threading.current_thread().name)
+        done.set()
+
+    monkeypatch.setattr(koneksi, "warm_pool", fake_warm_pool)
+    koneksi.init_pool_warmup(app)
+    assert calls == []  # tidak ada koneksi sebelum request pertama
+
+    client.get("/transactions/chart")
+    client.get("/transactions/chart")
+
+    assert done.wait(5)
+    assert calls == ["db-pool-warmup"]
@@ -0,0 +1,204 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import llm_gateway
+from fake_llm import FakeGroqClient
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = llm_gateway._Provider("test")
+    monkeypatch.setitem(llm_gateway._providers, "test", provider)
+    return provider
+
+
+def _open_half(provider):
+    provider._opened_at = time.monotonic() - llm_gateway.LLM_BREAKER_COOLDOWN - 1
+    assert provider.state() == "half_open"
+
+
+def _chunks(timeout):
+    yield "halo "
+    yield "dunia"
+
+
+def test_stream_closed_by_client_during_half_open_trial(provider):
+    _open_half(provider)
+    stream = llm_gateway.stream_llm("test", _chunks)
+    assert next(stream) == "halo "
+
+    stream.close()  # client SSE putus di tengah stream
+
+    assert provider._trial_running is False
+    assert provider.counters["in_flight"] == 0
+    assert provider.state() == "half_open"
+    # Percobaan berikutnya tetap diizinkan dan menutup circuit
+    assert "".join(llm_gateway.stream_llm("test", _chunks)) == "halo dunia"
+    assert provider.state() == "closed"
+
+
+def test_stream_failure_during_half_open_trial_reopens(provider, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 0)
+    _open_half(provider)
+
+    def failing(timeout):
+        raise TimeoutError("timeout")
+        yield  # pragma: no cover
+
+    with pytest.raises(TimeoutError):
+        list(llm_gateway.stream_llm("test", failing))
+    assert provider.state() == "open"
+    assert provider._trial_running is False
+
+
+# --- Retry, circuit breaker, dan semaphore lewat backend palsu ---
+
+class _FlakyCompletions:
+    """chat.completions dari FakeGroqClient yang gagal `failures` kali pertama."""
+
+    def __init__(self, failures, error=TimeoutError("timeout"), delay=0, started=None, release=None):
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.attempts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = started
+        self.release = release
+        self._lock = threading.Lock()
+        self._fake = FakeGroqClient().chat.completions
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.attempts += 1
+            attempt = self.attempts
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.started is not None:
+                self.started.release()
+                self.release.wait(timeout=5)
+            if attempt <= self.failures:
+                raise self.error
+            return self._fake.create(**kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Provider 'groq' baru (semaphore/breaker bersih) dengan klien palsu yang bisa diatur."""
+    monkeypatch.setitem(llm_gateway._providers, "groq", llm_gateway._Provider("groq"))
+    delays = []
+    monkeypatch.setattr(llm_gateway, "_backoff_seconds", lambda attempt: delays.append(attempt) or 0)
+
+    def install(*args, **kwargs):
+        completions = _FlakyCompletions(*args, **kwargs)
+        monkeypatch.setattr(llm_gateway, "_groq_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+
+    install.provider = llm_gateway._providers["groq"]
+    install.backoff_attempts = delays
+    return install
+
+
+def _chat():
+    return llm_gateway.groq_chat(deadline=5, messages=[{"role": "user", "content": "Bayar listrik"}],
+                                 model="llama3-8b-8192")
+
+
+def test_transient_errors_are_retried_with_backoff(groq, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 2)
+    completions = groq(failures=2)
+
+    assert _chat().choices[0].message.content
+    assert completions.attempts == 3
+    assert groq.backoff_attempts == [0, 1]
+    counters = groq.provider.counters
+    assert (counters["calls"], counters["retries"], counters["failures"], counters["successes"]) == (3, 2, 2, 1)
+    assert groq.provider.state() == "closed"
+
+
+def test_retries_stop_at_max_retries(groq, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 2)
+    completions = groq(failures=10)
+
+    with pytest.raises(TimeoutError):
+        _chat()
+    assert completions.attempts == 3
+    assert groq.provider.counters["retries"] == 2
+
+
+def test_permanent_errors_are_not_retried(groq):
+    completions = groq(failures=1, error=ValueError("invalid request"))
+
+    with pytest.raises(ValueError):
+        _chat()
+    assert completions.attempts == 1
+    assert groq.provider.counters["retries"] == 0
+    assert groq.provider.stats()["consecutive_failures"] == 0
+
+
+def test_breaker_opens_after_threshold_failures(groq, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(llm_gateway, "LLM_BREAKER_THRESHOLD", 3)
+    completions = groq(failures=10)
+
+    for expected_state in ("closed", "closed", "open"):
+        with pytest.raises(TimeoutError):
+            _chat()
+        assert groq.provider.state() == expected_state
+
+    with pytest.raises(llm_gateway.LLMUnavailable):
+        _chat()
+    assert completions.attempts == 3  # panggilan saat circuit terbuka tidak sampai ke provider
+    assert groq.provider.counters["rejected_open"] == 1
+
+    # Setelah cooldown, satu panggilan percobaan yang berhasil menutup circuit
+    completions.failures = 0
+    _open_half(groq.provider)
+    assert _chat().choices
+    assert groq.provider.state() == "closed"
+
+
+def test_semaphore_limits_concurrent_calls(groq, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(llm_gateway, "LLM_QUEUE_TIMEOUT", 0.05)
+    monkeypatch.setitem(llm_gateway._providers, "groq", llm_gateway._Provider("groq"))
+    provider = llm_gateway._providers["groq"]
+    started, release = threading.Semaphore(0), threading.Event()
+    completions = groq(failures=0, started=started, release=release)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        running = [pool.submit(_chat) for _ in range(2)]
+        for _ in running:
+            assert started.acquire(timeout=5)
+
+        # Kedua slot terpakai: panggilan ketiga gagal setelah LLM_QUEUE_TIMEOUT tanpa memanggil provider
+        with pytest.raises(llm_gateway.LLMUnavailable):
+            _chat()
+        assert provider.counters["rejected_busy"] == 1
+        assert provider.counters["in_flight"] == 2
+
+        release.set()
+        assert all(future.result(timeout=5).choices for future in running)
+
+    assert completions.attempts == 2 and completions.max_in_flight == 2
+    assert provider.counters["in_flight"] == 0
+
+
+def test_semaphore_queues_calls_until_a_slot_frees(groq, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_CONCURRENCY", 2)
+    monkeypatch.setitem(llm_gateway._providers, "groq", llm_gateway._Provider("groq"))
+    completions = groq(failures=0, delay=0.02)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: _chat(), range(6)))
+
+    assert len(results) == 6 and completions.max_in_flight == 2
+    assert llm_gateway._providers["groq"].counters["successes"] == 6
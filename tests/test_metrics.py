@@ -0,0 +1,50 @@
+import pytest
+
+import metrics_api
+from metrics_api import metrics_blueprint
+from metrics_service import init_metrics, sql_statements_per_request, http_request_duration
+
+
+@pytest.fixture
+def metrics_app(app):
+    app.register_blueprint(metrics_blueprint)
+    init_metrics(app)
+    return app
+
+
+def _observed(histogram, *labels):
+    """(jumlah observasi, total nilai) untuk label tertentu."""
+    entry = histogram._values.get(labels)
+    return (entry[2], entry[1]) if entry else (0, 0.0)
+
+
+def test_streamed_response_recorded_after_body(metrics_app, client, auth_headers):
+    items = [{"type": "pemasukan", "amount": 1000, "date": "2024-01-01", "description": "jual"}]
+    client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1))
+    endpoint = "transactions.download_report"
+    count_before, sql_before = _observed(sql_statements_per_request, endpoint)
+
+    response = client.get("/transactions/report?format=csv", headers=auth_headers(1))
+    # Belum dicatat sebelum body stream dibaca dan response ditutup
+    assert _observed(sql_statements_per_request, endpoint)[0] == count_before
+    assert response.get_data(as_text=True).count("\n") == 2
+    response.close()
+
+    count_after, sql_after = _observed(sql_statements_per_request, endpoint)
+    assert count_after == count_before + 1
+    assert sql_after - sql_before >= 1  # query laporan berjalan di dalam stream
+    assert _observed(http_request_duration, endpoint, "GET", 200)[0] >= 1
+
+
+def test_metrics_closed_without_token(metrics_app, client, monkeypatch):
+    monkeypatch.setattr(metrics_api, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 403
+
+
+def test_metrics_requires_token(metrics_app, client, monkeypatch):
+    monkeypatch.setattr(metrics_api, "METRICS_TOKEN", "rahasia")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer salah"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer rahasia"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.get_data(as_text=True)
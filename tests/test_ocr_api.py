@@ -0,0 +1,78 @@
+import io
+import logging
+
+import pytest
+from PIL import Image
+
+import groq_service
+import ocr_api
+
+
+def _jpeg(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("mode", ["", "?mode=async"])
+def test_truncated_image_returns_400(client, auth_headers, mode):
+    data = _jpeg(2500, 2500)
+    response = client.post(
+        f"/ocr/process-receipt{mode}", headers=auth_headers(1),
+        data={"image": (io.BytesIO(data[:len(data) // 2]), "nota.jpg", "image/jpeg")},
+    )
+    assert response.status_code == 400
+    assert "tidak dapat dibaca" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("mode", ["", "?mode=async"])
+def test_oversized_resolution_returns_413(client, auth_headers, monkeypatch, mode):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)  # DecompressionBombError di atas 2x batas
+    response = client.post(
+        f"/ocr/process-receipt{mode}", headers=auth_headers(1),
+        data={"image": (io.BytesIO(_jpeg(2500, 2500)), "nota.jpg", "image/jpeg")},
+    )
+    assert response.status_code == 413
+
+
+def test_request_body_limit_returns_413(monkeypatch):
+    import main
+    from flask_jwt_extended import create_access_token
+
+    monkeypatch.setitem(main.app.config, "MAX_CONTENT_LENGTH", 1024)
+    with main.app.app_context():
+        token = create_access_token(identity="1")
+    response = main.app.test_client().post(
+        "/ocr/process-receipt", headers={"Authorization": f"Bearer {token}"},
+        data={"image": (io.BytesIO(b"x" * 4096), "nota.jpg", "image/jpeg")},
+    )
+    assert response.status_code == 413
+    assert "melebihi batas 1024" in response.get_json()["error"]
+
+
+def test_classify_rule_based(client, auth_headers):
+    response = client.post("/ocr/classify", json={"descriptions": ["Bayar listrik", "Gaji karyawan"]},
+                           headers=auth_headers(1))
+    assert [r["category"] for r in response.get_json()["results"]] == ["Utilitas", "Gaji"]
+
+
+def test_classify_too_many_descriptions(client, auth_headers):
+    descriptions = ["Bayar listrik"] * (ocr_api.MAX_CLASSIFY_DESCRIPTIONS + 1)
+    response = client.post("/ocr/classify", json={"descriptions": descriptions}, headers=auth_headers(1))
+    assert response.status_code == 400
+
+
+def test_classify_description_too_long(client, auth_headers):
+    descriptions = ["x" * (ocr_api.MAX_DESCRIPTION_LENGTH + 1)]
+    response = client.post("/ocr/classify", json={"descriptions": descriptions}, headers=auth_headers(1))
+    assert response.status_code == 400
+
+
+def test_classify_batch_failure_is_logged(app, monkeypatch, caplog):
+    def unavailable(**kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(groq_service, "groq_chat", unavailable)
+    with caplog.at_level(logging.WARNING, logger="groq_service"):
+        assert groq_service.classify_transactions_batch(["toko sebelah"]) is None
+    assert "provider down" in caplog.text
@@ -0,0 +1,102 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+import ocr_api
+import ocr_cache
+from app.models import db, OcrResult, Transaction
+
+
+def _jpeg(color="white"):
+    output = io.BytesIO()
+    Image.new("RGB", (200, 300), color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def vision_calls(monkeypatch):
+    calls = []
+    original = ocr_api.structure_receipt_from_bytes
+
+    def counting(image_bytes, mime_type):
+        calls.append(mime_type)
+        return original(image_bytes, mime_type)
+
+    monkeypatch.setattr(ocr_api, "structure_receipt_from_bytes", counting)
+    return calls
+
+
+def _upload(client, headers, data, query=""):
+    return client.post(f"/ocr/process-receipt{query}", headers=headers,
+                       data={"image": (io.BytesIO(data), "nota.jpg", "image/jpeg")})
+
+
+def test_reupload_uses_cache_and_skips_saved_rows(client, auth_headers, vision_calls):
+    image = _jpeg()
+    first = _upload(client, auth_headers(1), image).get_json()
+    assert first["from_cache"] is False and first["saved_count"] > 0
+    assert len(vision_calls) == 1
+
+    # User yang sama: nota sudah disimpan, tidak ada transaksi ganda
+    duplicate = _upload(client, auth_headers(1), image).get_json()
+    assert duplicate["duplicate"] is True and duplicate["saved_count"] == 0
+    assert duplicate["previous_saved_count"] == first["saved_count"]
+    assert Transaction.query.filter_by(user_id=1).count() == first["saved_count"]
+
+    # User lain atau force_insert: hasil dari cache, tanpa panggilan AI lagi
+    other = _upload(client, auth_headers(2), image).get_json()
+    forced = _upload(client, auth_headers(1), image, "?force_insert=1").get_json()
+    assert other["from_cache"] is True and forced["from_cache"] is True
+    assert other["saved_count"] == forced["saved_count"] == first["saved_count"]
+    assert len(vision_calls) == 1
+
+
+def test_cache_hit_touches_last_used_at_only_when_stale(app):
+    ocr_cache.store_result("a" * 64, json.dumps({"transactions": [{"amount": 1}]}))
+
+    recent = datetime.utcnow() - timedelta(minutes=10)
+    OcrResult.query.update({"last_used_at": recent})
+    db.session.commit()
+    assert ocr_cache.get_cached_result("a" * 64) is not None
+    assert db.session.get(OcrResult, "a" * 64).last_used_at == recent
+
+    stale = datetime.utcnow() - timedelta(seconds=ocr_cache.OCR_CACHE_TOUCH_SECONDS + 60)
+    OcrResult.query.update({"last_used_at": stale})
+    db.session.commit()
+    ocr_cache.get_cached_result("a" * 64)
+    db.session.expire_all()
+    assert db.session.get(OcrResult, "a" * 64).last_used_at > recent
+
+
+def test_eviction_by_total_size(app, monkeypatch):
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_MAX_BYTES", 1000)
+    result = json.dumps({"transactions": [{"description": "x" * 270}]})  # ~300 byte
+    start = datetime.utcnow() - timedelta(days=1)
+    for i in range(4):
+        ocr_cache.store_result(f"{i:064d}", result)
+        OcrResult.query.filter_by(image_hash=f"{i:064d}").update({"last_used_at": start + timedelta(minutes=i)})
+        db.session.commit()
+
+    remaining = [row.image_hash for row in OcrResult.query.order_by(OcrResult.last_used_at)]
+    # 4 x ~300 byte > 1000: entri tertua dibuang sampai total <= 900
+    assert remaining == [f"{i:064d}" for i in (2, 3)]
+    assert sum(row.size for row in OcrResult.query) <= 900
+
+
+def test_legacy_table_gets_size_column(app, monkeypatch):
+    OcrResult.__table__.drop(db.engine)
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE ocr_results (image_hash VARCHAR(64) PRIMARY KEY, result TEXT NOT NULL, "
+            "created_at DATETIME NOT NULL, last_used_at DATETIME NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO ocr_results VALUES ('b', '{\"transactions\": []}', '2024-01-01', '2024-01-01')"
+        )
+    monkeypatch.setattr(ocr_cache, "_tables_ready", False)
+
+    assert ocr_cache.get_cached_result("b") == '{"transactions": []}'
+    assert db.session.get(OcrResult, "b").size == len('{"transactions": []}')
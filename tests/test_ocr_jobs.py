@@ -0,0 +1,89 @@
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+import ocr_api
+import ocr_jobs
+from app.models import Transaction
+
+
+class _ManualExecutor:
+    """Pengganti thread pool: job baru jalan saat run_all(), di thread test."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn, args))
+
+    def run_all(self):
+        while self.submitted:
+            fn, args = self.submitted.pop(0)
+            fn(*args)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = _ManualExecutor()
+    monkeypatch.setattr(ocr_jobs, "_executor", executor)
+    monkeypatch.setattr(ocr_jobs, "_pending", threading.BoundedSemaphore(2))
+    return executor
+
+
+def _jpeg(color="white"):
+    output = io.BytesIO()
+    Image.new("RGB", (200, 300), color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _submit(client, headers, color="white"):
+    return client.post("/ocr/process-receipt?mode=async", headers=headers,
+                       data={"image": (io.BytesIO(_jpeg(color)), "nota.jpg", "image/jpeg")})
+
+
+def test_async_job_lifecycle(client, auth_headers, executor):
+    response = _submit(client, auth_headers(1))
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job["status"] == "queued" and job["status_url"] == f"/ocr/jobs/{job['job_id']}"
+
+    queued = client.get(job["status_url"], headers=auth_headers(1)).get_json()
+    assert queued["status"] == "queued" and queued["result"] is None and queued["finished_at"] is None
+    assert Transaction.query.count() == 0
+
+    executor.run_all()
+    done = client.get(job["status_url"], headers=auth_headers(1)).get_json()
+    assert done["status"] == "done" and done["error"] is None and done["finished_at"]
+    assert done["result"]["status_code"] == 201
+    assert done["result"]["saved_count"] == Transaction.query.filter_by(user_id=1).count() > 0
+
+    # Job user lain tidak terlihat
+    assert client.get(job["status_url"], headers=auth_headers(2)).status_code == 404
+
+
+def test_async_job_failure(client, auth_headers, executor, monkeypatch):
+    def failing(image_bytes, mime_type):
+        raise RuntimeError("vision model timeout")
+
+    monkeypatch.setattr(ocr_api, "structure_receipt_from_bytes", failing)
+    job = _submit(client, auth_headers(1)).get_json()
+    executor.run_all()
+
+    failed = client.get(job["status_url"], headers=auth_headers(1)).get_json()
+    assert failed["status"] == "failed" and failed["result"] is None
+    assert "vision model timeout" in failed["error"]
+    assert Transaction.query.count() == 0
+
+
+def test_full_queue_returns_429_until_a_job_finishes(client, auth_headers, executor):
+    assert _submit(client, auth_headers(1), "white").status_code == 202
+    assert _submit(client, auth_headers(1), "gray").status_code == 202
+
+    full = _submit(client, auth_headers(1), "black")
+    assert full.status_code == 429
+    assert "Antrean OCR penuh" in full.get_json()["error"]
+
+    executor.run_all()
+    assert _submit(client, auth_headers(1), "black").status_code == 202
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+from PIL import Image
+
+import ocr_api
+from app.models import db, DailyTotal, OcrUpload, Transaction
+
+TIMINGS = ("queued_ms", "prepare_ms", "ocr_ms")
+
+
+def _image(color, format="JPEG"):
+    output = io.BytesIO()
+    Image.new("RGB", (200, 300), color).save(output, format=format)
+    return output.getvalue()
+
+
+def _pdf(*colors):
+    output = io.BytesIO()
+    pages = [Image.new("RGB", (200, 300), color) for color in colors]
+    pages[0].save(output, format="PDF", save_all=True, append_images=pages[1:])
+    return output.getvalue()
+
+
+def _upload(client, headers, files):
+    return client.post("/ocr/process-receipt", headers=headers,
+                       data={"image": [(io.BytesIO(data), name, mimetype) for name, data, mimetype in files]})
+
+
+UPLOAD = [
+    ("a.jpg", _image("white"), "image/jpeg"),
+    ("b.jpg", _image("gray"), "image/jpeg"),
+    ("laporan.pdf", _pdf("red", "blue"), "application/pdf"),
+    ("a-lagi.jpg", _image("white"), "image/jpeg"),
+]
+
+
+@pytest.fixture
+def commits(monkeypatch):
+    """Jumlah transaksi tersimpan pada setiap commit session."""
+    counts = []
+    original = db.session.commit
+
+    def counting_commit():
+        counts.append(Transaction.query.count())
+        original()
+
+    monkeypatch.setattr(db.session, "commit", counting_commit)
+    return counts
+
+
+def test_multiple_files_and_pdf_pages_in_one_commit(client, auth_headers, commits):
+    response = _upload(client, auth_headers(1), UPLOAD)
+    assert response.status_code == 201
+    result = response.get_json()
+
+    assert result["page_count"] == 5
+    assert [page["page"] for page in result["pages"]] == ["a.jpg", "b.jpg", "laporan.pdf#1", "laporan.pdf#2",
+                                                          "a-lagi.jpg"]
+    extracted, duplicate = result["pages"][:4], result["pages"][4]
+    assert duplicate == {"page": "a-lagi.jpg", "duplicate": True}
+    for page in extracted:
+        assert page["from_cache"] is False and page["saved_count"] > 0
+        assert all(page[name] >= 0 for name in TIMINGS)
+    assert result["saved_count"] == sum(page["saved_count"] for page in extracted)
+    assert result["split_ms"] >= 0 and result["total_ms"] >= result["extract_ms"] >= 0
+
+    # Cache OCR boleh di-commit per halaman, transaksinya hanya di commit terakhir
+    assert Transaction.query.filter_by(user_id=1).count() == result["saved_count"]
+    assert [count for count in commits if count] == [result["saved_count"]] and commits[-1] == result["saved_count"]
+    assert OcrUpload.query.filter_by(user_id=1).count() == 4
+
+
+def test_reupload_reuses_cache_and_skips_saved_pages(client, auth_headers):
+    first = _upload(client, auth_headers(1), UPLOAD[:3]).get_json()
+    again = _upload(client, auth_headers(1), UPLOAD[:3]).get_json()
+    assert again["saved_count"] == 0 and all(page.get("duplicate") for page in again["pages"])
+
+    other_user = _upload(client, auth_headers(2), UPLOAD[:3]).get_json()
+    assert all(page["from_cache"] is True for page in other_user["pages"])
+    assert not any(name in page for page in other_user["pages"] for name in TIMINGS)
+    assert other_user["saved_count"] == first["saved_count"]
+
+
+def test_failure_while_saving_keeps_nothing(client, auth_headers, monkeypatch):
+    original = ocr_api.add_to_daily_totals
+
+    def fail_after_insert(user_id, entries):
+        original(user_id, entries)  # transaksi dan rollup sudah di-flush ke database
+        raise RuntimeError("database error")
+
+    monkeypatch.setattr(ocr_api, "add_to_daily_totals", fail_after_insert)
+    response = _upload(client, auth_headers(1), UPLOAD)
+
+    assert response.status_code == 500
+    assert Transaction.query.count() == 0
+    assert OcrUpload.query.count() == 0
+    assert DailyTotal.query.count() == 0
@@ -0,0 +1,54 @@
+import pytest
+
+import chart_service
+import dashboard_api
+import forecast_service
+import scoring_api
+from benchmarks.data_generator import HEALTH_SCORE_BODY
+from cache_service import VersionedCache
+from query_profiler import ENDPOINT_QUERY_BUDGETS, assert_query_budget
+
+# endpoint -> (method, path, body JSON)
+ENDPOINT_REQUESTS = {
+    "transactions.get_transaction_chart": ("GET", "/transactions/chart?resolution=weekly", None),
+    "transactions.get_transaction_metrics": ("GET", "/transactions/metrics", None),
+    "scoring.get_business_health_score": ("POST", "/scoring/health-score", HEALTH_SCORE_BODY),
+    "dashboard.dashboard_summary": ("GET", "/dashboard/summary", None),
+    "dashboard.financial_health": ("GET", "/dashboard/financial-health", None),
+    "dashboard.cash_flow_forecast": ("GET", "/dashboard/forecast?days=30", None),
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    """Budget berlaku untuk cache miss, jadi setiap test mulai dengan cache kosong."""
+    for module, name in ((chart_service, "chart_cache"), (dashboard_api, "dashboard_cache"),
+                         (scoring_api, "dna_cache"), (forecast_service, "forecast_cache")):
+        monkeypatch.setattr(module, name, VersionedCache(getattr(module, name).name, maxsize=10000))
+
+
+@pytest.fixture
+def transactions(client, auth_headers):
+    items = [
+        {"type": "pemasukan" if day % 3 else "pengeluaran", "amount": 10000 + day * 500,
+         "date": f"2024-{1 + day // 28:02d}-{1 + day % 28:02d}", "description": "x"}
+        for day in range(120)
+    ]
+    assert client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1)).status_code == 201
+
+
+def test_every_budgeted_endpoint_is_covered():
+    assert set(ENDPOINT_REQUESTS) == set(ENDPOINT_QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("with_data", [False, True], ids=["empty", "with_transactions"])
+@pytest.mark.parametrize("endpoint", sorted(ENDPOINT_REQUESTS))
+def test_endpoint_within_query_budget(request, app, client, auth_headers, endpoint, with_data):
+    if with_data:
+        request.getfixturevalue("transactions")
+    method, path, body = ENDPOINT_REQUESTS[endpoint]
+    headers = auth_headers(1)
+    with assert_query_budget(endpoint):
+        response = client.open(path, method=method, json=body, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert app.url_map.bind("localhost").match(path.split("?")[0], method=method)[0] == endpoint
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import report_service
+from app.models import db, Transaction
+
+
+def _add_transactions(user_id, count, days):
+    for i in range(count):
+        db.session.add(Transaction(
+            user_id=user_id, type="pemasukan" if i % 2 else "pengeluaran",
+            description=f"trx {i}", amount=1000 + i, date=date(2024, 1, 1) + timedelta(days=i % days),
+        ))
+    db.session.commit()
+
+
+def test_report_rows_paged_by_keyset(app, monkeypatch):
+    # Banyak transaksi di tanggal yang sama melewati batas halaman
+    monkeypatch.setattr(report_service, "REPORT_PAGE_SIZE", 7)
+    _add_transactions(1, 50, days=4)
+    _add_transactions(2, 5, days=4)
+
+    rows = list(report_service.iter_report_rows(1))
+
+    assert len(rows) == 50
+    assert sorted(row[2] for row in rows) == sorted(f"trx {i}" for i in range(50))
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+
+def test_report_rows_date_range(app, monkeypatch):
+    monkeypatch.setattr(report_service, "REPORT_PAGE_SIZE", 3)
+    _add_transactions(1, 20, days=10)
+
+    rows = list(report_service.iter_report_rows(1, "2024-01-03", "2024-01-04"))
+
+    assert len(rows) == 4
+    assert {row[0] for row in rows} == {"2024-01-03", "2024-01-04"}
+
+
+def test_report_csv_endpoint(client, auth_headers, app):
+    _add_transactions(1, 3, days=3)
+    response = client.get("/transactions/report?format=csv", headers=auth_headers(1))
+    lines = response.get_data(as_text=True).strip().splitlines()
+    assert response.status_code == 200
+    assert lines[0] == "Tanggal,Jenis,Deskripsi,Jumlah"
+    assert len(lines) == 4
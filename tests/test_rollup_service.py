@@ -0,0 +1,77 @@
+import io
+import json
+from collections import defaultdict
+
+from PIL import Image
+
+from app.models import DailyTotal, Transaction
+from rollup_service import get_data_version, is_non_sales_income
+
+
+def _aggregate_transactions(user_id):
+    """daily_totals yang diharapkan, dihitung langsung dari baris 'transactions'."""
+    expected = defaultdict(lambda: {"income": 0.0, "expense": 0.0, "count": 0, "non_sales_income": 0.0,
+                                    "expense_count": 0})
+    for tx in Transaction.query.filter_by(user_id=user_id):
+        totals = expected[tx.date]
+        if tx.type == "pemasukan":
+            totals["income"] += tx.amount
+            if is_non_sales_income(tx.description):
+                totals["non_sales_income"] += tx.amount
+        elif tx.type == "pengeluaran":
+            totals["expense"] += tx.amount
+            totals["expense_count"] += 1
+        totals["count"] += 1
+    return dict(expected)
+
+
+def _daily_totals(user_id):
+    return {
+        row.date: {"income": row.income, "expense": row.expense, "count": row.count,
+                   "non_sales_income": row.non_sales_income, "expense_count": row.expense_count}
+        for row in DailyTotal.query.filter_by(user_id=user_id)
+    }
+
+
+def _assert_rollup_matches_transactions(user_id):
+    expected = _aggregate_transactions(user_id)
+    assert expected
+    assert _daily_totals(user_id) == expected
+
+
+def test_legacy_add_updates_rollup(client, auth_headers):
+    for trx_type, items in (
+        ("pemasukan", [{"description": "Penjualan", "amount": 150000, "date": "2024-03-01"},
+                       {"description": "Suntikan modal", "amount": 50000, "date": "2024-03-01"}]),
+        ("pengeluaran", [{"description": "Bahan", "amount": 40000, "date": "2024-03-01"},
+                         {"description": "Sewa", "amount": 0, "date": "2024-03-02"}]),
+    ):
+        response = client.post("/transactions/add", json={"type": trx_type, "items": items}, headers=auth_headers(1))
+        assert response.status_code == 201
+
+    _assert_rollup_matches_transactions(1)
+    assert get_data_version(1) == 2
+
+
+def test_ndjson_bulk_add_updates_rollup(client, auth_headers):
+    rows = [
+        {"type": "pemasukan" if i % 3 else "pengeluaran", "amount": 1000 * (i + 1),
+         "date": f"2024-04-{1 + i % 5:02d}", "description": "pinjaman bank" if i == 4 else "harian"}
+        for i in range(12)
+    ]
+    response = client.post("/transactions/add", data="\n".join(json.dumps(row) for row in rows),
+                           content_type="application/x-ndjson", headers=auth_headers(1))
+    assert response.status_code == 201
+
+    _assert_rollup_matches_transactions(1)
+    assert len(_daily_totals(1)) == 5
+
+
+def test_ocr_save_updates_rollup(client, auth_headers):
+    image = io.BytesIO()
+    Image.new("RGB", (200, 300), "white").save(image, format="JPEG")
+    response = client.post("/ocr/process-receipt", headers=auth_headers(1),
+                           data={"image": (io.BytesIO(image.getvalue()), "nota.jpg", "image/jpeg")})
+    assert response.get_json()["saved_count"] > 0
+
+    _assert_rollup_matches_transactions(1)
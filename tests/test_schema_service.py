@@ -0,0 +1,92 @@
+from datetime import date
+
+import schema_service
+from app.models import db, DailyTotal
+from dashboard_api import monthly_applications_query
+
+
+def _plan(results, name):
+    return next(result for result in results if result["query"] == name)
+
+
+def test_monthly_applications_mirrors_dashboard_query(app):
+    statement = dict(schema_service.hot_queries(1))["dashboard/monthly_applications"]
+    assert str(statement.compile(db.engine)) == str(monthly_applications_query(1).statement.compile(db.engine))
+
+
+def test_index_plans_pass(app):
+    assert all(not result["full_scans"] for result in schema_service.check_query_plans())
+
+
+def test_scan_on_small_table_is_not_a_regression(app, monkeypatch):
+    db.session.execute(db.text("DROP INDEX ix_applications_user_date_fraud"))
+    db.session.commit()
+
+    plan = _plan(schema_service.check_query_plans(), "dashboard/monthly_applications")
+    assert plan["full_scans"] == [] and plan["small_tables"] == ["applications"]
+
+    monkeypatch.setattr(schema_service, "PLAN_CHECK_MIN_ROWS", 0)
+    plan = _plan(schema_service.check_query_plans(), "dashboard/monthly_applications")
+    assert plan["full_scans"] and plan["small_tables"] == []
+
+
+def test_explain_defaults_to_busiest_user(app):
+    db.session.add_all([DailyTotal(user_id=2, date=date(2024, 1, day), income=1, expense=0, count=1)
+                        for day in (1, 2)])
+    db.session.add(DailyTotal(user_id=1, date=date(2024, 1, 1), income=1, expense=0, count=1))
+    db.session.commit()
+    assert "user_id = 2" in _plan(schema_service.check_query_plans(), "dashboard/data_version")["sql"]
+
+
+class _FakeExplain:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def exec_driver_sql(self, sql):
+        return self
+
+    def mappings(self):
+        return self.rows
+
+
+def test_mysql_index_scan_counts_only_when_reading_most_of_the_index():
+    limit_walk = {"table": "applications", "type": "index", "key": "ix_applications_user_date_fraud", "rows": 5}
+    full_index = dict(limit_walk, rows=90000)
+    table_scan = {"table": "activities", "type": "ALL", "key": None, "rows": 10}
+    table_rows = {"applications": 100000, "activities": 20}
+
+    scans = schema_service._mysql_full_scans(_FakeExplain([limit_walk, full_index, table_scan]), "", table_rows)
+    assert [table for table, _ in scans] == ["applications", "activities"]
+    assert "rows=90000" in scans[0][1]
+
+
+def test_ensure_schema_migrates_legacy_rollup_tables(app):
+    from sqlalchemy import inspect
+
+    from app.models import DataVersion, Transaction
+
+    db.session.add_all([
+        Transaction(user_id=1, date=date(2024, 1, 1), type="pemasukan", amount=100, description="modal awal"),
+        Transaction(user_id=1, date=date(2024, 1, 1), type="pengeluaran", amount=0, description="-"),
+        Transaction(user_id=2, date=date(2024, 1, 2), type="pengeluaran", amount=30, description="-"),
+    ])
+    db.session.commit()
+    # Database dari versi sebelum rollup: tanpa data_versions, daily_totals tanpa kolom baru
+    DataVersion.__table__.drop(db.engine)
+    DailyTotal.__table__.drop(db.engine)
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE daily_totals (user_id INTEGER NOT NULL, date DATE NOT NULL, income FLOAT NOT NULL, "
+            "expense FLOAT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (user_id, date))"
+        )
+
+    created_tables, added_columns = schema_service.ensure_schema()
+
+    assert created_tables == ["data_versions"]
+    assert added_columns == ["daily_totals.non_sales_income", "daily_totals.expense_count"]
+    columns = {column["name"] for column in inspect(db.engine).get_columns("daily_totals")}
+    assert {"non_sales_income", "expense_count"} <= columns
+    rows = {(row.user_id, row.date): (row.income, row.expense, row.count, row.non_sales_income, row.expense_count)
+            for row in DailyTotal.query}
+    assert rows == {(1, date(2024, 1, 1)): (100, 0, 2, 100, 1), (2, date(2024, 1, 2)): (0, 30, 1, 0, 1)}
+    assert schema_service.ensure_schema() == ([], [])
@@ -0,0 +1,189 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import scoring_api
+import user_api
+from app.models import db, Transaction
+from batch_scoring import dna_scores_batch, load_pnl_features_batch
+from benchmarks.data_generator import HEALTH_SCORE_BODY
+from cache_service import VersionedCache
+from rollup_service import NON_SALES_KEYWORDS, rebuild_daily_totals
+
+
+def test_health_score_batch_forbidden_for_non_admin(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    response = client.post(
+        "/scoring/health-score/batch",
+        json={"users": [{"user_id": 2, **HEALTH_SCORE_BODY}]},
+        headers=auth_headers(1),
+    )
+    assert response.status_code == 403
+
+
+def test_health_score_batch_forbidden_without_admins(client, auth_headers):
+    response = client.post(
+        "/scoring/health-score/batch",
+        json={"users": [{"user_id": 1, **HEALTH_SCORE_BODY}]},
+        headers=auth_headers(1),
+    )
+    assert response.status_code == 403
+
+
+def test_health_score_batch_for_admin(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    response = client.post(
+        "/scoring/health-score/batch",
+        json={"users": [{"user_id": 1, **HEALTH_SCORE_BODY}]},
+        headers=auth_headers(2),
+    )
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 1
+
+
+# --- P&L DNA dari snapshot daily_totals vs implementasi lama per query ---
+
+def _legacy_dna_scores(user_id):
+    """Skor P&L DNA versi lama: dihitung langsung dari baris 'transactions'."""
+    transactions = Transaction.query.filter_by(user_id=user_id).all()
+    income = sum(tx.amount for tx in transactions if tx.type == "pemasukan")
+    expense = sum(tx.amount for tx in transactions if tx.type == "pengeluaran")
+
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=59)
+    daily_profit = defaultdict(float)
+    daily_expense = defaultdict(float)
+    for tx in transactions:
+        if tx.type == "pengeluaran":
+            daily_expense[tx.date] += tx.amount
+        if start_date <= tx.date <= end_date:
+            daily_profit[tx.date] += tx.amount if tx.type == "pemasukan" else -tx.amount
+    profit_series = np.array([daily_profit[start_date + timedelta(days=i)] for i in range(60)])
+
+    margin = (income - expense) / income * 100 if income else None
+    if margin is None: profitability = 0
+    elif margin > 20: profitability = 90
+    elif 10 <= margin <= 20: profitability = 70
+    elif 1 <= margin < 10: profitability = 45
+    elif margin == 0: profitability = 20
+    else: profitability = 0
+
+    mean_profit = np.mean(profit_series)
+    cv = np.std(profit_series) / mean_profit if mean_profit > 0 else None
+    if cv is None: stability = 10
+    elif cv < 0.3: stability = 95
+    elif cv < 0.7: stability = 80
+    elif cv < 1.2: stability = 60
+    else: stability = 30
+
+    model = LinearRegression().fit(np.arange(60).reshape(-1, 1), profit_series)
+    normalized_trend = model.coef_[0] / mean_profit * 100 if mean_profit > 0 else None
+    if normalized_trend is None: trend = 10
+    elif normalized_trend > 0.5: trend = 95
+    elif normalized_trend > 0: trend = 80
+    elif normalized_trend == 0: trend = 60
+    else: trend = 30
+
+    sales_income = sum(tx.amount for tx in transactions if tx.type == "pemasukan"
+                       and not any(k in tx.description.lower() for k in NON_SALES_KEYWORDS))
+    quality_ratio = sales_income / income * 100 if income else None
+    if quality_ratio is None: income_quality = 0
+    elif quality_ratio > 95: income_quality = 95
+    elif quality_ratio >= 80: income_quality = 80
+    elif quality_ratio >= 60: income_quality = 60
+    else: income_quality = 30
+
+    # Hari dengan baris pengeluaran ikut dihitung walaupun totalnya 0
+    daily_expenses = list(daily_expense.values())
+    if len(daily_expenses) < 7: predictability = 50
+    elif np.mean(daily_expenses) == 0: predictability = 100
+    else:
+        cv_expense = np.std(daily_expenses) / np.mean(daily_expenses)
+        predictability = 90 if cv_expense < 0.4 else 70 if cv_expense < 0.8 else 40
+
+    return {"profitability": profitability, "stability": stability, "trend": trend,
+            "income_quality": income_quality, "load_management": 0.5 * profitability + 0.5 * predictability}
+
+
+@pytest.fixture
+def zero_expense_day(app):
+    """6 hari pengeluaran bernilai positif + 1 hari yang baris pengeluarannya bernilai 0."""
+    today = datetime.utcnow().date()
+    rows = []
+    for day in range(40):
+        rows.append(Transaction(user_id=1, date=today - timedelta(days=day), type="pemasukan",
+                                amount=1000 + 20 * (40 - day), description="penjualan"))
+    rows.append(Transaction(user_id=1, date=today - timedelta(days=3), type="pemasukan",
+                            amount=5000, description="Suntikan modal"))
+    for day in range(6):
+        rows.append(Transaction(user_id=1, date=today - timedelta(days=2 * day), type="pengeluaran",
+                                amount=400 + 10 * day, description="bahan"))
+    rows.append(Transaction(user_id=1, date=today - timedelta(days=20), type="pengeluaran",
+                            amount=0, description="biaya kosong"))
+    db.session.add_all(rows)
+    db.session.commit()
+    rebuild_daily_totals(1)
+
+
+def test_dna_scores_match_legacy_per_query_implementation(zero_expense_day):
+    expected = _legacy_dna_scores(1)
+    assert expected["load_management"] != 0.5 * expected["profitability"] + 25  # 7 hari pengeluaran, bukan default 50
+
+    assert scoring_api.calculate_dna_scores(scoring_api.extract_pnl_features(1)) == pytest.approx(expected)
+    batch = dna_scores_batch(load_pnl_features_batch([1]))
+    assert {name: scores[0] for name, scores in batch.items()} == pytest.approx(expected)
+
+
+# --- Cache P&L DNA ---
+
+@pytest.fixture
+def dna_cache(monkeypatch):
+    cache = VersionedCache("health_score_dna", maxsize=100)
+    monkeypatch.setattr(scoring_api, "dna_cache", cache)
+    return cache
+
+
+def _add_income(client, auth_headers, amount, day="2024-05-01"):
+    response = client.post("/transactions/add", headers=auth_headers(1), json={
+        "type": "pemasukan", "items": [{"description": "Penjualan", "amount": amount, "date": day}]})
+    assert response.status_code == 201
+
+
+def test_dna_cache_misses_after_new_transaction(client, auth_headers, dna_cache):
+    _add_income(client, auth_headers, 1000)
+    first = scoring_api.get_cached_dna_scores(1)
+    assert scoring_api.get_cached_dna_scores(1) == first
+    assert (dna_cache.hits, dna_cache.misses) == (1, 1)
+
+    client.post("/transactions/add", headers=auth_headers(1), json={
+        "type": "pengeluaran", "items": [{"description": "Bahan", "amount": 2000, "date": "2024-05-01"}]})
+    second = scoring_api.get_cached_dna_scores(1)
+    assert (dna_cache.hits, dna_cache.misses) == (1, 2)
+    assert second["profitability"] != first["profitability"]
+
+
+def test_dna_cache_misses_after_date_rollover(client, auth_headers, dna_cache, monkeypatch):
+    _add_income(client, auth_headers, 1000)
+    scoring_api.get_cached_dna_scores(1)
+    scoring_api.get_cached_dna_scores(1)
+    assert (dna_cache.hits, dna_cache.misses) == (1, 1)
+
+    class Tomorrow(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=1)
+
+    monkeypatch.setattr(scoring_api, "datetime", Tomorrow)
+    scoring_api.get_cached_dna_scores(1)
+    assert (dna_cache.hits, dna_cache.misses) == (1, 2)
+
+
+def test_cache_stats_admin_only(client, auth_headers, monkeypatch, dna_cache):
+    monkeypatch.setattr(user_api, "ADMIN_USER_IDS", frozenset({"2"}))
+    assert client.get("/scoring/health-score/cache-stats", headers=auth_headers(1)).status_code == 403
+    response = client.get("/scoring/health-score/cache-stats", headers=auth_headers(2))
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "health_score_dna"
@@ -0,0 +1,118 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+import transaction_service
+from app.models import db, Transaction
+
+
+@pytest.fixture
+def transactions(client, auth_headers):
+    items = [
+        {"type": "pemasukan", "amount": 100000, "date": "2024-01-01", "description": "jual"},
+        {"type": "pengeluaran", "amount": 40000, "date": "2024-01-10", "description": "beli"},
+    ]
+    assert client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1)).status_code == 201
+
+
+def test_metrics_totals(client, auth_headers, transactions):
+    metrics = client.get("/transactions/metrics", headers=auth_headers(1)).get_json()
+    assert metrics["revenue"] == 100000
+    assert metrics["expense"] == 40000
+    assert metrics["duration_days"] == 10
+
+
+def test_metrics_monthly_breakdown(client, auth_headers, transactions):
+    items = [{"type": "pemasukan", "amount": 50000, "date": "2024-02-15", "description": "jual"}]
+    client.post("/transactions/add?mode=bulk", json={"items": items}, headers=auth_headers(1))
+    metrics = client.get("/transactions/metrics?breakdown=monthly", headers=auth_headers(1)).get_json()
+    assert metrics["revenue"] == 150000
+    assert [(row["period"], row["revenue"], row["expense"]) for row in metrics["breakdown"]] == [
+        ("2024-01", 100000, 40000), ("2024-02", 50000, 0)]
+    assert metrics["breakdown"][1]["end_date"] == "2024-02-15"
+
+
+@pytest.mark.parametrize("query", ["", "?start_date=2099-01-01", "?end_date=2000-01-01",
+                                   "?start_date=2099-01-01&end_date=2099-01-31"])
+def test_metrics_empty_range(client, auth_headers, transactions, query):
+    response = client.get(f"/transactions/metrics{query}", headers=auth_headers(2 if not query else 1))
+    metrics = response.get_json()
+    assert response.status_code == 200
+    assert metrics["revenue"] == 0 and metrics["expense"] == 0 and metrics["transaction_count"] == 0
+    assert metrics["duration_days"] >= 1
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "-Infinity", "1e400"])
+def test_bulk_add_rejects_non_finite_amount(client, auth_headers, amount):
+    body = '{"items": [{"type": "pemasukan", "amount": %s, "date": "2024-01-01", "description": "x"}]}' % amount
+    response = client.post("/transactions/add?mode=bulk", data=body, content_type="application/json",
+                           headers=auth_headers(1))
+    assert response.status_code == 400
+    assert response.get_json()["error_count"] == 1
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity"])
+def test_add_rejects_non_finite_amount(client, auth_headers, amount):
+    body = '{"type": "pemasukan", "items": [{"amount": %s, "date": "2024-01-01", "description": "x"}]}' % amount
+    response = client.post("/transactions/add", data=body, content_type="application/json", headers=auth_headers(1))
+    assert response.status_code == 400
+    metrics = client.get("/transactions/metrics", headers=auth_headers(1)).get_json()
+    assert metrics["transaction_count"] == 0
+
+
+def test_bulk_add_ndjson_returns_ids_in_input_order(client, auth_headers):
+    lines = "\n".join(
+        '{"type": "pengeluaran", "amount": %d, "date": "2024-02-%02d", "description": "beli"}' % (1000 * i, i)
+        for i in range(1, 21)
+    )
+    response = client.post("/transactions/add", data=lines, content_type="application/x-ndjson",
+                           headers=auth_headers(1))
+    body = response.get_json()
+    assert response.status_code == 201
+    assert body["inserted_count"] == 20 and body["inserted_rows"] == list(range(1, 21))
+    amounts = dict(db.session.query(Transaction.id, Transaction.amount).all())
+    assert [amounts[i] for i in body["inserted_ids"]] == [1000.0 * i for i in range(1, 21)]
+    assert "inserted_refs" not in body
+    assert client.get("/transactions/metrics", headers=auth_headers(1)).get_json()["expense"] == 210000
+
+
+def test_bulk_add_partial_echoes_refs(client, auth_headers):
+    items = [
+        {"type": "pemasukan", "amount": 5000, "date": "2024-03-01", "description": "a", "ref": "nota-1"},
+        {"type": "pemasukan", "amount": "x", "date": "2024-03-01", "description": "b", "ref": "nota-2"},
+        {"type": "pemasukan", "amount": 7000, "date": "2024-03-02", "description": "c", "ref": 3},
+    ]
+    response = client.post("/transactions/add?mode=bulk&partial=1", json={"items": items}, headers=auth_headers(1))
+    body = response.get_json()
+    assert response.status_code == 201
+    assert body["inserted_rows"] == [1, 3] and body["inserted_refs"] == ["nota-1", 3]
+    assert [db.session.get(Transaction, i).description for i in body["inserted_ids"]] == ["a", "c"]
+    assert body["errors"] == [{"row": 2, "error": "Jumlah tidak valid: x"}]
+
+
+def test_bulk_insert_ids_across_chunks(app):
+    items = [{"type": "pemasukan", "amount": i, "date": "2024-04-01", "description": str(i)} for i in range(1, 18)]
+    inserted, errors, error_count = transaction_service.bulk_insert_transactions(1, enumerate(items, 1), chunk_size=5)
+    db.session.commit()
+    assert error_count == 0 and inserted["rows"] == list(range(1, 18))
+    assert [db.session.get(Transaction, i).amount for i in inserted["ids"]] == [float(i) for i in range(1, 18)]
+
+
+class _FakeMysqlConnection:
+    def __init__(self, lock_mode, increment=2, lastrowid=101):
+        self.engine = object()
+        self.settings = (lock_mode, increment)
+        self.lastrowid = lastrowid
+
+    def exec_driver_sql(self, sql, params=None):
+        if sql.startswith("SELECT @@"):
+            return SimpleNamespace(one=lambda: self.settings)
+        return SimpleNamespace(lastrowid=self.lastrowid)
+
+
+@pytest.mark.parametrize("lock_mode, expected", [(1, [101, 103, 105]), (2, None)])
+def test_mysql_multirow_ids_only_when_consecutive(app, monkeypatch, lock_mode, expected):
+    monkeypatch.setattr(db.session, "connection", lambda: _FakeMysqlConnection(lock_mode))
+    values = [{"user_id": 1, "type": "pemasukan", "description": "x", "amount": 1.0, "date": date(2024, 1, 1)}] * 3
+    assert transaction_service._insert_multirow(values) == expected
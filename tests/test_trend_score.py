@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from batch_scoring import least_squares_slope, trend_scores
+from scoring_api import calculate_trend_score
+
+linear_model = pytest.importorskip("sklearn.linear_model")
+
+_rng = np.random.default_rng(7)
+SERIES = {
+    "flat": np.full(60, 150_000.0),
+    "single_point": np.array([250_000.0]),
+    "two_points": np.array([100_000.0, 130_000.0]),
+    "noisy_up": 100_000 + 800 * np.arange(60) + _rng.normal(0, 40_000, 60),
+    "noisy_down": 200_000 - 1_500 * np.arange(60) + _rng.normal(0, 30_000, 60),
+    "noisy_flat": 50_000 + _rng.normal(0, 20_000, 60),
+    "loss": -20_000 + _rng.normal(0, 5_000, 60),
+}
+
+
+def _sklearn_slope(series):
+    X = np.arange(len(series)).reshape(-1, 1)
+    return linear_model.LinearRegression().fit(X, series).coef_[0]
+
+
+def _sklearn_trend_score(profit_series):
+    """Implementasi calculate_trend_score sebelum LinearRegression diganti (user-003)."""
+    if len(profit_series) < 14: return 50
+    mean_profit = np.mean(profit_series)
+    if mean_profit <= 0: return 10
+    normalized_trend = (_sklearn_slope(profit_series) / mean_profit) * 100
+    if normalized_trend > 0.5: return 95
+    if 0 < normalized_trend <= 0.5: return 80
+    if normalized_trend == 0: return 60
+    return 30
+
+
+def _features(profit_series):
+    """Fitur P&L yang menghasilkan `profit_series` sebagai deret 60 hari terakhir."""
+    days = len(profit_series)
+    end = np.datetime64(datetime.utcnow().date(), "D")
+    dates = end - np.arange(days)[::-1]
+    income = np.maximum(profit_series, 0)
+    return {"dates": dates, "income": income, "expense": income - profit_series,
+            "non_sales_income": np.zeros(days), "expense_count": (income - profit_series > 0).astype(int)}
+
+
+@pytest.mark.parametrize("name", SERIES)
+def test_slope_matches_sklearn(name):
+    series = SERIES[name]
+    assert least_squares_slope(series) == pytest.approx(_sklearn_slope(series), abs=1e-9)
+
+
+def test_slope_batch_matches_rows():
+    batch = np.vstack([SERIES[name] for name in SERIES if len(SERIES[name]) == 60])
+    expected = [_sklearn_slope(row) for row in batch]
+    np.testing.assert_allclose(least_squares_slope(batch), expected, atol=1e-9)
+    assert least_squares_slope(np.ones((3, 1))).tolist() == [0.0, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("name", SERIES)
+def test_trend_score_matches_sklearn(name):
+    features = _features(SERIES[name])
+    window = np.zeros(60)
+    window[60 - len(SERIES[name]):] = SERIES[name]
+    assert calculate_trend_score(features) == _sklearn_trend_score(window)
+
+
+def test_batch_trend_scores_match_sklearn():
+    batch = np.vstack([SERIES[name] for name in SERIES if len(SERIES[name]) == 60])
+    expected = [_sklearn_trend_score(row) for row in batch]
+    assert trend_scores({"series": batch}).tolist() == expected
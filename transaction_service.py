@@ -0,0 +1,189 @@
+# transaction_service.py
+"""
+Insert transaksi dalam jumlah besar (mode bulk /transactions/add).
+
+Baris divalidasi satu per satu saat dibaca, lalu disimpan per chunk sebagai
+INSERT multi-baris (INSERT ... VALUES (...), (...), ...) beserta update
+rollup hariannya. Semua chunk berada dalam satu transaksi DB; pemanggil yang
+melakukan commit atau rollback.
+
+ID baris baru dikembalikan sesuai urutan input:
+
+- SQLite/PostgreSQL/MariaDB: INSERT ... RETURNING (urutan parameter dijaga).
+- MySQL: satu INSERT multi-baris mendapat ID berurutan dari lastrowid dengan
+  langkah auto_increment_increment, tetapi hanya jika innodb_autoinc_lock_mode
+  0 atau 1. Dengan mode 2 (default MySQL 8) ID tidak dijamin berurutan, jadi
+  tidak dikembalikan (None); client memetakan baris lewat nomor baris atau
+  field opsional 'ref' yang dikembalikan apa adanya.
+"""
+import math
+import os
+from datetime import date
+
+from sqlalchemy import insert
+
+from app.models import db, Transaction
+from rollup_service import add_to_daily_totals
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000))
+# Batas jumlah error per baris yang dikembalikan ke client
+MAX_REPORTED_ERRORS = 1000
+VALID_TYPES = ('pemasukan', 'pengeluaran')
+MAX_REF_LENGTH = 64
+
+# engine -> langkah ID jika INSERT multi-baris MySQL mendapat ID berurutan, selain itu None
+_mysql_id_steps = {}
+
+
+def parse_transaction_row(item, default_type=None, default_date=None):
+    """Validasi satu item transaksi; mengembalikan dict kolom atau melempar ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Baris harus berupa objek JSON")
+
+    trx_type = item.get('type') or default_type
+    if trx_type not in VALID_TYPES:
+        raise ValueError(f"Tipe transaksi tidak valid: {trx_type}")
+
+    date_str = item.get('date') or default_date
+    if not date_str:
+        raise ValueError("Tanggal transaksi tidak ditemukan")
+    try:
+        # Format wajib YYYY-MM-DD (fromisoformat jauh lebih cepat dari strptime)
+        if len(date_str) != 10:
+            raise ValueError
+        date_obj = date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        raise ValueError(f"Format tanggal tidak valid: {date_str}")
+
+    amount = item.get('amount')
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise ValueError(f"Jumlah tidak valid: {amount}")
+    try:
+        amount = float(amount)
+    except OverflowError:
+        raise ValueError(f"Jumlah tidak valid: {amount}")
+    # NaN/Infinity (literal JSON yang diterima json.loads) akan merusak total di daily_totals
+    if not math.isfinite(amount) or amount < 0:
+        raise ValueError(f"Jumlah tidak valid: {amount}")
+
+    description = item.get('description')
+    if description is not None and not isinstance(description, str):
+        raise ValueError("Deskripsi harus berupa teks")
+
+    return {'type': trx_type, 'description': description, 'amount': amount, 'date': date_obj}
+
+
+def parse_row_ref(item):
+    """Field opsional 'ref' (kunci baris dari client, dikembalikan apa adanya); melempar ValueError."""
+    ref = item.get('ref')
+    if ref is None:
+        return None
+    if isinstance(ref, bool) or not isinstance(ref, (str, int)) or len(str(ref)) > MAX_REF_LENGTH:
+        raise ValueError(f"'ref' harus berupa teks/angka maksimal {MAX_REF_LENGTH} karakter")
+    return ref
+
+
+def _mysql_id_step(connection):
+    engine = connection.engine
+    if engine not in _mysql_id_steps:
+        lock_mode, increment = connection.exec_driver_sql(
+            "SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment"
+        ).one()
+        # Mode 0 (traditional) dan 1 (consecutive) memberi blok ID berurutan untuk 'simple insert'
+        _mysql_id_steps[engine] = int(increment) if int(lock_mode) in (0, 1) else None
+    return _mysql_id_steps[engine]
+
+
+def _insert_multirow(values):
+    """
+    Satu INSERT ... VALUES (...), (...), ... per chunk (MySQL, tanpa RETURNING).
+    Mengembalikan ID baru jika server menjamin ID berurutan (lihat docstring modul), selain itu None.
+    """
+    columns = ('user_id', 'type', 'description', 'amount', 'date')
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = (
+        f"INSERT INTO {Transaction.__tablename__} ({', '.join(columns)}) VALUES "
+        + ", ".join([row_placeholder] * len(values))
+    )
+    params = tuple(value[column] for value in values for column in columns)
+    connection = db.session.connection()
+    step = _mysql_id_step(connection)
+    result = connection.exec_driver_sql(sql, params)
+    if step is None:
+        return None
+    # lastrowid (LAST_INSERT_ID) adalah ID baris pertama dari INSERT multi-baris
+    return list(range(result.lastrowid, result.lastrowid + step * len(values), step))
+
+
+def insert_transaction_chunk(user_id, rows):
+    """
+    Simpan satu chunk baris tervalidasi beserta rollup hariannya. Mengembalikan
+    list ID baru (urutan sama dengan `rows`), atau None jika database tidak bisa menjaminnya.
+    """
+    if not rows:
+        return []
+    values = [{'user_id': int(user_id), **row} for row in rows]
+    table = Transaction.__table__
+
+    if db.session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        # Core executemany; SQLAlchemy menggabungkannya menjadi INSERT multi-baris ... RETURNING
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        inserted_ids = list(db.session.execute(stmt, values).scalars())
+    else:
+        inserted_ids = _insert_multirow(values)
+
+    add_to_daily_totals(
+        user_id, [(row['date'], row['type'], row['amount'], row['description']) for row in rows]
+    )
+    return inserted_ids
+
+
+def bulk_insert_transactions(user_id, numbered_items, default_type=None, default_date=None,
+                             atomic=True, chunk_size=BULK_CHUNK_SIZE):
+    """
+    `numbered_items` adalah iterable (nomor_baris, item) sehingga bisa berupa stream.
+    Jika `atomic`, insert berhenti begitu ada baris yang tidak valid (validasi tetap
+    dilanjutkan untuk melaporkan semua error) dan pemanggil wajib rollback.
+
+    Mengembalikan (inserted, errors, error_count). `inserted` berisi "rows" (nomor
+    baris yang disimpan), "ids" (ID baru dengan urutan yang sama, atau None jika
+    database tidak bisa menjaminnya) dan "refs" ('ref' dari client, None jika tidak ada).
+    """
+    inserted = {'rows': [], 'ids': [], 'refs': []}
+    errors = []
+    error_count = 0
+    chunk, chunk_rows, chunk_refs = [], [], []
+
+    def flush():
+        ids = insert_transaction_chunk(user_id, chunk)
+        if ids is None or inserted['ids'] is None:
+            inserted['ids'] = None
+        else:
+            inserted['ids'].extend(ids)
+        inserted['rows'].extend(chunk_rows)
+        inserted['refs'].extend(chunk_refs)
+
+    for row_number, item in numbered_items:
+        try:
+            row = parse_transaction_row(item, default_type, default_date)
+            ref = parse_row_ref(item)
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': row_number, 'error': str(e)})
+            continue
+        chunk.append(row)
+        chunk_rows.append(row_number)
+        chunk_refs.append(ref)
+
+        if len(chunk) >= chunk_size:
+            if not (atomic and error_count):
+                flush()
+            chunk, chunk_rows, chunk_refs = [], [], []
+
+    if chunk and not (atomic and error_count):
+        flush()
+
+    if not any(ref is not None for ref in inserted['refs']):
+        inserted['refs'] = None
+    return inserted, errors, error_count
@@ -1,25 +1,110 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import db, Transaction  # ⬅️ ambil db dari 1 tempat saja
-from datetime import datetime
-from sqlalchemy import func, case
+from app.models import db, Transaction, DailyTotal  # ⬅️ ambil db dari 1 tempat saja
+from rollup_service import add_to_daily_totals
+from transaction_service import bulk_insert_transactions
+from datetime import datetime, date
+import calendar
+import json
+import math
+from sqlalchemy import func, case, extract
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import timedelta
-import pandas as pd
-from io import BytesIO
-from flask import send_file
+from flask import send_file, Response, stream_with_context
+from report_service import iter_report_rows, iter_report_csv, write_report_xlsx
+from chart_service import CHART_RESOLUTIONS, CHART_MAX_POINTS, DOWNSAMPLE_METHODS, get_chart
 
 
 
 transaction_bp = Blueprint('transactions', __name__)
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+
+
+def _iter_ndjson_rows(stream, block_size=64 * 1024):
+    """Baca body NDJSON per blok dan pecah per baris tanpa memuat seluruh body ke memori."""
+    row_number = 0
+    pending = b''
+    while True:
+        block = stream.read(block_size)
+        lines = (pending + block).split(b'\n')
+        pending = lines.pop() if block else b''
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError:
+                yield row_number, None  # ditolak oleh validasi sebagai baris tidak valid
+        if not block:
+            break
+
+
+def _bulk_add_transactions(user_id):
+    """
+    Mode bulk /transactions/add: body NDJSON (satu transaksi lengkap per baris)
+    atau JSON biasa {type, date, items}. Default-nya atomik: jika ada baris yang
+    tidak valid, tidak ada yang disimpan. Tambahkan ?partial=1 untuk tetap
+    menyimpan baris yang valid.
+
+    Response berisi ID baru per baris yang disimpan ('inserted_ids', urutan sama
+    dengan 'inserted_rows'), atau null jika database tidak bisa menjaminnya (MySQL
+    dengan innodb_autoinc_lock_mode=2). Field opsional 'ref' per baris dikembalikan
+    di 'inserted_refs'.
+    """
+    atomic = request.args.get('partial') not in ('1', 'true')
+
+    if request.mimetype in NDJSON_MIMETYPES:
+        numbered_items = _iter_ndjson_rows(request.stream)
+        default_type = default_date = None
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            return jsonify({'error': "Body JSON harus berisi list 'items'"}), 400
+        numbered_items = enumerate(data['items'], start=1)
+        default_type, default_date = data.get('type'), data.get('date')
+
+    try:
+        inserted, errors, error_count = bulk_insert_transactions(
+            user_id, numbered_items, default_type, default_date, atomic=atomic
+        )
+        if atomic and error_count:
+            db.session.rollback()
+            return jsonify({
+                'error': f'{error_count} baris tidak valid, tidak ada transaksi yang disimpan',
+                'error_count': error_count,
+                'errors': errors
+            }), 400
+
+        db.session.commit()
+        return jsonify({
+            'message': 'Transaksi berhasil ditambahkan',
+            'inserted_count': len(inserted['rows']),
+            'inserted_ids': inserted['ids'],
+            'inserted_rows': inserted['rows'],
+            **({'inserted_refs': inserted['refs']} if inserted['refs'] is not None else {}),
+            'error_count': error_count,
+            'errors': errors
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+
 @transaction_bp.route('/add', methods=['POST'])
 @jwt_required()
 def add_transaction():
-    data = request.json
     user_id = get_jwt_identity()
+    if request.args.get('mode') == 'bulk' or request.mimetype in NDJSON_MIMETYPES:
+        return _bulk_add_transactions(user_id)
+
+    data = request.json
     
     try:
+        rollup_entries = []
         for idx, item in enumerate(data['items']):
             # Ambil tanggal dari item atau global
             date_str = item.get('date') or data.get('date')
@@ -31,17 +116,25 @@ def add_transaction():
                 date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
             except ValueError:
                 raise ValueError(f"Format tanggal tidak valid di baris {idx + 1}: {date_str}")
+
+            # NaN/Infinity akan merusak total di daily_totals
+            amount = float(item['amount'])
+            if not math.isfinite(amount):
+                raise ValueError(f"Jumlah tidak valid di baris {idx + 1}: {item['amount']}")
             
             # Simpan ke DB
             new_tx = Transaction(
                 user_id=user_id,
                 type=data['type'],
                 description=item['description'],
-                amount=item['amount'],
+                amount=amount,
                 date=date_obj
             )
             db.session.add(new_tx)
+            rollup_entries.append((date_obj, data['type'], amount, item['description']))
 
+        # Rollup harian ikut dalam transaksi DB yang sama
+        add_to_daily_totals(user_id, rollup_entries)
         db.session.commit()
         return jsonify({'message': 'Transaksi berhasil ditambahkan'}), 201
 
@@ -60,53 +153,22 @@ def get_transaction_chart():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     resolution = request.args.get('resolution', 'daily')
+    downsample = request.args.get('downsample', 'bucket')
 
-    try:
-        # Tentukan ekspresi period berdasarkan resolusi
-        if resolution == 'daily':
-            period_expr = func.date(Transaction.date)
-        elif resolution == 'weekly':
-            period_expr = func.yearweek(Transaction.date)
-        elif resolution == 'monthly':
-            period_expr = func.date_format(Transaction.date, '%Y-%m')
-        elif resolution == 'yearly':
-            period_expr = func.year(Transaction.date)
-        else:
-            return jsonify({'error': 'Resolusi tidak valid'}), 400
-
-        # Query berdasarkan periode dan user_id
-        query = db.session.query(
-            period_expr.label('period'),
-            func.sum(case((Transaction.type == 'pemasukan', Transaction.amount), else_=0)).label('income'),
-            func.sum(case((Transaction.type == 'pengeluaran', Transaction.amount), else_=0)).label('expense')
-        ).filter(Transaction.user_id == user_id)
-
-        if start_date:
-            query = query.filter(Transaction.date >= start_date)
-        if end_date:
-            query = query.filter(Transaction.date <= end_date)
-
-        query = query.group_by('period').order_by('period')
-        results = query.all()
-
-        chart_data = []
-        for row in results:
-            if resolution == 'daily':
-                label = row.period.strftime("%Y-%m-%d")
-            elif resolution == 'weekly':
-                label = f"Minggu ke-{str(row.period)[-2:]}, {str(row.period)[:4]}"
-            elif resolution == 'monthly':
-                label = row.period  # Sudah dalam format '%Y-%m'
-            elif resolution == 'yearly':
-                label = str(row.period)
-
-            chart_data.append({
-                'date': label,
-                'income': float(row.income),
-                'expense': float(row.expense)
-            })
+    if resolution not in CHART_RESOLUTIONS:
+        return jsonify({'error': 'Resolusi tidak valid'}), 400
+    if downsample not in DOWNSAMPLE_METHODS:
+        return jsonify({'error': 'downsample harus bucket atau lttb'}), 400
+    max_points = request.args.get('max_points', type=int)
+    if 'max_points' in request.args and (max_points is None or not 3 <= max_points <= CHART_MAX_POINTS):
+        return jsonify({'error': f'max_points harus bilangan bulat 3..{CHART_MAX_POINTS}'}), 400
 
+    try:
+        # Periode kosong diisi 0; diperkecil ke max_points (default CHART_MAX_POINTS) titik, lihat chart_service
+        chart_data = get_chart(user_id, resolution, start_date, end_date, max_points, downsample)
         return jsonify(chart_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -118,28 +180,19 @@ def download_report():
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
 
-    try:
-        query = Transaction.query.filter_by(user_id=user_id)
-        if start_date:
-            query = query.filter(Transaction.date >= start_date)
-        if end_date:
-            query = query.filter(Transaction.date <= end_date)
+    report_format = request.args.get("format", "xlsx")
 
-        transactions = query.order_by(Transaction.date).all()
-
-        data = [{
-            "Tanggal": tx.date.strftime("%Y-%m-%d"),
-            "Jenis": tx.type,
-            "Deskripsi": tx.description,
-            "Jumlah": float(tx.amount)
-        } for tx in transactions]
+    try:
+        # Baris dibaca per halaman (keyset) dan langsung ditulis ke output (memori konstan)
+        rows = iter_report_rows(user_id, start_date, end_date)
 
-        df = pd.DataFrame(data)
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Laporan Transaksi")
+        if report_format == "csv":
+            return Response(stream_with_context(iter_report_csv(rows)), mimetype="text/csv",
+                            headers={"Content-Disposition": "attachment; filename=Laporan_Transaksi.csv"})
+        if report_format != "xlsx":
+            return jsonify({"error": "Format laporan tidak valid (xlsx atau csv)"}), 400
 
-        output.seek(0)
+        output = write_report_xlsx(rows)
         return send_file(output, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                          as_attachment=True, download_name="Laporan_Transaksi.xlsx")
 
@@ -148,31 +201,109 @@ def download_report():
 
 
 
+def _tax_figures(total_income, total_expense, delta_days):
+    """Omzet tahunan, pajak, dan laba bersih untuk satu rentang waktu."""
+    is_less_than_year = delta_days < 365
+    omzet_annualized = (total_income / delta_days) * 365 if is_less_than_year else total_income
+    profit_actual = total_income - total_expense
+
+    # Pajak
+    if omzet_annualized <= 4800000000:
+        tax = 0.005 * total_income
+        tax_note = "Final 0.5% dari omzet (UMKM)"
+    elif omzet_annualized <= 50000000000:
+        proporsional_laba_48 = (4800000000 / omzet_annualized) * profit_actual
+        sisa_laba = profit_actual - proporsional_laba_48
+        tax = (0.11 * proporsional_laba_48) + (0.22 * sisa_laba)
+        tax_note = "11% untuk laba dari omzet 4,8M pertama, 22% sisanya"
+    else:
+        tax = 0.22 * profit_actual
+        tax_note = "Tarif normal 22%"
+
+    net_income = profit_actual - tax
+
+    return {
+        "tax": round(tax, 2),
+        "tax_note": tax_note,
+        "net_income": round(net_income, 2),
+        "annualized_omzet": round(omzet_annualized, 2),
+        "is_less_than_year": is_less_than_year
+    }
+
+
+def _monthly_breakdown(period_rows, d1, d2):
+    """Pajak dan omzet tahunan per bulan, dihitung dari hasil query yang sama."""
+    breakdown = []
+    for row in period_rows:
+        year, month = int(row.period_year), int(row.period_month)
+        period_start = max(d1, date(year, month, 1))
+        period_end = min(d2, date(year, month, calendar.monthrange(year, month)[1]))
+        duration_days = max((period_end - period_start).days + 1, 1)
+        income, expense = float(row.income), float(row.expense)
+        breakdown.append({
+            "period": f"{year:04d}-{month:02d}",
+            "start_date": period_start.strftime("%Y-%m-%d"),
+            "end_date": period_end.strftime("%Y-%m-%d"),
+            "duration_days": duration_days,
+            "revenue": income,
+            "expense": expense,
+            "transaction_count": int(row.count),
+            **_tax_figures(income, expense, duration_days)
+        })
+    return breakdown
+
+
 @transaction_bp.route('/metrics', methods=['GET'])
 @jwt_required()
 def get_transaction_metrics():
     user_id = get_jwt_identity()
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
+    breakdown = request.args.get("breakdown")
+
+    if breakdown not in (None, "monthly"):
+        return jsonify({"error": "Breakdown tidak valid (hanya 'monthly')"}), 400
 
     try:
-        query = Transaction.query.filter_by(user_id=user_id)
-        
-        # Ambil earliest and latest date kalau tidak diberikan
-        if not start_date or not end_date:
-            date_range = query.with_entities(
-                db.func.min(Transaction.date), db.func.max(Transaction.date)
-            ).first()
-            start_date = start_date or date_range[0].strftime("%Y-%m-%d")
-            end_date = end_date or date_range[1].strftime("%Y-%m-%d")
-
-        query = query.filter(Transaction.date >= start_date)
-        query = query.filter(Transaction.date <= end_date)
-
-        transactions = query.all()
-        total_income = sum(tx.amount for tx in transactions if tx.type == "pemasukan")
-        total_expense = sum(tx.amount for tx in transactions if tx.type == "pengeluaran")
-        count = len(transactions)
+        # Total, jumlah transaksi, dan rentang tanggal dalam satu query agregat
+        query = db.session.query(
+            func.coalesce(func.sum(DailyTotal.income), 0).label('income'),
+            func.coalesce(func.sum(DailyTotal.expense), 0).label('expense'),
+            func.coalesce(func.sum(DailyTotal.count), 0).label('count'),
+            func.min(DailyTotal.date).label('first_date'),
+            func.max(DailyTotal.date).label('last_date')
+        ).filter(DailyTotal.user_id == user_id)
+        if start_date:
+            query = query.filter(DailyTotal.date >= start_date)
+        if end_date:
+            query = query.filter(DailyTotal.date <= end_date)
+
+        if breakdown == "monthly":
+            # Satu baris per bulan; total keseluruhan dijumlahkan dari baris-baris ini.
+            # extract() berlaku di MySQL maupun SQLite (date_format hanya MySQL)
+            period_rows = query.add_columns(
+                extract('year', DailyTotal.date).label('period_year'),
+                extract('month', DailyTotal.date).label('period_month')
+            ).group_by('period_year', 'period_month').order_by('period_year', 'period_month').all()
+            total_income = sum(float(row.income) for row in period_rows)
+            total_expense = sum(float(row.expense) for row in period_rows)
+            count = sum(int(row.count) for row in period_rows)
+            first_date = min((row.first_date for row in period_rows), default=None)
+            last_date = max((row.last_date for row in period_rows), default=None)
+        else:
+            totals = query.one()
+            total_income = float(totals.income)
+            total_expense = float(totals.expense)
+            count = int(totals.count)
+            first_date, last_date = totals.first_date, totals.last_date
+
+        # Ambil earliest and latest date kalau tidak diberikan. Tanpa transaksi di rentang
+        # itu (first/last None), pakai batas yang diberikan atau hari ini: semua total 0.
+        if first_date is None:
+            fallback = start_date or end_date or date.today().strftime("%Y-%m-%d")
+            start_date, end_date = start_date or fallback, end_date or fallback
+        start_date = start_date or first_date.strftime("%Y-%m-%d")
+        end_date = end_date or last_date.strftime("%Y-%m-%d")
 
         # Hitung durasi hari yang benar
         d1 = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -182,35 +313,18 @@ def get_transaction_metrics():
         delta_weeks = max((delta_days // 7), 1)
         delta_months = max((delta_days // 30), 1)
 
-        is_less_than_year = delta_days < 365
-        omzet_annualized = (total_income / delta_days) * 365 if is_less_than_year else total_income
-        profit_actual = total_income - total_expense
-
-        # Pajak
-        if omzet_annualized <= 4800000000:
-            tax = 0.005 * total_income
-            tax_note = "Final 0.5% dari omzet (UMKM)"
-        elif omzet_annualized <= 50000000000:
-            proporsional_laba_48 = (4800000000 / omzet_annualized) * profit_actual
-            sisa_laba = profit_actual - proporsional_laba_48
-            tax = (0.11 * proporsional_laba_48) + (0.22 * sisa_laba)
-            tax_note = "11% untuk laba dari omzet 4,8M pertama, 22% sisanya"
-        else:
-            tax = 0.22 * profit_actual
-            tax_note = "Tarif normal 22%"
-
-        net_income = profit_actual - tax
+        tax_figures = _tax_figures(total_income, total_expense, delta_days)
 
-        return jsonify({
+        metrics = {
             "revenue": total_income,
             "expense": total_expense,
-            "tax": round(tax, 2),
-            "tax_note": tax_note,
-            "net_income": round(net_income, 2),
+            "tax": tax_figures["tax"],
+            "tax_note": tax_figures["tax_note"],
+            "net_income": tax_figures["net_income"],
             "transaction_count": count,
             "duration_days": delta_days,
-            "annualized_omzet": round(omzet_annualized, 2),
-            "is_less_than_year": is_less_than_year,
+            "annualized_omzet": tax_figures["annualized_omzet"],
+            "is_less_than_year": tax_figures["is_less_than_year"],
             "total_income": total_income,
             "total_expense": total_expense,
             "avg_income_per_day": total_income / delta_days,
@@ -219,7 +333,11 @@ def get_transaction_metrics():
             "avg_expense_per_week": total_expense / delta_weeks,
             "avg_income_per_month": total_income / delta_months,
             "avg_expense_per_month": total_expense / delta_months
-        })
+        }
+        if breakdown == "monthly":
+            metrics["breakdown"] = _monthly_breakdown(period_rows, d1, d2)
+
+        return jsonify(metrics)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -6,6 +6,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_jwt_extended import verify_jwt_in_request
 from flask import g
 from functools import wraps
+import os
 
 def token_required(f):
     @wraps(f)
@@ -16,6 +17,24 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+
+# ID akun admin/service (dipisah koma) yang boleh memakai endpoint lintas user, mis. batch scoring.
+# Kosong = tidak ada admin; endpoint tersebut selalu 403 dan batch hanya lewat CLI.
+ADMIN_USER_IDS = frozenset(
+    uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()
+)
+
+
+def admin_required(f):
+    """Seperti jwt_required, tetapi hanya untuk akun di ADMIN_USER_IDS (selain itu 403)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        verify_jwt_in_request()
+        if str(get_jwt_identity()) not in ADMIN_USER_IDS:
+            return jsonify({"error": "Endpoint ini hanya untuk admin."}), 403
+        return f(*args, **kwargs)
+    return decorated
+
 # Create the akun blueprint
 user_blueprint = Blueprint('user', __name__)
 
@@ -151,4 +170,4 @@ def update_profile():
         return jsonify({"error": f"Database error: {err}"}), 500
 
 
-__all__ = ["user_blueprint", "token_required"]
+__all__ = ["user_blueprint", "token_required", "admin_required"]